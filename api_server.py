@@ -0,0 +1,407 @@
+# api_server.py
+"""
+Read-only JSON API over the local stores, for consumers other than the
+Streamlit app (Slack bot, BI tools). It never calls TMDB/OMDb itself: it
+serves what the ETL already fetched, so every consumer shares one
+upstream pull.
+
+Run alongside Streamlit (see entrypoint.sh):
+    uvicorn api_server:app --host 0.0.0.0 --port 8000
+
+Endpoints (all GET):
+  /health
+  /v1/trending/latest?window=day&media_type=movie&page=1&per_page=20
+  /v1/trending/batches?window=day&page=1
+  /v1/trending/batches/{ts}?window=day&page=1
+  /v1/trending/churn?window=day&page=1
+  /v1/enrichment?ids=1,2,3
+  /v1/enrichment/{media_type}/{id}
+  /v1/search?q=spider+verse&limit=20
+  /v1/titles/top?window=day&limit=20
+  /v1/titles/{media_type}/{id}/appearances?window=day
+
+Responses are built once per data version ("batch id") and kept in
+memory with pre-compressed gzip/brotli bodies and a strong ETag per
+encoding. Timestamps are UTC ISO-8601 with a "Z" everywhere. The
+cache holds at most API_CACHE_ENTRIES responses (least recently used go
+first), so varied queries can't grow it without bound, and it is dropped
+whenever the ETL publishes new data.
+"""
+import os
+import gzip
+import json
+import hashlib
+import pathlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from utils.queries import (
+    connect, latest_batch, latest_batch_ts, batch_summary, batch_at, batch_churn, top_titles, enrichment_for,
+)
+from utils.snapshot import open_snapshot, snapshot_ts, select_snapshot
+from utils.search_index import search as search_titles, appearances_for, ts_text
+
+# Optional: brotli (falls back to gzip when missing)
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+DATA_DIR = pathlib.Path("data")
+# Files whose change means "new batch": drop every cached response
+VERSION_FILES = [
+    "tmdb_trending.parquet", "enrichment_cache.parquet", "tmdb_batch_diff.parquet",
+    "snapshot_day.arrow", "snapshot_week.arrow",
+    # WAL mode: new pulls land in the -wal file until a checkpoint
+    "title_index.sqlite", "title_index.sqlite-wal",
+]
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MIN_COMPRESS_BYTES = 512
+CACHE_ENTRIES = int(os.getenv("API_CACHE_ENTRIES", "512"))
+
+
+# ---------- data version / response cache ----------
+
+def current_batch_id() -> str:
+    """Cheap fingerprint of the stores (a few stat() calls); changes whenever the ETL writes."""
+    parts = []
+    for name in VERSION_FILES:
+        try:
+            st = (DATA_DIR / name).stat()
+            parts.append(f"{st.st_ino}:{st.st_mtime_ns}:{st.st_size}")
+        except FileNotFoundError:
+            parts.append("-")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+class _Cached:
+    def __init__(self, body: bytes, status: int = 200):
+        self.status = status
+        self.identity = body
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+        self._encoded = {}
+
+    def etag(self, encoding: str) -> str:
+        """Strong validator per encoding: gzip, br and identity are different bytes."""
+        if encoding == "identity":
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+    def encoded(self, encoding: str) -> bytes:
+        """Compressed body, built on first request for that encoding."""
+        if encoding == "identity":
+            return self.identity
+        if encoding not in self._encoded:
+            if encoding == "br":
+                self._encoded[encoding] = brotli.compress(self.identity, quality=5)
+            else:
+                self._encoded[encoding] = gzip.compress(self.identity, compresslevel=6)
+        return self._encoded[encoding]
+
+
+class ResponseCache:
+    """
+    In-memory responses for the current batch id, least recently used
+    evicted beyond max_entries; cleared when the batch id changes.
+    """
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self.batch_id = None
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, _Cached] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: str, batch_id: str, build) -> _Cached:
+        with self._lock:
+            if batch_id != self.batch_id:
+                self.entries.clear()
+                self.batch_id = batch_id
+            hit = self.entries.get(key)
+            if hit is not None:
+                self.entries.move_to_end(key)
+        if hit is not None:
+            return hit
+        status, payload = build()
+        body = json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8")
+        entry = _Cached(body, status)
+        with self._lock:
+            if batch_id == self.batch_id:
+                self.entries[key] = entry
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return entry
+
+
+cache = ResponseCache()
+
+# DuckDB connections are not safe to share across threads; one per thread
+_local = threading.local()
+
+
+def _con():
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = _local.con = connect(DATA_DIR)
+    return con
+
+
+# ---------- helpers ----------
+
+def _json_default(value):
+    # timestamps in the search index's format, so every endpoint matches
+    if isinstance(value, datetime):
+        return ts_text(value)
+    return str(value)
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    if df.empty:
+        return []
+    df = df.astype(object).where(df.notna(), None)
+    rows = df.to_dict("records")
+    for r in rows:
+        # providers is stored as JSON text; serve it as an object
+        if isinstance(r.get("providers"), str):
+            r["providers"] = json.loads(r["providers"])
+    return rows
+
+
+def _page_params(request: Request):
+    try:
+        page = max(1, int(request.query_params.get("page", 1)))
+        per_page = int(request.query_params.get("per_page", DEFAULT_PER_PAGE))
+    except ValueError:
+        raise ValueError("page and per_page must be integers")
+    return page, min(max(1, per_page), MAX_PER_PAGE)
+
+
+def _paginate(rows: list, page: int, per_page: int, batch_id: str, total: int | None = None, **extra) -> dict:
+    """One page of `rows`; with `total`, rows is already that page (sliced by the caller)."""
+    start = (page - 1) * per_page
+    if total is None:
+        total = len(rows)
+        rows = rows[start:start + per_page]
+    return {
+        "batch_id": batch_id,
+        **extra,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "next_page": page + 1 if start + per_page < total else None,
+        "items": rows,
+    }
+
+
+def _window(request: Request) -> str:
+    window = request.query_params.get("window", "day")
+    if window not in ("day", "week"):
+        raise ValueError("window must be 'day' or 'week'")
+    return window
+
+
+def _pick_encoding(request: Request, size: int) -> str:
+    if size < MIN_COMPRESS_BYTES:
+        return "identity"
+    accept = request.headers.get("accept-encoding", "")
+    offered = {part.split(";")[0].strip().lower() for part in accept.split(",")}
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return "identity"
+
+
+def _respond(request: Request, build) -> Response:
+    """Serve from cache with ETag validation and content negotiation."""
+    batch_id = current_batch_id()
+    key = request.url.path + "?" + str(request.query_params)
+    try:
+        entry = cache.get_or_build(key, batch_id, lambda: build(batch_id))
+    except ValueError as e:
+        return _error(400, str(e))
+
+    encoding = _pick_encoding(request, len(entry.identity))
+    etag = entry.etag(encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",  # always revalidate; 304s are cheap
+        "Vary": "Accept-Encoding",
+        "X-Batch-Id": batch_id,
+    }
+    if etag in _etags(request.headers.get("if-none-match", "")):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(entry.encoded(encoding), status_code=entry.status,
+                    media_type="application/json", headers=headers)
+
+
+def _etags(header: str) -> set:
+    # accept weak validators too (W/"..."), e.g. from proxies that re-encode
+    return {t.strip().removeprefix("W/") for t in header.split(",") if t.strip()}
+
+
+def _error(status: int, message: str) -> Response:
+    return Response(json.dumps({"error": message}), status_code=status, media_type="application/json")
+
+
+# ---------- endpoints ----------
+
+async def health(request: Request):
+    return Response(json.dumps({"status": "ok", "batch_id": current_batch_id()}),
+                    media_type="application/json")
+
+
+def latest(request: Request):
+    def build(batch_id):
+        window = _window(request)
+        media_type = request.query_params.get("media_type")
+        page, per_page = _page_params(request)
+        # the ETL's snapshot already has enrichment joined on (used only
+        # while it holds the same pull as the history)
+        table = open_snapshot(window)
+        ts = snapshot_ts(table)
+        if table is not None and ts == latest_batch_ts(_con(), window):
+            # filter and slice in Arrow; only the page is converted
+            table = select_snapshot(table, media_type or None)
+            page_df = table.slice((page - 1) * per_page, per_page).to_pandas()
+            return 200, _paginate(_records(page_df), page, per_page, batch_id,
+                                  total=table.num_rows, window=window, ts=ts)
+        df = latest_batch(_con(), window, media_type or None)
+        if len(df):
+            enr = enrichment_for(_con(), df["id"].tolist())
+            if len(enr):
+                cols = ["id", "media_type", "imdb_rating", "imdb_votes", "providers"]
+                df = df.merge(enr[cols], on=["id", "media_type"], how="left")
+        ts = df["ts"].iloc[0] if len(df) else None
+        return 200, _paginate(_records(df), page, per_page, batch_id, window=window, ts=ts)
+    return _respond(request, build)
+
+
+def batches(request: Request):
+    def build(batch_id):
+        window = _window(request)
+        page, per_page = _page_params(request)
+        df = batch_summary(_con(), window)
+        return 200, _paginate(_records(df), page, per_page, batch_id, window=window)
+    return _respond(request, build)
+
+
+def batch(request: Request):
+    def build(batch_id):
+        window = _window(request)
+        page, per_page = _page_params(request)
+        try:
+            ts = pd.Timestamp(request.path_params["ts"])
+        except ValueError:
+            ts = pd.NaT
+        if ts is pd.NaT:
+            raise ValueError("ts must be an ISO-8601 timestamp")
+        # naive timestamps are UTC, like every ts the API serves; DuckDB keeps µs
+        ts = (ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")).floor("us")
+        df = batch_at(_con(), ts.isoformat(), window)
+        if df.empty:
+            return 404, {"error": f"no {window} batch at {ts_text(ts)}", "batch_id": batch_id}
+        return 200, _paginate(_records(df), page, per_page, batch_id, window=window, ts=ts)
+    return _respond(request, build)
+
+
+def churn(request: Request):
+    def build(batch_id):
+        window = _window(request)
+        page, per_page = _page_params(request)
+        df = batch_churn(_con(), window)
+        return 200, _paginate(_records(df), page, per_page, batch_id, window=window)
+    return _respond(request, build)
+
+
+def enrichment_list(request: Request):
+    def build(batch_id):
+        raw = request.query_params.get("ids", "")
+        try:
+            ids = [int(i) for i in raw.split(",") if i.strip()]
+        except ValueError:
+            raise ValueError("ids must be a comma-separated list of integers")
+        if len(ids) > MAX_PER_PAGE:
+            raise ValueError(f"at most {MAX_PER_PAGE} ids per request")
+        df = enrichment_for(_con(), ids, request.query_params.get("media_type"))
+        return 200, {"batch_id": batch_id, "items": _records(df)}
+    return _respond(request, build)
+
+
+def enrichment_one(request: Request):
+    def build(batch_id):
+        media_type = request.path_params["media_type"]
+        item_id = request.path_params["item_id"]
+        rows = _records(enrichment_for(_con(), [item_id], media_type))
+        if not rows:
+            return 404, {"error": f"no enrichment for {media_type}/{item_id}", "batch_id": batch_id}
+        return 200, {"batch_id": batch_id, **rows[0]}
+    return _respond(request, build)
+
+
+def search(request: Request):
+    def build(batch_id):
+        q = request.query_params.get("q", "").strip()
+        if not q:
+            raise ValueError("q is required")
+        try:
+            limit = min(max(1, int(request.query_params.get("limit", DEFAULT_PER_PAGE))), MAX_PER_PAGE)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        return 200, {"batch_id": batch_id, "q": q, "items": _records(search_titles(q, limit=limit))}
+    return _respond(request, build)
+
+
+def titles_top(request: Request):
+    def build(batch_id):
+        window = _window(request)
+        try:
+            limit = min(max(1, int(request.query_params.get("limit", DEFAULT_PER_PAGE))), MAX_PER_PAGE)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        df = top_titles(_con(), window, limit)
+        return 200, {"batch_id": batch_id, "window": window, "items": _records(df)}
+    return _respond(request, build)
+
+
+def title_appearances(request: Request):
+    def build(batch_id):
+        window = request.query_params.get("window")
+        if window is not None and window not in ("day", "week"):
+            raise ValueError("window must be 'day' or 'week'")
+        media_type = request.path_params["media_type"]
+        item_id = request.path_params["item_id"]
+        page, per_page = _page_params(request)
+        rows = _records(appearances_for(item_id, media_type, window))
+        if not rows:
+            return 404, {"error": f"{media_type}/{item_id} has not trended", "batch_id": batch_id}
+        return 200, _paginate(rows, page, per_page, batch_id, id=item_id, media_type=media_type)
+    return _respond(request, build)
+
+
+routes = [
+    Route("/health", health),
+    Route("/v1/trending/latest", latest),
+    Route("/v1/trending/batches", batches),
+    Route("/v1/trending/batches/{ts}", batch),
+    Route("/v1/trending/churn", churn),
+    Route("/v1/enrichment", enrichment_list),
+    Route("/v1/enrichment/{media_type}/{item_id:int}", enrichment_one),
+    Route("/v1/search", search),
+    Route("/v1/titles/top", titles_top),
+    Route("/v1/titles/{media_type}/{item_id:int}/appearances", title_appearances),
+]
+
+app = Starlette(routes=routes)
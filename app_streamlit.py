@@ -1,6 +1,8 @@
 
 # app_streamlit.py
 from pathlib import Path
+import json
+import uuid
 import asyncio
 import pandas as pd
 import streamlit as st
@@ -12,478 +14,614 @@ try:
 except Exception:
     HAVE_FETCH = False
 
-from providers.tmdb import fetch_tmdb_external_ids
+from providers.tmdb import fetch_tmdb_details, providers_for_region
 from providers.omdb import fetch_omdb_rating
-@st.cache_data(ttl=60*60)
-def get_imdb_stats_cached(item_id: int, media_type: str):
-    import asyncio
-    ext = asyncio.run(fetch_tmdb_external_ids(item_id, media_type)) or {}
-    imdb_id = ext.get("imdb_id")
-    if not imdb_id:
-        return {}
-    return asyncio.run(fetch_omdb_rating(imdb_id)) or {}
-
-
-from providers.tmdb import fetch_tmdb_trending, fetch_tmdb_providers  # ensure imported
-@st.cache_data(ttl=60*60)  # cache for 1 hour per title/region
-def get_availability_cached(item_id: int, media_type: str, region: str):
-    # async provider -> sync wrapper
-    import asyncio
-    return asyncio.run(fetch_tmdb_providers(item_id, media_type, region))
-
-
-st.set_page_config(page_title="Trending — Media Analytics", layout="wide")
-DATA = Path("data")
-POSTER_BASE = "https://image.tmdb.org/t/p/w342"
-
-# --- Light/Dark toggle (simple CSS theme) ---
-dark_mode = st.toggle("Dark mode", value=False, help="Toggle a simple dark/light theme.")
-if dark_mode:
-    st.markdown("""
-        <style>
-        :root { --bg:#0b0f15; --panel:#141a22; --text:#e8edf3; --muted:#a8b4c0; --border:#253041; --halo:#3aa0ff; }
-        html, body, [data-testid="stAppViewContainer"] { background:var(--bg)!important; color:var(--text)!important; }
-        [data-testid="stHeader"]{background:transparent!important}
-        body, p, span, label, h1,h2,h3,h4,h5,h6,[data-testid="stMarkdownContainer"] *{color:var(--text)!important}
-        small,.stMarkdown small{color:var(--muted)!important}
-
-        /* Section cards */
-        .segment { background:var(--panel); border:1px solid var(--border); border-radius:14px; padding:16px 18px; margin:16px 0 20px 0; }
-
-        /* Metrics / inputs */
-        div[data-testid="stMetric"]{background:var(--panel); border:1px solid var(--border); border-radius:12px; padding:12px}
-        div[data-testid="stMetricValue"],div[data-testid="stMetricLabel"]{color:var(--text)!important}
-        .stRadio>div,.stSelectbox,.stSlider,.stDataFrame{background:var(--panel)!important; border-radius:10px}
-
-        /* Poster grid card */
-        .poster-card{
-            background:linear-gradient(180deg, rgba(255,255,255,0.02), rgba(255,255,255,0.00));
-            border:1px solid var(--border);
-            border-radius:14px; padding:10px; transition:transform .18s ease, box-shadow .18s ease, border-color .18s ease;
-            overflow:hidden; position:relative; margin-bottom:18px;
-        }
-        .poster-img{width:100%; height:auto; border-radius:10px; display:block;}
-        .poster-meta{font-size:15px; color:var(--muted); margin-top:6px}
-        .poster-title{font-weight:600; margin-top:8px; font-size:20px; color:var(--text)}
-        .poster-imdb{margin-top:4px; font-size:18px; font-weight:600; color:var(--text)}
-        .provider-row{display:flex; flex-wrap:wrap; gap:6px; margin-top:8px; margin-bottom:4px;}
-        .prov-logo{width:39px; height:39px
-        ; border-radius:7px; background:#233042; padding:4px; object-fit:contain;}
-        .prov-pill{display:inline-block; height:32px; line-height:30px; padding:0 10px; border-radius:7px; background:#233042; color:var(--text); font-size:11px; border:1px solid var(--border)}
-        .poster-card:hover{ transform:scale(1.03); border-color: rgba(58,160,255,.85); box-shadow:0 6px 26px rgba(58,160,255,.18), 0 2px 10px rgba(0,0,0,.35); }
-
-        /* Tighter grid spacing between rows */
-        .stColumns > div { padding-bottom: 6px; }
-        </style>
-    """, unsafe_allow_html=True)
-else:
-    # Light theme polish (keeps logos same size)
-    st.markdown("""
-        <style>
-        :root { --panel:#ffffff; --border:#e6e8ec; --text:#0f1720; --muted:#586273; --halo:#2b7fff; }
-        .segment{ background:var(--panel); border:1px solid var(--border); border-radius:14px; padding:16px 18px; margin:16px 0 20px 0; }
-        .poster-card{ background:#fff; border:1px solid var(--border); border-radius:14px; padding:10px; transition:transform .18s ease, box-shadow .18s ease, border-color .18s ease; margin-bottom:18px;}
-        .poster-img{width:100%; height:auto; border-radius:10px;}
-        .poster-title{font-weight:600; margin-top:8px; font-size:20px; color:var(--text)}
-        .poster-imdb{margin-top:4px; font-size:18px; font-weight:600; color:var(--text)}
-        .poster-meta{font-size:15px; color:var(--muted); margin-top:6px}
-        .provider-row{display:flex; flex-wrap:wrap; gap:6px; margin-top:8px; margin-bottom:4px;}
-        .prov-logo{width:39px; height:39px; border-radius:7px; background:#eef3ff; padding:4px; object-fit:contain; border:1px solid #e5ecff;}
-        .prov-pill{display:inline-block; height:32px; line-height:30px; padding:0 10px; border-radius:7px; background:#eef3ff; color:#1c2735; font-size:11px; border:1px solid #e5ecff}
-        .poster-card:hover{ transform:scale(1.03); border-color: var(--halo); box-shadow:0 6px 24px rgba(43,127,255,.18), 0 2px 10px rgba(16,24,40,.08); }
-        .stColumns > div { padding-bottom: 6px; }
-        </style>
-    """, unsafe_allow_html=True)
-
-
-
-
-
-st.title("Trending — Media Analytics")
-
-with st.expander("About these metrics (click to expand)", expanded=False):
-    st.markdown(
-        """
-**What you’re seeing**
-
-- **Trending** surfaces titles getting the most attention on TMDB **today** (or **this week**).
-- **Popularity** is TMDB’s relative trending score (higher = more current momentum). Not a count of views.
-- **Vote average** is the average user rating (0–10).  
-- **Vote count** is how many ratings a title has received.
-
-Use **Time horizon** to switch between Today and This Week. Use **Content type** to filter.
-        """
+from providers.youtube import join_trailer_stats, load_trailer_stats, cache_versions as trailer_cache_versions
+@st.cache_data(max_entries=2)
+def get_trailer_stats(versions):
+    # YouTube caches written by the ETL; `versions` (their mtimes) changes
+    # on every write, so the two parquet files are read once per write
+    return load_trailer_stats()
+
+
+@st.cache_data(ttl=60*60)  # cache for 1 hour per set of titles (all regions)
+def get_live_enrichment(titles: tuple):
+    # Fallback for gallery titles the ETL hasn't enriched: (id, media_type,
+    # need_rating) each. One TMDB call per title gives external ids + watch
+    # providers for every country (so switching country reuses it), then
+    # OMDb if a rating is needed. All titles are looked up at once in one
+    # event loop; the per-provider limiters cap how many requests run.
+    async def one(item_id, media_type, need_rating):
+        try:
+            details = await fetch_tmdb_details(item_id, media_type) or {}
+            imdb_id = details.get("imdb_id")
+            stats = (await fetch_omdb_rating(imdb_id) or {}) if need_rating and imdb_id else {}
+        except Exception:
+            details, stats = {}, {}
+        return (item_id, media_type), (details, stats)
+
+    async def run():
+        return dict(await asyncio.gather(*(one(*t) for t in titles)))
+    return asyncio.run(run())
+
+
+from utils.queries import (
+    connect, latest_batch, latest_batch_ts, store_version, perf_recent, provider_daily_usage,
+    endpoint_latency, enrichment_for, slowest_stages,
+)
+@st.cache_resource
+def get_query_db():
+    # One in-process DuckDB database per server; views read parquet lazily.
+    # Sessions rerun on their own threads and a DuckDB connection must not be
+    # shared between threads: each rerun opens its own cursor (see below)
+    return connect()
+
+
+from utils.profiling import RerunProfiler, profiling_enabled, latest_report
+from utils.snapshot import (
+    open_snapshot, snapshot_version, snapshot_ts, publish_latest, enrichment_from_snapshot,
+)
+from utils.search_index import search as search_titles, appearances_for
+@st.cache_resource(max_entries=4)
+def get_snapshot(window: str, version):
+    # Memory-mapped Arrow table, shared by all sessions; `version` changes
+    # whenever the ETL swaps in a new file, which re-maps it
+    return open_snapshot(window)
+
+
+@st.cache_resource(max_entries=4)
+def get_snapshot_frame(window: str, version):
+    # The snapshot as pandas, converted once per published file instead of on
+    # every rerun; shared by all sessions, so it is only ever read (filters
+    # below make copies)
+    return get_snapshot(window, version).to_pandas()
+
+
+@st.cache_data(max_entries=4)
+def get_latest_ts(_con, window: str, version):
+    # ts of the pull latest_batch() would load; `version` changes on every
+    # write to tmdb_trending.parquet (`_con` is not part of the cache key)
+    return latest_batch_ts(_con, window)
+
+
+def fetch_and_publish(window: str):
+    # On-demand pull; republish the snapshot so it doesn't lag the history
+    asyncio.run(fetch_tmdb_trending("all", window))
+    publish_latest(window)
+
+
+# One cursor on the shared database per rerun, closed when the script ends
+# (also on st.stop() / st.rerun(), which raise)
+with get_query_db().cursor() as query_conn:
+    st.set_page_config(page_title="Trending — Media Analytics", layout="wide")
+    DATA = Path("data")
+    POSTER_BASE = "https://image.tmdb.org/t/p/w342"
+
+    # Opt-in stage timing (APP_PROFILE=1 or ?profile=1); no-op otherwise
+    prof = RerunProfiler(
+        enabled=profiling_enabled(st.query_params),
+        session_id=st.session_state.setdefault("profile_session", uuid.uuid4().hex[:8]),
     )
+    # finish() records the rerun even when it ends early (st.stop(),
+    # st.rerun() and errors all raise out of the script)
+    try:
+        if prof.enabled and st.session_state.pop("capture_profile", False):
+            prof.start_sampling()
+
+        # --- Light/Dark toggle (simple CSS theme) ---
+        dark_mode = st.toggle("Dark mode", value=False, help="Toggle a simple dark/light theme.")
+        if dark_mode:
+            st.markdown("""
+                <style>
+                :root { --bg:#0b0f15; --panel:#141a22; --text:#e8edf3; --muted:#a8b4c0; --border:#253041; --halo:#3aa0ff; }
+                html, body, [data-testid="stAppViewContainer"] { background:var(--bg)!important; color:var(--text)!important; }
+                [data-testid="stHeader"]{background:transparent!important}
+                body, p, span, label, h1,h2,h3,h4,h5,h6,[data-testid="stMarkdownContainer"] *{color:var(--text)!important}
+                small,.stMarkdown small{color:var(--muted)!important}
+
+                /* Section cards */
+                .segment { background:var(--panel); border:1px solid var(--border); border-radius:14px; padding:16px 18px; margin:16px 0 20px 0; }
+
+                /* Metrics / inputs */
+                div[data-testid="stMetric"]{background:var(--panel); border:1px solid var(--border); border-radius:12px; padding:12px}
+                div[data-testid="stMetricValue"],div[data-testid="stMetricLabel"]{color:var(--text)!important}
+                .stRadio>div,.stSelectbox,.stSlider,.stDataFrame{background:var(--panel)!important; border-radius:10px}
+
+                /* Poster grid card */
+                .poster-card{
+                    background:linear-gradient(180deg, rgba(255,255,255,0.02), rgba(255,255,255,0.00));
+                    border:1px solid var(--border);
+                    border-radius:14px; padding:10px; transition:transform .18s ease, box-shadow .18s ease, border-color .18s ease;
+                    overflow:hidden; position:relative; margin-bottom:18px;
+                }
+                .poster-img{width:100%; height:auto; border-radius:10px; display:block;}
+                .poster-meta{font-size:15px; color:var(--muted); margin-top:6px}
+                .poster-title{font-weight:600; margin-top:8px; font-size:20px; color:var(--text)}
+                .poster-imdb{margin-top:4px; font-size:18px; font-weight:600; color:var(--text)}
+                .provider-row{display:flex; flex-wrap:wrap; gap:6px; margin-top:8px; margin-bottom:4px;}
+                .prov-logo{width:39px; height:39px
+                ; border-radius:7px; background:#233042; padding:4px; object-fit:contain;}
+                .prov-pill{display:inline-block; height:32px; line-height:30px; padding:0 10px; border-radius:7px; background:#233042; color:var(--text); font-size:11px; border:1px solid var(--border)}
+                .poster-card:hover{ transform:scale(1.03); border-color: rgba(58,160,255,.85); box-shadow:0 6px 26px rgba(58,160,255,.18), 0 2px 10px rgba(0,0,0,.35); }
+
+                /* Tighter grid spacing between rows */
+                .stColumns > div { padding-bottom: 6px; }
+                </style>
+            """, unsafe_allow_html=True)
+        else:
+            # Light theme polish (keeps logos same size)
+            st.markdown("""
+                <style>
+                :root { --panel:#ffffff; --border:#e6e8ec; --text:#0f1720; --muted:#586273; --halo:#2b7fff; }
+                .segment{ background:var(--panel); border:1px solid var(--border); border-radius:14px; padding:16px 18px; margin:16px 0 20px 0; }
+                .poster-card{ background:#fff; border:1px solid var(--border); border-radius:14px; padding:10px; transition:transform .18s ease, box-shadow .18s ease, border-color .18s ease; margin-bottom:18px;}
+                .poster-img{width:100%; height:auto; border-radius:10px;}
+                .poster-title{font-weight:600; margin-top:8px; font-size:20px; color:var(--text)}
+                .poster-imdb{margin-top:4px; font-size:18px; font-weight:600; color:var(--text)}
+                .poster-meta{font-size:15px; color:var(--muted); margin-top:6px}
+                .provider-row{display:flex; flex-wrap:wrap; gap:6px; margin-top:8px; margin-bottom:4px;}
+                .prov-logo{width:39px; height:39px; border-radius:7px; background:#eef3ff; padding:4px; object-fit:contain; border:1px solid #e5ecff;}
+                .prov-pill{display:inline-block; height:32px; line-height:30px; padding:0 10px; border-radius:7px; background:#eef3ff; color:#1c2735; font-size:11px; border:1px solid #e5ecff}
+                .poster-card:hover{ transform:scale(1.03); border-color: var(--halo); box-shadow:0 6px 24px rgba(43,127,255,.18), 0 2px 10px rgba(16,24,40,.08); }
+                .stColumns > div { padding-bottom: 6px; }
+                </style>
+            """, unsafe_allow_html=True)
+
+
+
+
+
+        st.title("Trending — Media Analytics")
+
+        with st.expander("About these metrics (click to expand)", expanded=False):
+            st.markdown(
+                """
+        **What you’re seeing**
+
+        - **Trending** surfaces titles getting the most attention on TMDB **today** (or **this week**).
+        - **Popularity** is TMDB’s relative trending score (higher = more current momentum). Not a count of views.
+        - **Vote average** is the average user rating (0–10).  
+        - **Vote count** is how many ratings a title has received.
 
-# ---- Controls
-col1, col2, col3, col4 = st.columns([1,1,2,1])
-with col1:
-    horizon = st.radio("Time horizon", ["Today", "This Week"], index=0,
-                       help="‘Today’ = last 24h trending. ‘This Week’ = rolling 7 days.")
-with col2:
-    content_type = st.selectbox("Content type", ["All", "Movies", "TV"],
-                                help="Filter to movies only, TV series only, or keep all.")
-with col3:
-    display_limit = st.slider("Number of titles to display", 5, 50, 20, 5,
-                              help="Controls how many items appear in the table and charts.")
-with col4:
-    country = st.selectbox("Country", ["US","IN","GB","CA","AU","DE","FR","BR","MX"],
-                           help="Used for streaming availability (watch/providers).")
-show_availability = st.checkbox("Show streaming availability under posters", value=True)
-
-
-tmdb_file = DATA / "tmdb_trending.parquet"
-if not tmdb_file.exists():
-    st.info("No TMDB data yet. Run `python run_fetch_all.py` once, or use the fetch button below.")
-    # On-demand fetch (TODAY) if available
-    if HAVE_FETCH and st.button("Fetch latest (Today)"):
-        asyncio.run(fetch_tmdb_trending("all", "day"))
-        st.rerun()
-    st.stop()
-
-df_all = pd.read_parquet(tmdb_file)
-selected_window = "day" if horizon == "Today" else "week"
-df = df_all[df_all.get("window", "day") == selected_window].copy()
-
-# If there's no data for this horizon, offer to fetch it now
-if df.empty:
-    st.warning("No rows for the selected horizon. Pull the latest for this view.")
-    if HAVE_FETCH and st.button(f"Fetch latest ({'Today' if selected_window=='day' else 'This Week'})"):
-        asyncio.run(fetch_tmdb_trending("all", selected_window))
-        st.rerun()
-    st.stop()
-
-# Choose the most complete batch (same timestamp for a full pull)
-batch_counts = df["ts"].value_counts()
-best_ts = batch_counts.index[0]
-latest = df[df["ts"] == best_ts].copy()
-
-# Apply content filter
-if content_type == "Movies":
-    latest = latest[latest["media_type"] == "movie"].copy()
-elif content_type == "TV":
-    latest = latest[latest["media_type"] == "tv"].copy()
-
-# --- Headline metrics
-st.markdown("### Snapshot")
-m1, m2, m3 = st.columns(3)
-total_titles = len(latest)
-m1.metric("Titles in view", f"{total_titles}")
-
-median_pop = latest["popularity"].dropna().median() if total_titles else None
-m2.metric("Median popularity", f"{median_pop:.1f}" if median_pop is not None else "–",
-          help="TMDB’s relative trending score (higher = more momentum).")
-
-avg_rating = latest["vote_average"].dropna().mean() if total_titles else None
-m3.metric("Average user rating", f"{avg_rating:.1f}" if avg_rating is not None else "–",
-          help="Average of TMDB user ratings on a 0–10 scale.")
-
-# --- Poster gallery (10 per row, up to 2 rows → 20 max). No deprecated args.
-st.markdown("### Trending gallery")
-if "poster_path" in latest.columns and latest["poster_path"].notna().any():
-    gallery = latest.sort_values("popularity", ascending=False).head(min(display_limit, 20)).reset_index(drop=True)
-
-    # Make exactly 10 columns per row
-    def render_row(df_row):
-        df_row = df_row.reset_index(drop=True)
-        cols = st.columns(10, gap="small")
-
-        for j, row in df_row.iterrows():
-            with cols[j]:
-                # Fetch availability (cached)
-                avail = {}
-                if show_availability:
-                    try:
-                        avail = get_availability_cached(int(row["id"]), row["media_type"], country) or {}
-                    except Exception:
-                        avail = {}
-                show_list = (avail.get("flatrate") or
-                            avail.get("rent") or
-                            avail.get("buy") or
-                            avail.get("free") or
-                            avail.get("ads") or [])
-
-                # IMDb rating (cached)
-                stats = {}
-                try:
-                    stats = get_imdb_stats_cached(int(row["id"]), row["media_type"]) or {}
-                except Exception:
-                    stats = {}
-                imdb_rating = stats.get("imdbRating")
-                imdb_votes = (stats.get("imdbVotes") or "").replace(",", " ")
-                imdb_line = f"IMDb {imdb_rating} / 10 • {imdb_votes} votes" if imdb_rating else "IMDb N/A / 10 • N/A votes"
-
-                # Build provider badges
-                badges = []
-                for name, logo in show_list[:6]:
-                    if logo:
-                        badges.append(f'<img class="prov-logo" src="https://image.tmdb.org/t/p/w45{logo}" alt="{name}"/>')
-                    else:
-                        safe = (name or "Provider").replace('"','&quot;')
-                        badges.append(f'<span class="prov-pill">{safe}</span>')
-                if not badges and show_availability:
-                    badges.append(f'<span class="prov-pill" title="No provider data for region">No info</span>')
-
-                poster_url = f"{POSTER_BASE}{row['poster_path']}" if row.get("poster_path") else ""
-                title = (row.get("title") or "").replace("<","&lt;").replace(">","&gt;")
-                # cleaner meta: “movie • Popularity 290.3”
-                meta = f"{(row.get('media_type') or '').lower()} • Popularity {row.get('popularity',0):.1f}"
-
-                html = f"""
-                <div class="poster-card">
-                {'<img class="poster-img" src="'+poster_url+'" />' if poster_url else ''}
-                <div class="poster-imdb">{imdb_line}</div>
-                <div class="poster-title">{title}</div>
-                <div class="poster-meta">{meta}</div>
-                <div class="provider-row">{''.join(badges)}</div>
-                </div>
+        Use **Time horizon** to switch between Today and This Week. Use **Content type** to filter.
                 """
-                st.markdown(html, unsafe_allow_html=True)
+            )
+
+        # ---- Controls
+        col1, col2, col3, col4 = st.columns([1,1,2,1])
+        with col1:
+            horizon = st.radio("Time horizon", ["Today", "This Week"], index=0,
+                               help="‘Today’ = last 24h trending. ‘This Week’ = rolling 7 days.")
+        with col2:
+            content_type = st.selectbox("Content type", ["All", "Movies", "TV"],
+                                        help="Filter to movies only, TV series only, or keep all.")
+        with col3:
+            display_limit = st.slider("Number of titles to display", 5, 50, 20, 5,
+                                      help="Controls how many items appear in the table and charts.")
+        with col4:
+            country = st.selectbox("Country", ["US","IN","GB","CA","AU","DE","FR","BR","MX"],
+                                   help="Used for streaming availability (watch/providers).")
+        show_availability = st.checkbox("Show streaming availability under posters", value=True)
+
+
+        tmdb_file = DATA / "tmdb_trending.parquet"
+        if not tmdb_file.exists():
+            st.info("No TMDB data yet. Run `python run_fetch_all.py` once, or use the fetch button below.")
+            # On-demand fetch (TODAY) if available
+            if HAVE_FETCH and st.button("Fetch latest (Today)"):
+                fetch_and_publish("day")
+                st.rerun()
+            st.stop()
+
+        selected_window = "day" if horizon == "Today" else "week"
+        # Latest enriched pull from the ETL's memory-mapped snapshot, as long as it
+        # holds the pull the history would give; otherwise the most complete batch
+        # (same timestamp for a full pull), selected in DuckDB so only that pull is
+        # read out of the trending history
+        with prof.span("load_batch"):
+            version = snapshot_version(selected_window)
+            snapshot = get_snapshot(selected_window, version)
+            if snapshot is not None and snapshot_ts(snapshot) == get_latest_ts(query_conn, selected_window, store_version("trending")):
+                latest = get_snapshot_frame(selected_window, version)
+            else:
+                latest = latest_batch(query_conn, selected_window)
+
+        # If there's no data for this horizon, offer to fetch it now
+        if latest.empty:
+            st.warning("No rows for the selected horizon. Pull the latest for this view.")
+            if HAVE_FETCH and st.button(f"Fetch latest ({'Today' if selected_window=='day' else 'This Week'})"):
+                fetch_and_publish(selected_window)
+                st.rerun()
+            st.stop()
+
+        # Apply content filter
+        if content_type == "Movies":
+            latest = latest[latest["media_type"] == "movie"].copy()
+        elif content_type == "TV":
+            latest = latest[latest["media_type"] == "tv"].copy()
+
+        # --- Headline metrics
+        st.markdown("### Snapshot")
+        m1, m2, m3 = st.columns(3)
+        total_titles = len(latest)
+        m1.metric("Titles in view", f"{total_titles}")
+
+        median_pop = latest["popularity"].dropna().median() if total_titles else None
+        m2.metric("Median popularity", f"{median_pop:.1f}" if median_pop is not None else "–",
+                  help="TMDB’s relative trending score (higher = more momentum).")
+
+        avg_rating = latest["vote_average"].dropna().mean() if total_titles else None
+        m3.metric("Average user rating", f"{avg_rating:.1f}" if avg_rating is not None else "–",
+                  help="Average of TMDB user ratings on a 0–10 scale.")
+
+        # --- Poster gallery (10 per row, up to 2 rows → 20 max). No deprecated args.
+        st.markdown("### Trending gallery")
+        if "poster_path" in latest.columns and latest["poster_path"].notna().any():
+            gallery = latest.sort_values("popularity", ascending=False).head(min(display_limit, 20)).reset_index(drop=True)
+
+            # Enrichment carried forward by the ETL (only new/stale titles are re-fetched there);
+            # live lookups below are just the fallback for titles it hasn't reached yet
+            with prof.span("enrichment"):
+                enriched = enrichment_from_snapshot(gallery)
+                if not enriched:
+                    cached = enrichment_for(query_conn, gallery["id"].tolist())
+                    enriched = {(int(r["id"]), r["media_type"]): r for r in cached.to_dict("records")}
+
+                # Titles it hasn't reached (or without providers for this country)
+                # are looked up live, all together instead of card by card
+                live_titles = []
+                for key in zip(gallery["id"].astype(int), gallery["media_type"]):
+                    cached_row = enriched.get(key)
+                    if cached_row is None:
+                        live_titles.append((*key, True))
+                    elif show_availability and country not in json.loads(cached_row["providers"]):
+                        live_titles.append((*key, False))
+                live = get_live_enrichment(tuple(live_titles)) if live_titles else {}
+
+            # Make exactly 10 columns per row
+            def render_row(df_row):
+                df_row = df_row.reset_index(drop=True)
+                cols = st.columns(10, gap="small")
+
+                for j, row in df_row.iterrows():
+                    with cols[j]:
+                        with prof.span("enrichment"):
+                            cached_row = enriched.get((int(row["id"]), row["media_type"]))
+                            details, live_stats = live.get((int(row["id"]), row["media_type"]), ({}, {}))
+
+                            # Availability (enrichment cache, else the live lookup)
+                            avail = {}
+                            if show_availability:
+                                region_avail = json.loads(cached_row["providers"]).get(country) if cached_row else None
+                                if region_avail is not None:
+                                    avail = region_avail
+                                elif details:
+                                    avail = providers_for_region(details, country)
+                            show_list = (avail.get("flatrate") or
+                                        avail.get("rent") or
+                                        avail.get("buy") or
+                                        avail.get("free") or
+                                        avail.get("ads") or [])
+
+                            # IMDb rating (enrichment cache, else the live lookup)
+                            stats = live_stats
+                            if cached_row:
+                                # titles without an imdb_id (or an OMDb miss) carry null/NaN here
+                                stats = {key: cached_row[col]
+                                         for key, col in (("imdbRating", "imdb_rating"), ("imdbVotes", "imdb_votes"))
+                                         if pd.notna(cached_row.get(col))}
+                            imdb_rating = stats.get("imdbRating")
+                            imdb_votes = (stats.get("imdbVotes") or "").replace(",", " ")
+                            imdb_line = f"IMDb {imdb_rating} / 10 • {imdb_votes} votes" if imdb_rating else "IMDb N/A / 10 • N/A votes"
+
+                        with prof.span("gallery_html"):
+                            # Build provider badges
+                            badges = []
+                            for name, logo in show_list[:6]:
+                                if logo:
+                                    badges.append(f'<img class="prov-logo" src="https://image.tmdb.org/t/p/w45{logo}" alt="{name}"/>')
+                                else:
+                                    safe = (name or "Provider").replace('"','&quot;')
+                                    badges.append(f'<span class="prov-pill">{safe}</span>')
+                            if not badges and show_availability:
+                                badges.append(f'<span class="prov-pill" title="No provider data for region">No info</span>')
+
+                            poster_url = f"{POSTER_BASE}{row['poster_path']}" if row.get("poster_path") else ""
+                            title = (row.get("title") or "").replace("<","&lt;").replace(">","&gt;")
+                            # cleaner meta: “movie • Popularity 290.3”
+                            meta = f"{(row.get('media_type') or '').lower()} • Popularity {row.get('popularity',0):.1f}"
+
+                            html = f"""
+                            <div class="poster-card">
+                            {'<img class="poster-img" src="'+poster_url+'" />' if poster_url else ''}
+                            <div class="poster-imdb">{imdb_line}</div>
+                            <div class="poster-title">{title}</div>
+                            <div class="poster-meta">{meta}</div>
+                            <div class="provider-row">{''.join(badges)}</div>
+                            </div>
+                            """
+                            st.markdown(html, unsafe_allow_html=True)
 
       
 
-    # First row (0..9)
-    render_row(gallery.iloc[0:10])
-    # Second row (10..19) if present
-    if len(gallery) > 10:
-        render_row(gallery.iloc[10:20])
-else:
-    st.caption("No poster images available in this pull.")
+            # First row (0..9)
+            render_row(gallery.iloc[0:10])
+            # Second row (10..19) if present
+            if len(gallery) > 10:
+                render_row(gallery.iloc[10:20])
+        else:
+            st.caption("No poster images available in this pull.")
 
 
-# --- Detailed table (dark-mode aware, compact, larger font) ---
+        # --- Detailed table (dark-mode aware, compact, larger font) ---
 
 
-# --- Popularity leaderboard
-import plotly.express as px
+        # --- Popularity leaderboard
+        import plotly.express as px
 
-import altair as alt
-import streamlit as st
+        import altair as alt
+        import streamlit as st
 
-st.set_page_config(layout="wide")
+        st.set_page_config(layout="wide")
 
-# ---- Side-by-side layout: table (left) + chart (right)
-# How many rows are actually visible
-rows_to_show = min(display_limit, len(latest))
+        # ---- Side-by-side layout: table (left) + chart (right)
+        # How many rows are actually visible
+        rows_to_show = min(display_limit, len(latest))
 
-# Make columns a bit flexible but still left (table) / right (chart)
-# 1 : 1.4 works well on most screens
-left, right = st.columns((1, 1.4))
+        # Make columns a bit flexible but still left (table) / right (chart)
+        # 1 : 1.4 works well on most screens
+        left, right = st.columns((1, 1.4))
 
-with left:
-    st.markdown("### Detailed results")
+        with left, prof.span("table"):
+            st.markdown("### Detailed results")
 
-    # Build the data you show now
-    tbl = (
-        latest[["title", "media_type", "popularity", "vote_average", "vote_count", "release_date"]]
-        .sort_values("popularity", ascending=False)
-        .head(display_limit)
-        .reset_index(drop=True)
-    )
+            # Build the data you show now (trailer views come from the YouTube cache, if any)
+            table_cols = ["title", "media_type", "popularity", "vote_average", "vote_count", "release_date"]
+            with_trailers = join_trailer_stats(latest, get_trailer_stats(trailer_cache_versions()))
+            if with_trailers["trailer_views"].notna().any():
+                table_cols.append("trailer_views")
+            tbl = (
+                with_trailers[table_cols]
+                .sort_values("popularity", ascending=False)
+                .head(display_limit)
+                .reset_index(drop=True)
+            )
 
-    # Add a 1-based row index column named '#'
-    tbl.index = tbl.index + 1
-    tbl = tbl.rename_axis("#").reset_index()
-
-    if dark_mode:
-        table_styles = [
-            {"selector": "table",
-             "props": [("background-color", "#141a22"),
-                       ("color", "#e8edf3"),
-                       ("border-collapse", "collapse"),
-                       ("font-size", "14px")]},
-            {"selector": "th",
-             "props": [("background-color", "#0b0f15"),
-                       ("color", "#e8edf3"),
-                       ("font-weight", "600"),
-                       ("border", "1px solid #253041"),
-                       ("padding", "6px 12px")]},
-            {"selector": "td",
-             "props": [("border", "1px solid #253041"),
-                       ("padding", "6px 12px")]},
-            {"selector": "tbody tr:nth-child(even)",
-             "props": [("background-color", "#161c25")]},
-            {"selector": "tbody tr:hover",
-             "props": [("background-color", "#1f2733")]},
-        ]
-    else:
-        table_styles = [
-            {"selector": "table",
-             "props": [("background-color", "#ffffff"),
-                       ("color", "#0f1720"),
-                       ("border-collapse", "collapse"),
-                       ("font-size", "14px")]},
-            {"selector": "th",
-             "props": [("background-color", "#f5f6fa"),
-                       ("color", "#0f1720"),
-                       ("font-weight", "600"),
-                       ("border", "1px solid #e6e8ec"),
-                       ("padding", "6px 12px")]},
-            {"selector": "td",
-             "props": [("border", "1px solid #e6e8ec"),
-                       ("padding", "6px 12px")]},
-            {"selector": "tbody tr:nth-child(even)",
-             "props": [("background-color", "#fafafa")]},
-            {"selector": "tbody tr:hover",
-             "props": [("background-color", "#eef3ff")]},
-        ]
-
-    styled = (
-        tbl.style
-        .set_table_styles(table_styles)
-        .set_properties(
-            subset=["popularity", "vote_average", "vote_count"],
-            **{"text-align": "right"},
-        )
-    )
+            # Add a 1-based row index column named '#'
+            tbl.index = tbl.index + 1
+            tbl = tbl.rename_axis("#").reset_index()
+
+            if dark_mode:
+                table_styles = [
+                    {"selector": "table",
+                     "props": [("background-color", "#141a22"),
+                               ("color", "#e8edf3"),
+                               ("border-collapse", "collapse"),
+                               ("font-size", "14px")]},
+                    {"selector": "th",
+                     "props": [("background-color", "#0b0f15"),
+                               ("color", "#e8edf3"),
+                               ("font-weight", "600"),
+                               ("border", "1px solid #253041"),
+                               ("padding", "6px 12px")]},
+                    {"selector": "td",
+                     "props": [("border", "1px solid #253041"),
+                               ("padding", "6px 12px")]},
+                    {"selector": "tbody tr:nth-child(even)",
+                     "props": [("background-color", "#161c25")]},
+                    {"selector": "tbody tr:hover",
+                     "props": [("background-color", "#1f2733")]},
+                ]
+            else:
+                table_styles = [
+                    {"selector": "table",
+                     "props": [("background-color", "#ffffff"),
+                               ("color", "#0f1720"),
+                               ("border-collapse", "collapse"),
+                               ("font-size", "14px")]},
+                    {"selector": "th",
+                     "props": [("background-color", "#f5f6fa"),
+                               ("color", "#0f1720"),
+                               ("font-weight", "600"),
+                               ("border", "1px solid #e6e8ec"),
+                               ("padding", "6px 12px")]},
+                    {"selector": "td",
+                     "props": [("border", "1px solid #e6e8ec"),
+                               ("padding", "6px 12px")]},
+                    {"selector": "tbody tr:nth-child(even)",
+                     "props": [("background-color", "#fafafa")]},
+                    {"selector": "tbody tr:hover",
+                     "props": [("background-color", "#eef3ff")]},
+                ]
+
+            styled = (
+                tbl.style
+                .set_table_styles(table_styles)
+                .set_properties(
+                    subset=[c for c in ("popularity", "vote_average", "vote_count", "trailer_views") if c in tbl.columns],
+                    **{"text-align": "right"},
+                )
+            )
 
-    st.markdown(styled.to_html(), unsafe_allow_html=True)
+            st.markdown(styled.to_html(), unsafe_allow_html=True)
 
-with right:
-    st.markdown("### Popularity leaderboard")
+        with right, prof.span("altair_chart"):
+            st.markdown("### Popularity leaderboard")
 
-    # Build a compact data frame for the chart
-    chart_df = (
-        latest[["title", "popularity"]]
-        .sort_values("popularity", ascending=False)
-        .head(display_limit)
-        .reset_index(drop=True)
-    )
+            # Build a compact data frame for the chart
+            chart_df = (
+                latest[["title", "popularity"]]
+                .sort_values("popularity", ascending=False)
+                .head(display_limit)
+                .reset_index(drop=True)
+            )
 
-    # Theme bits for dark vs light
-    if dark_mode:
-        axis_color = "#e8edf3"
-        grid_color = "#263243"
-        bar_color  = "#6aa8ff"
-        bg_color   = "#0b0f15"
-    else:
-        axis_color = "#0f1720"
-        grid_color = "#e6e8ec"
-        bar_color  = "#4e89ff"
-        bg_color   = "white"
-
-    # 🔹 Make bar thickness and chart height depend on how many rows we show
-    # - fewer rows -> thicker bars / shorter chart
-    # - more rows  -> thinner bars / taller chart
-    bar_size = max(16, int(40 - 0.8 * rows_to_show))     # never less than 16
-    chart_height = int(40 * rows_to_show + 80)           # header + margin
-
-    # Base bars
-    bars = (
-        alt.Chart(chart_df)
-        .mark_bar(size=bar_size, color=bar_color)
-        .encode(
-            x=alt.X(
-                "title:N",
-                sort=None,
-                axis=alt.Axis(title=None, labels=False, ticks=False, domain=False),
-            ),
-            y=alt.Y(
-                "popularity:Q",
-                axis=alt.Axis(title="Popularity"),
-            ),
-            tooltip=["title:N", "popularity:Q"],
-        )
-        .properties(height=chart_height)
-    )
+            # Theme bits for dark vs light
+            if dark_mode:
+                axis_color = "#e8edf3"
+                grid_color = "#263243"
+                bar_color  = "#6aa8ff"
+                bg_color   = "#0b0f15"
+            else:
+                axis_color = "#0f1720"
+                grid_color = "#e6e8ec"
+                bar_color  = "#4e89ff"
+                bg_color   = "white"
+
+            # 🔹 Make bar thickness and chart height depend on how many rows we show
+            # - fewer rows -> thicker bars / shorter chart
+            # - more rows  -> thinner bars / taller chart
+            bar_size = max(16, int(40 - 0.8 * rows_to_show))     # never less than 16
+            chart_height = int(40 * rows_to_show + 80)           # header + margin
+
+            # Base bars
+            bars = (
+                alt.Chart(chart_df)
+                .mark_bar(size=bar_size, color=bar_color)
+                .encode(
+                    x=alt.X(
+                        "title:N",
+                        sort=None,
+                        axis=alt.Axis(title=None, labels=False, ticks=False, domain=False),
+                    ),
+                    y=alt.Y(
+                        "popularity:Q",
+                        axis=alt.Axis(title="Popularity"),
+                    ),
+                    tooltip=["title:N", "popularity:Q"],
+                )
+                .properties(height=chart_height)
+            )
 
-    # Labels only for Top-3 bars, with larger font
-    top3_labels = (
-        alt.Chart(chart_df)
-        .transform_window(rank="rank(popularity)")
-        .transform_filter("datum.rank <= 3")
-        .mark_text(
-            dy=-8,
-            fontSize=16,
-            fontWeight="bold",
-            color=axis_color,
-        )
-        .encode(
-            x=alt.X("title:N", sort=None,
-                    axis=alt.Axis(title=None, labels=False, ticks=False, domain=False)),
-            y="popularity:Q",
-            text="title:N",
-        )
-    )
+            # Labels only for Top-3 bars, with larger font
+            top3_labels = (
+                alt.Chart(chart_df)
+                .transform_window(rank="rank(popularity)")
+                .transform_filter("datum.rank <= 3")
+                .mark_text(
+                    dy=-8,
+                    fontSize=16,
+                    fontWeight="bold",
+                    color=axis_color,
+                )
+                .encode(
+                    x=alt.X("title:N", sort=None,
+                            axis=alt.Axis(title=None, labels=False, ticks=False, domain=False)),
+                    y="popularity:Q",
+                    text="title:N",
+                )
+            )
 
-    chart = (
-        bars + top3_labels
-    ).configure_axis(
-        labelColor=axis_color,
-        titleColor=axis_color,
-        gridColor=grid_color,
-        domainColor=bg_color,
-        tickColor=axis_color,
-    ).configure_axisX(
-        domain=False, ticks=False, labels=False
-    ).configure_view(
-        stroke=None, strokeOpacity=0, fill=bg_color
-    )
+            chart = (
+                bars + top3_labels
+            ).configure_axis(
+                labelColor=axis_color,
+                titleColor=axis_color,
+                gridColor=grid_color,
+                domainColor=bg_color,
+                tickColor=axis_color,
+            ).configure_axisX(
+                domain=False, ticks=False, labels=False
+            ).configure_view(
+                stroke=None, strokeOpacity=0, fill=bg_color
+            )
 
-    st.altair_chart(chart, use_container_width=True)
+            st.altair_chart(chart, use_container_width=True)
 
 
 
-# --- Quality vs audience scale
-st.markdown("### Quality vs audience scale")
-st.caption("Higher **vote average** with larger **vote count** suggests broadly liked, widely rated titles.")
-scatter_df = latest[["title","vote_average","vote_count"]].dropna()
-fig_scatter = px.scatter(
-    scatter_df,
-    x="vote_count",
-    y="vote_average",
-    hover_name="title",
-    color_discrete_sequence=["#3aa0ff"],
-)
-fig_scatter.update_layout(
-    template="plotly_dark" if dark_mode else "plotly_white",
-    paper_bgcolor="rgba(0,0,0,0)",
-    plot_bgcolor="rgba(0,0,0,0)",
-    font=dict(color="#e8edf3" if dark_mode else "#0f1720"),
-)
-st.plotly_chart(fig_scatter, use_container_width=True)
-
-
-# --- API perf section
-API_visible = st.toggle("API Performance", value=False, help="Toggle a API Performance dashboard.")
-if API_visible:
-    st.markdown("---")
-    st.header("API Performance")
-    st.caption("Response time and payload size for recent TMDB trending calls.")
-    perf_file = DATA / "perf_log.parquet"
-    if perf_file.exists():
-        perf = pd.read_parquet(perf_file).sort_values("ts", ascending=False)
-        st.dataframe(perf, use_container_width=True)
-        st.line_chart(perf, x="ts", y="latency_ms", color="provider")
-        st.line_chart(perf, x="ts", y="bytes", color="provider")
-        
-
-# --- OMDb usage summary (requests per day) ---
-        if not perf.empty:
-    # Ensure ts is a proper datetime column
-            if not pd.api.types.is_datetime64_any_dtype(perf["ts"]):
-                perf["ts"] = pd.to_datetime(perf["ts"], errors="coerce", utc=True)
-
-            perf["ts_date"] = perf["ts"].dt.date
-
-            omdb_daily = (
-                perf[perf["provider"] == "omdb"]
-                .groupby("ts_date")
-                .size()
-                .reset_index(name="requests")
-                .sort_values("ts_date", ascending=False)
+        # --- Quality vs audience scale
+        st.markdown("### Quality vs audience scale")
+        st.caption("Higher **vote average** with larger **vote count** suggests broadly liked, widely rated titles.")
+        with prof.span("plotly_chart"):
+            scatter_df = latest[["title","vote_average","vote_count"]].dropna()
+            fig_scatter = px.scatter(
+                scatter_df,
+                x="vote_count",
+                y="vote_average",
+                hover_name="title",
+                color_discrete_sequence=["#3aa0ff"],
+            )
+            fig_scatter.update_layout(
+                template="plotly_dark" if dark_mode else "plotly_white",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#e8edf3" if dark_mode else "#0f1720"),
+            )
+            st.plotly_chart(fig_scatter, use_container_width=True)
+
+
+        # --- Search the trending history (SQLite index kept current by the ETL)
+        st.markdown("### Search trending history")
+        query = st.text_input("Title", placeholder="e.g. spider verse",
+                              help="Matches the start of each word, ignoring case, accents and punctuation.")
+        if query:
+            with prof.span("search"):
+                hits = search_titles(query, limit=20)
+            if hits.empty:
+                st.info("No title in the trending history matches that search.")
+            else:
+                st.dataframe(hits, use_container_width=True, hide_index=True)
+                labels = [f"{r.title} ({r.media_type}, {r.appearances} pulls)" for r in hits.itertuples()]
+                pick = st.selectbox("Appearances for", range(len(hits)), format_func=lambda i: labels[i])
+                chosen = hits.iloc[pick]
+                apps = appearances_for(int(chosen["id"]), chosen["media_type"])
+                if len(apps):
+                    apps["ts"] = pd.to_datetime(apps["ts"])
+                    st.line_chart(apps, x="ts", y="rank", color="window")
+                    st.dataframe(apps, use_container_width=True, hide_index=True)
+
+
+        # --- API perf section
+        API_visible = st.toggle("API Performance", value=False, help="Toggle a API Performance dashboard.")
+        if API_visible:
+            with prof.span("perf_panel"):
+                st.markdown("---")
+                st.header("API Performance")
+                st.caption("Response time and payload size for recent TMDB trending calls.")
+                perf_file = DATA / "perf_log.parquet"
+                if perf_file.exists():
+                    perf = perf_recent(query_conn)
+                    st.dataframe(perf, use_container_width=True)
+                    st.line_chart(perf, x="ts", y="latency_ms", color="provider")
+                    st.line_chart(perf, x="ts", y="bytes", color="provider")
+                    if "concurrency_limit" in perf.columns and perf["concurrency_limit"].notna().any():
+                        st.markdown("#### Adaptive concurrency limit")
+                        st.line_chart(perf.dropna(subset=["concurrency_limit"]), x="ts", y="concurrency_limit", color="provider")
+
+                    st.markdown("#### Latency by endpoint")
+                    st.dataframe(endpoint_latency(query_conn), use_container_width=True)
+
+                    # --- OMDb usage summary (requests per day), aggregated in DuckDB ---
+                    omdb_daily = provider_daily_usage(query_conn, "omdb", days=7)
+                    if not omdb_daily.empty:
+                        st.markdown("#### OMDb usage (requests per day)")
+                        st.dataframe(omdb_daily, use_container_width=True)
+                else:
+                    st.info("No performance logs yet. They’re created when you fetch data.")
+
+
+        st.caption(
+                "Data & images: The Movie Database (TMDB). "
+                "This product uses the TMDB API but is not endorsed or certified by TMDB."
+            )
+        st.caption(
+                "Ratings: OMDb API. This product uses the OMDb API but is not endorsed or certified by OMDb."
             )
-
-            st.markdown("#### OMDb usage (requests per day)")
-            st.dataframe(omdb_daily.head(7), use_container_width=True)
-    else:
-        st.info("No performance logs yet. They’re created when you fetch data.")
 
 
-st.caption(
-        "Data & images: The Movie Database (TMDB). "
-        "This product uses the TMDB API but is not endorsed or certified by TMDB."
-    )
-st.caption(
-        "Ratings: OMDb API. This product uses the OMDb API but is not endorsed or certified by OMDb."
-    )
+        # --- Developer mode: per-rerun stage timings (opt-in, see utils/profiling.py)
+        if prof.enabled:
+            prof.finish()
+            with st.expander("Developer mode: rerun profile", expanded=False):
+                st.caption("This rerun: " + ", ".join(f"{k} {v:.0f} ms" for k, v in prof.stages.items()))
+                if st.button("Capture a sampling profile of the next rerun"):
+                    st.session_state["capture_profile"] = True
+                    st.rerun()
+                st.markdown("#### Slowest stages (last 50 reruns)")
+                st.dataframe(slowest_stages(query_conn, reruns=50), use_container_width=True)
+                report = latest_report()
+                if report is not None:
+                    st.download_button(f"Download {report.name}", report.read_bytes(), file_name=report.name)
+    finally:
+        prof.finish()
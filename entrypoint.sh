@@ -13,6 +13,11 @@ FETCH_INTERVAL_SECONDS=3600   # 3600 = 1 hour, change if you want
   done
 ) &
 
+# Read-only JSON API over the same local stores (for bots / BI tools)
+API_PORT="${API_PORT:-8000}"
+echo "[entrypoint] Starting JSON API on port ${API_PORT}..."
+uvicorn api_server:app --host 0.0.0.0 --port "$API_PORT" &
+
 echo "[entrypoint] Starting Streamlit..."
 exec streamlit run app_streamlit.py \
     --server.port=8501 \
@@ -0,0 +1,267 @@
+# etl_enrich.py
+"""
+Per-title enrichment (IMDb id + rating, streaming providers) run through
+the durable job queue in utils/job_queue.py.
+
+Each title is one task keyed by "<media_type>:<id>". Results are stored in
+the queue as each task completes, so a run that dies halfway resumes with
+only the unfinished titles, and data/enrichment_cache.parquet is rebuilt
+from the stored results at the end of every drain.
+
+Most of the trending list is the same between hourly pulls, so each pull
+is diffed against the previous one (data/tmdb_batch_diff.parquet) and only
+new titles plus a small rotating slice of stale ones are re-enriched.
+"""
+import os
+import json
+import socket
+import asyncio
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from etl_fetch import DATA_DIR
+from utils.job_queue import JobQueue
+
+ENRICH_KIND = "enrich"
+ENRICH_TTL_HOURS = float(os.getenv("ENRICH_TTL_HOURS", "24"))
+ENRICH_REGIONS = [r.strip() for r in os.getenv("ENRICH_REGIONS", "US").split(",") if r.strip()]
+# Upper bound on titles in progress; actual request concurrency is set
+# per provider by the adaptive limiters in providers/concurrency.py
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "12"))
+# How many past-TTL titles to refresh per pull (a rotating slice)
+ENRICH_STALE_PER_PULL = int(os.getenv("ENRICH_STALE_PER_PULL", "5"))
+
+CACHE_FILE = DATA_DIR / "enrichment_cache.parquet"
+DIFF_FILE = DATA_DIR / "tmdb_batch_diff.parquet"
+
+
+def task_key(item_id, media_type: str) -> str:
+    return f"{media_type}:{int(item_id)}"
+
+
+def diff_batches(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare two pulls by (id, media_type). One row per title in either
+    pull with change = 'added' | 'removed' | 'unchanged' and its rank
+    (1-based position by popularity) in each pull.
+    """
+    def ranked(df):
+        if df is None or df.empty:
+            return pd.DataFrame(columns=["id", "media_type", "rank"])
+        out = df.sort_values("popularity", ascending=False)[["id", "media_type"]]
+        out = out.drop_duplicates(["id", "media_type"]).reset_index(drop=True)
+        out["rank"] = out.index + 1
+        return out
+
+    merged = ranked(previous).merge(
+        ranked(current), on=["id", "media_type"], how="outer",
+        suffixes=("_prev", "_new"), indicator=True,
+    )
+    merged["change"] = merged["_merge"].map(
+        {"left_only": "removed", "right_only": "added", "both": "unchanged"}
+    ).astype(str)
+    return merged.drop(columns="_merge")
+
+
+def record_diff(diff: pd.DataFrame, ts, window: str, previous_ts=None):
+    """
+    Append the diff for one pull to data/tmdb_batch_diff.parquet, replacing
+    any earlier diff for the same pull (a resumed run records it again).
+    """
+    if diff.empty:
+        return
+    df = diff.assign(ts=ts, window=window, previous_ts=previous_ts)
+    out = DIFF_FILE
+    if out.exists():
+        old = pd.read_parquet(out)
+        old = old[~((old["ts"] == ts) & (old["window"] == window))]
+        df = pd.concat([old, df], ignore_index=True)
+    df.to_parquet(out, index=False)
+
+
+def select_for_enrichment(
+    queue: JobQueue,
+    diff: pd.DataFrame,
+    ttl_hours: float = ENRICH_TTL_HOURS,
+    stale_per_pull: int = ENRICH_STALE_PER_PULL,
+) -> list[tuple[int, str]]:
+    """
+    Titles to enrich for this pull:
+      - every title in the current pull that has no stored enrichment
+        (new entries, or ones never finished), plus
+      - the `stale_per_pull` titles whose enrichment is oldest among those
+        past ttl_hours, so refreshes are spread over pulls instead of all
+        expiring at once.
+    Everything else is carried forward from the cache as-is.
+    """
+    enriched_at = queue.completed(ENRICH_KIND)
+    cutoff = datetime.now(timezone.utc).timestamp() - ttl_hours * 3600
+
+    present = diff[diff["change"] != "removed"]
+    missing, stale = [], []
+    for item_id, media_type in zip(present["id"], present["media_type"]):
+        done_at = enriched_at.get(task_key(item_id, media_type))
+        if done_at is None:
+            missing.append((int(item_id), media_type))
+        elif done_at < cutoff:
+            stale.append((done_at, int(item_id), media_type))
+
+    stale.sort()
+    return missing + [(i, mt) for _, i, mt in stale[:stale_per_pull]]
+
+
+def enqueue_titles(queue: JobQueue, titles) -> int:
+    """
+    Queue an enrichment task per (id, media_type). Unfinished tasks from an
+    earlier run are kept as they are. Returns how many tasks were queued.
+    """
+    queued = 0
+    for item_id, media_type in titles:
+        payload = {"id": int(item_id), "media_type": media_type, "regions": ENRICH_REGIONS}
+        queued += queue.enqueue(task_key(item_id, media_type), payload, kind=ENRICH_KIND, reset_done=True)
+    return queued
+
+
+def omdb_enabled() -> bool:
+    """True when an OMDb key is configured (providers.omdb refuses to import without one)."""
+    try:
+        import providers.omdb  # noqa: F401
+    except RuntimeError:
+        return False
+    return True
+
+
+async def enrich_title(payload: dict) -> dict:
+    """
+    Task handler. Raises on failed lookups so the queue retries them
+    instead of storing null ratings/providers for ENRICH_TTL_HOURS. Only a
+    title OMDb answers "not found" for is completed without a rating.
+    Without an OMDb key, titles are enriched from TMDB only (no ratings).
+    """
+    from providers.tmdb import fetch_tmdb_details, providers_for_region
+
+    item_id, media_type = payload["id"], payload["media_type"]
+
+    # one TMDB request: external ids + watch providers for every region
+    details = await fetch_tmdb_details(item_id, media_type)
+    if not details:
+        raise RuntimeError(f"details lookup failed for {media_type}/{item_id}")
+    imdb_id = details.get("imdb_id")
+    stats = {}
+    if imdb_id and omdb_enabled():
+        from providers.omdb import fetch_omdb_rating
+        stats = await fetch_omdb_rating(imdb_id, raise_on_error=True)
+
+    regions = payload.get("regions") or ENRICH_REGIONS
+    providers = {region: providers_for_region(details, region) for region in regions}
+
+    return {
+        "id": item_id,
+        "media_type": media_type,
+        "imdb_id": imdb_id,
+        "imdb_rating": stats.get("imdbRating"),
+        "imdb_votes": stats.get("imdbVotes"),
+        "runtime": details.get("runtime"),
+        "genres": details.get("genres") or [],
+        "providers": providers,
+    }
+
+
+async def drain(queue: JobQueue, handler=enrich_title, workers: int = ENRICH_WORKERS) -> dict:
+    """
+    Run `workers` coroutines that lease and process tasks until nothing is
+    ready. Tasks waiting on retry backoff or leased by another live process
+    are left for that process / the next run. Returns {status: count}.
+    Queue calls (SQLite, may wait on another process's write lock) run in
+    threads so they never block the event loop the lookups run on.
+    """
+    host = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def worker(n: int):
+        worker_id = f"{host}:{n}"
+        while True:
+            tasks = await asyncio.to_thread(queue.lease, worker_id, kind=ENRICH_KIND)
+            if not tasks:
+                return
+            for task in tasks:
+                try:
+                    result = await handler(task.payload)
+                except Exception as e:
+                    status = await asyncio.to_thread(queue.fail, task, repr(e))
+                    print(f"[enrich] {task.task_key} failed ({status}): {e}")
+                else:
+                    await asyncio.to_thread(queue.complete, task, result)
+
+    await asyncio.gather(*(worker(n) for n in range(workers)))
+    return await asyncio.to_thread(queue.counts, ENRICH_KIND)
+
+
+def report_dead_letters(queue: JobQueue, limit: int = 10) -> list[dict]:
+    """Print the dead-lettered titles (newest first) and return them all."""
+    dead = queue.dead_letters(ENRICH_KIND)
+    if dead:
+        print(f"[enrich] {len(dead)} dead-lettered titles "
+              f"(re-queued after {ENRICH_TTL_HOURS:g}h, or now with: python -m scripts.enrich_queue --requeue-dead)")
+        for d in dead[:limit]:
+            print(f"[enrich]   {d['task_key']} after {d['attempts']} attempts: {d['last_error']}")
+    return dead
+
+
+def export_cache(queue: JobQueue) -> pd.DataFrame:
+    """
+    Rebuild data/enrichment_cache.parquet from all completed tasks
+    (written to a temp file and swapped in, so readers never see a partial file).
+    """
+    rows = []
+    for _, result, done_at in queue.results(ENRICH_KIND):
+        rows.append({
+            "id": result["id"],
+            "media_type": result["media_type"],
+            "imdb_id": result.get("imdb_id"),
+            "imdb_rating": result.get("imdb_rating"),
+            "imdb_votes": result.get("imdb_votes"),
+            "runtime": result.get("runtime"),
+            "genres": ", ".join(result.get("genres") or []),
+            # {region: {'flatrate': [[name, logo], ...], ...}} as JSON text
+            "providers": json.dumps(result.get("providers") or {}),
+            "enriched_at": pd.Timestamp(done_at, unit="s", tz="UTC"),
+        })
+    df = pd.DataFrame(rows)
+    if len(df):
+        tmp = CACHE_FILE.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, CACHE_FILE)
+    return df
+
+
+async def run_enrichment(batch: pd.DataFrame, previous: pd.DataFrame | None = None,
+                         workers: int = ENRICH_WORKERS) -> dict:
+    """
+    Diff the batch against the previous pull of the same window, record the
+    diff, queue only new titles plus a rotating slice of stale ones, drain
+    the queue (resuming any earlier run) and export the cache.
+    Titles dead-lettered more than ENRICH_TTL_HOURS ago get another round
+    of attempts; the ones still dead afterwards are printed.
+    """
+    diff = diff_batches(previous, batch)
+    record_diff(
+        diff,
+        ts=batch["ts"].iloc[0],
+        window=batch["window"].iloc[0],
+        previous_ts=previous["ts"].iloc[0] if previous is not None and len(previous) else None,
+    )
+    counts = diff["change"].value_counts().to_dict()
+
+    queue = JobQueue()
+    try:
+        revived = queue.requeue_dead(ENRICH_KIND, older_than_s=ENRICH_TTL_HOURS * 3600)
+        titles = select_for_enrichment(queue, diff)
+        queued = enqueue_titles(queue, titles)
+        status = await drain(queue, workers=workers)
+        export_cache(queue)
+        print(f"[enrich] diff={counts} queued={queued} revived={revived} status={status}")
+        report_dead_letters(queue)
+        return status
+    finally:
+        queue.close()
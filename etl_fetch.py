@@ -1,19 +1,41 @@
 # etl_fetch.py
+import os
 import time
+import asyncio
+import threading
 from datetime import datetime, timezone
 import pathlib
 import json
 import aiohttp
 import pandas as pd
 
+from providers.concurrency import get_limiter, current_limit
+
 DATA_DIR = pathlib.Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
 def now_iso():
     return datetime.now(timezone.utc).isoformat()
 
-async def timed_get(session, url, headers=None, params=None):
-    """GET with latency & payload metrics."""
+async def timed_get(session, url, headers=None, params=None, provider=None):
+    """
+    GET with latency & payload metrics. With `provider`, the request waits
+    for a slot from that provider's adaptive concurrency limiter and feeds
+    its status/latency back into it.
+    """
+    if provider is None:
+        return await _timed_get(session, url, headers, params)
+    limiter = get_limiter(provider)
+    async with limiter.slot():
+        try:
+            result = await _timed_get(session, url, headers, params)
+        except asyncio.TimeoutError:
+            limiter.record(None, timeout=True)
+            raise
+        limiter.record(result[0], result[2] * 1000.0)
+        return result
+
+async def _timed_get(session, url, headers, params):
     t0 = time.perf_counter()
     async with session.get(url, headers=headers, params=params) as resp:
         payload = await resp.read()
@@ -26,8 +48,25 @@ async def timed_get(session, url, headers=None, params=None):
         }
         return resp.status, payload, latency, size, rate_headers
 
+_perf_lock = threading.Lock()
+
+def _append_perf_frame(df):
+    """Append to data/perf_log.parquet, swapping the new file in so readers never see a partial one."""
+    out = DATA_DIR / "perf_log.parquet"
+    with _perf_lock:
+        if out.exists():
+            old = pd.read_parquet(out)
+            df = pd.concat([old, df], ignore_index=True)
+        # pid in the name: several app processes can share data/
+        tmp = out.with_suffix(f".parquet.{os.getpid()}.tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, out)
+
 def append_perf(provider, endpoint_key, status, latency_s, bytes_len, rl_dict):
-    """Append one perf row to data/perf_log.parquet (creates if missing)."""
+    """
+    Append one perf row to data/perf_log.parquet (creates if missing).
+    concurrency_limit is the provider's adaptive in-flight limit, if it has one.
+    """
     df = pd.DataFrame([{
         "ts": now_iso(),
         "provider": provider,
@@ -38,9 +77,28 @@ def append_perf(provider, endpoint_key, status, latency_s, bytes_len, rl_dict):
         "ratelimit_limit": rl_dict.get("x-ratelimit-limit"),
         "ratelimit_remaining": rl_dict.get("x-ratelimit-remaining"),
         "retry_after": rl_dict.get("retry-after"),
+        "concurrency_limit": current_limit(provider),
     }])
-    out = DATA_DIR / "perf_log.parquet"
-    if out.exists():
-        old = pd.read_parquet(out)
-        df = pd.concat([old, df], ignore_index=True)
-    df.to_parquet(out, index=False)
+    _append_perf_frame(df)
+
+PERF_COLUMNS = [
+    "ts", "provider", "endpoint", "status", "latency_ms", "bytes",
+    "ratelimit_limit", "ratelimit_remaining", "retry_after", "concurrency_limit",
+]
+
+def append_perf_rows(rows):
+    """
+    Append perf rows produced by providers.http_client.api_get to
+    data/perf_log.parquet in one write, using the same columns as append_perf.
+    """
+    if not rows:
+        return
+    df = pd.DataFrame(rows).reindex(columns=PERF_COLUMNS)
+    # api_get stamps epoch seconds; the log stores ISO strings
+    df["ts"] = [
+        datetime.fromtimestamp(t, timezone.utc).isoformat() if isinstance(t, (int, float)) else t
+        for t in df["ts"]
+    ]
+    for col in ("ratelimit_limit", "ratelimit_remaining", "retry_after"):
+        df[col] = df[col].astype("object")
+    _append_perf_frame(df)
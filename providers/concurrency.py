@@ -0,0 +1,190 @@
+# providers/concurrency.py
+"""
+Adaptive (AIMD) concurrency limits for provider fan-out.
+
+One limiter per provider bounds how many requests are in flight at once.
+It learns the right level from the same signals the perf log records:
+
+  - additive increase: every `limit` healthy responses (roughly one round
+    of in-flight requests) the limit grows by 1;
+  - multiplicative decrease: a 429, a 5xx overload status, a timeout, or a
+    p95 latency well above the recent baseline cuts the limit by
+    `decrease_factor`. One cut per cooldown, so a burst of 429s from
+    requests already in flight counts as a single congestion event.
+
+Limiters live for the whole process, so the limit carries over between
+fetches and converges over time. Perf rows carry the provider's limit in
+a concurrency_limit column so convergence shows up in the perf panel.
+
+The app calls asyncio.run() per lookup from every session thread, so one
+limiter serves many event loops at once: its counters sit behind a
+threading lock, and a released slot is handed to the oldest waiter on
+that waiter's own loop (call_soon_threadsafe).
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+
+CONGESTION_STATUSES = {429, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        name: str,
+        *,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        decrease_factor: float = 0.5,
+        cooldown_s: float = 2.0,
+        latency_window: int = 40,
+        p95_rise: float = 2.0,
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.cooldown_s = cooldown_s
+        self.p95_rise = p95_rise
+
+        self.in_flight = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._baseline_p95 = None
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()   # (loop, future), oldest first
+
+    @property
+    def current(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait until fewer than `current` requests are in flight, then hold a slot."""
+        await self._acquire()
+        try:
+            yield self.current
+        finally:
+            self._release()
+
+    async def _acquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.in_flight < self.current:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            # resolved by _grant once a slot is counted for us
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # a slot was already counted for us (whether or not _grant has
+            # run on this loop yet): give it back
+            self._release()
+            raise
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake()
+
+    def _wake(self):
+        """Hand free slots to the oldest waiters (call with the lock held)."""
+        while self._waiters and self.in_flight < self.current:
+            loop, fut = self._waiters.popleft()
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, fut)
+            except RuntimeError:
+                # that loop has closed; its waiter is gone
+                self.in_flight -= 1
+
+    @staticmethod
+    def _grant(fut: asyncio.Future):
+        # runs on the waiter's loop; a cancelled waiter released its slot itself
+        if not fut.done():
+            fut.set_result(None)
+
+    # ---------- feedback ----------
+
+    def record(self, status: int | None, latency_ms: float | None = None, *, timeout: bool = False):
+        """Feed one response (or timeout) back into the controller."""
+        with self._lock:
+            self._record(status, latency_ms, timeout)
+            # a raised limit lets waiters in right away
+            self._wake()
+
+    def _record(self, status, latency_ms, timeout):
+        if timeout or status in CONGESTION_STATUSES:
+            self._decrease()
+            return
+
+        if latency_ms is not None:
+            self._latencies.append(latency_ms)
+            if len(self._latencies) == self._latencies.maxlen:
+                p95 = _p95(self._latencies)
+                if self._baseline_p95 is None:
+                    self._baseline_p95 = p95
+                elif p95 > self._baseline_p95 * self.p95_rise:
+                    self._latencies.clear()
+                    self._decrease()
+                    return
+                else:
+                    # track the healthy p95 slowly, so time-of-day drift isn't congestion
+                    self._baseline_p95 = 0.9 * self._baseline_p95 + 0.1 * p95
+
+        # +1 per `limit` healthy responses
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_cut < self.cooldown_s:
+            return
+        self._last_cut = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+
+
+def _p95(values) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+# ---------- per-provider registry ----------
+
+_LIMITERS: dict[str, AdaptiveLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+# Starting points; the controller moves away from these quickly
+DEFAULTS = {
+    "tmdb": {"initial": 8, "max_limit": 40},     # ~40 req / 10 s per IP
+    "omdb": {"initial": 2, "max_limit": 8},
+    "spotify": {"initial": 4, "max_limit": 16},
+    "youtube": {"initial": 4, "max_limit": 16},
+}
+
+
+def get_limiter(provider: str) -> AdaptiveLimiter:
+    """Process-wide limiter for a provider (created on first use)."""
+    lim = _LIMITERS.get(provider)
+    if lim is None:
+        # sessions on several threads may ask at once: create exactly one
+        with _LIMITERS_LOCK:
+            lim = _LIMITERS.get(provider)
+            if lim is None:
+                lim = _LIMITERS[provider] = AdaptiveLimiter(provider, **DEFAULTS.get(provider, {}))
+    return lim
+
+
+def current_limit(provider: str) -> int | None:
+    """The provider's current limit, or None if it hasn't made a limited request yet."""
+    lim = _LIMITERS.get(provider)
+    return lim.current if lim is not None else None
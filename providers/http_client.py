@@ -2,6 +2,8 @@
 import time
 import httpx
 
+from providers.concurrency import get_limiter
+
 RATE_HEADERS = [
     "x-ratelimit-limit", "x-rate-limit-limit", "ratelimit-limit",
     "x-ratelimit-remaining", "x-rate-limit-remaining", "ratelimit-remaining",
@@ -30,9 +32,44 @@ async def api_get(
     Returns (data, perf_row, response) on success.
     Raises ApiError on 429 with perf info attached.
     """
-    t0 = time.perf_counter()
-    resp = await client.get(url, params=params, headers=headers)
-    latency_ms = (time.perf_counter() - t0) * 1000.0
+    return await api_request(
+        client, "GET", url,
+        params=params, headers=headers,
+        provider=provider, endpoint=endpoint,
+        honor_retry_after=honor_retry_after,
+        parse_json_when=parse_json_when,
+    )
+
+
+async def api_request(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    *,
+    params=None,
+    headers=None,
+    data=None,
+    provider: str,
+    endpoint: str,
+    honor_retry_after: bool = True,
+    parse_json_when="application/json",
+):
+    """
+    Same instrumentation as api_get for any HTTP method (e.g. POSTing a
+    form to an OAuth token endpoint). Returns (data, perf_row, response).
+    Requests run under the provider's adaptive concurrency limiter, which
+    is fed the status/latency of every response.
+    """
+    limiter = get_limiter(provider)
+    async with limiter.slot() as concurrency_limit:
+        t0 = time.perf_counter()
+        try:
+            resp = await client.request(method, url, params=params, headers=headers, data=data)
+        except httpx.TimeoutException:
+            limiter.record(None, timeout=True)
+            raise
+        latency_ms = (time.perf_counter() - t0) * 1000.0
+        limiter.record(resp.status_code, latency_ms)
     body_bytes = len(resp.content or b"")
 
     # case-insensitive header capture for a wide range of rate-limit keys
@@ -51,6 +88,7 @@ async def api_get(
         "ratelimit_remaining": pick("x-ratelimit-remaining") or pick("x-rate-limit-remaining") or pick("ratelimit-remaining"),
         "ratelimit_reset": pick("x-ratelimit-reset") or pick("x-rate-limit-reset") or pick("ratelimit-reset"),
         "retry_after": pick("retry-after"),
+        "concurrency_limit": concurrency_limit,
         "url": url,
     }
 
@@ -0,0 +1,100 @@
+# providers/models.py
+"""
+Typed response models for the provider payloads we decode on every fetch.
+
+msgspec decodes straight from bytes into these structs: fields that aren't
+declared are skipped without building Python objects for them, and the
+declared ones are type-checked (a malformed payload raises
+msgspec.ValidationError instead of surfacing later as a KeyError or a
+bad parquet column). Decoders are built once at import and reused.
+Leaf structs are gc=False: they only hold scalars or lists of other
+structs, so they can't form reference cycles, and a details payload
+(~40 regions of providers) no longer adds hundreds of objects for the
+cycle collector to track.
+
+See scripts/bench_decode.py for the per-payload decode cost versus
+json.loads + dict walking.
+"""
+import msgspec
+
+
+# ---------- TMDB /trending/{media_type}/{window} ----------
+
+class TrendingItem(msgspec.Struct, gc=False):
+    id: int
+    media_type: str | None = None
+    title: str | None = None             # movies
+    name: str | None = None              # tv / people
+    overview: str | None = None
+    popularity: float | None = None
+    vote_average: float | None = None
+    vote_count: int | None = None
+    release_date: str | None = None      # movies
+    first_air_date: str | None = None    # tv
+    poster_path: str | None = None
+
+
+class TrendingPage(msgspec.Struct):
+    results: list[TrendingItem] = []
+
+
+# ---------- TMDB watch/providers, external_ids, details ----------
+
+class WatchProvider(msgspec.Struct, gc=False):
+    provider_name: str | None = None
+    logo_path: str | None = None
+
+
+class RegionProviders(msgspec.Struct, gc=False):
+    flatrate: list[WatchProvider] = []
+    rent: list[WatchProvider] = []
+    buy: list[WatchProvider] = []
+    free: list[WatchProvider] = []
+    ads: list[WatchProvider] = []
+
+
+class WatchProviders(msgspec.Struct):
+    results: dict[str, RegionProviders] = {}
+
+
+class ExternalIds(msgspec.Struct, gc=False):
+    # only what we read: any other id with an unexpected type would fail
+    # the whole details decode
+    imdb_id: str | None = None
+
+
+class Genre(msgspec.Struct, gc=False):
+    name: str | None = None
+
+
+class TitleDetails(msgspec.Struct):
+    """/{media_type}/{id}?append_to_response=external_ids,watch/providers"""
+    id: int
+    title: str | None = None                 # movies
+    name: str | None = None                  # tv
+    runtime: int | None = None               # movies (minutes)
+    episode_run_time: list[int] = []         # tv
+    genres: list[Genre] = []
+    external_ids: ExternalIds | None = None
+    watch_providers: WatchProviders | None = msgspec.field(default=None, name="watch/providers")
+
+
+# ---------- OMDb ----------
+
+class OmdbTitle(msgspec.Struct, gc=False):
+    response: str = msgspec.field(default="False", name="Response")
+    imdb_id: str | None = msgspec.field(default=None, name="imdbID")
+    imdb_rating: str | None = msgspec.field(default=None, name="imdbRating")
+    imdb_votes: str | None = msgspec.field(default=None, name="imdbVotes")
+    error: str | None = msgspec.field(default=None, name="Error")
+
+
+# ---------- decoders ----------
+
+trending_decoder = msgspec.json.Decoder(TrendingPage)
+watch_providers_decoder = msgspec.json.Decoder(WatchProviders)
+external_ids_decoder = msgspec.json.Decoder(ExternalIds)
+details_decoder = msgspec.json.Decoder(TitleDetails)
+omdb_decoder = msgspec.json.Decoder(OmdbTitle)
+
+DecodeError = (msgspec.ValidationError, msgspec.DecodeError)
@@ -1,15 +1,17 @@
 # providers/omdb.py
 
 import os
-import json
 import aiohttp
 from dotenv import load_dotenv
 
 from etl_fetch import timed_get, append_perf
+from providers.models import omdb_decoder, DecodeError
 
 # Load .env locally (no effect on Streamlit Cloud)
 load_dotenv()
 
+OMDB_BASE = os.getenv("OMDB_API_BASE", "http://www.omdbapi.com/")  # OMDb docs use http
+
 # Try to import streamlit (present on Streamlit Cloud, not required locally)
 try:
     import streamlit as st  # type: ignore
@@ -61,7 +63,7 @@ OMDB_KEY = _get_omdb_key()
 #  A) Original helper used by your ETL: fetch_omdb_rating(imdb_id)
 # ---------------------------------------------------------------------
 
-async def fetch_omdb_rating(imdb_id: str) -> dict:
+async def fetch_omdb_rating(imdb_id: str, raise_on_error: bool = False) -> dict:
     """
     Simple OMDb lookup used in the ETL. Returns a dict like:
       {
@@ -69,29 +71,40 @@ async def fetch_omdb_rating(imdb_id: str) -> dict:
         'imdbVotes': '123,456'
       }
     or {} if lookup fails.
+
+    With raise_on_error=True a failed lookup (non-200, e.g. the 401
+    "Request limit reached!", 5xx, or an unreadable body) raises
+    RuntimeError instead; {} then only means OMDb has no such title.
     """
     if not OMDB_KEY or not imdb_id:
         return {}
 
-    url = "http://www.omdbapi.com/"
+    url = OMDB_BASE
     params = {"i": imdb_id, "apikey": OMDB_KEY}
 
     async with aiohttp.ClientSession() as session:
         status, payload, latency, size, rl = await timed_get(
-            session, url, params=params
+            session, url, params=params, provider="omdb"
         )
         append_perf("omdb", "rating_lookup", status, latency, size, rl)
 
     if status != 200:
+        if raise_on_error:
+            raise RuntimeError(f"OMDb error {status} for {imdb_id}: {payload[:200]!r}")
         return {}
 
-    data = json.loads(payload.decode("utf-8", errors="ignore"))
-    if data.get("Response") != "True":
+    try:
+        data = omdb_decoder.decode(payload)
+    except DecodeError as e:
+        if raise_on_error:
+            raise RuntimeError(f"OMDb payload for {imdb_id} not understood: {e}") from e
+        return {}
+    if data.response != "True":
         return {}
 
     return {
-        "imdbRating": data.get("imdbRating"),
-        "imdbVotes": data.get("imdbVotes"),
+        "imdbRating": data.imdb_rating,
+        "imdbVotes": data.imdb_votes,
     }
 
 
@@ -103,7 +116,6 @@ async def fetch_omdb_rating(imdb_id: str) -> dict:
 import httpx
 from providers.http_client import api_get
 
-OMDB_BASE = "http://www.omdbapi.com/"  # OMDb docs use http
 
 
 async def i_omdb_rating(imdb_id: str):
@@ -0,0 +1,240 @@
+# providers/spotify.py
+import os
+import time
+import base64
+import asyncio
+
+import httpx
+import pandas as pd
+from dotenv import load_dotenv
+
+from etl_fetch import append_perf_rows, DATA_DIR
+from providers.http_client import api_get, api_request, ApiError
+
+# Load .env here so this module always sees the right credentials
+load_dotenv()
+
+# Overridable so the provider can be pointed at a local stand-in server
+SPOTIFY_API_BASE = os.getenv("SPOTIFY_API_BASE", "https://api.spotify.com/v1")
+SPOTIFY_ACCOUNTS_BASE = os.getenv("SPOTIFY_ACCOUNTS_BASE", "https://accounts.spotify.com")
+
+# "Today's Top Hits"-style editorial playlist used as the music trending list
+SPOTIFY_TRENDING_PLAYLIST = os.getenv("SPOTIFY_TRENDING_PLAYLIST", "37i9dQZEVXbMDoHDwVN2tF")
+
+# Max ids per request for the "get several" endpoints
+BATCH_LIMITS = {"tracks": 50, "albums": 20, "artists": 50}
+
+# Refresh the token this many seconds before Spotify says it expires
+TOKEN_EXPIRY_MARGIN_S = 60
+
+
+# ---------- client-credentials token cache ----------
+
+class _TokenCache:
+    """
+    Holds the app access token from the client-credentials flow.
+    That flow has no refresh token, so "refresh" means requesting a new
+    token shortly before the current one expires (or after a 401).
+    """
+
+    def __init__(self):
+        self.access_token = None
+        self.expires_at = 0.0
+        self._lock = None
+        self._lock_loop = None
+
+    def _loop_lock(self) -> asyncio.Lock:
+        # the app calls asyncio.run() per lookup, so bind one lock per event loop
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def invalidate(self):
+        self.access_token = None
+        self.expires_at = 0.0
+
+    async def get(self, client: httpx.AsyncClient, perf_rows: list) -> str:
+        if self.access_token and time.time() < self.expires_at - TOKEN_EXPIRY_MARGIN_S:
+            return self.access_token
+        async with self._loop_lock():
+            # another task may have refreshed while we waited
+            if self.access_token and time.time() < self.expires_at - TOKEN_EXPIRY_MARGIN_S:
+                return self.access_token
+            client_id, client_secret = _spotify_credentials()
+            data, perf, resp = await api_request(
+                client, "POST", f"{SPOTIFY_ACCOUNTS_BASE}/api/token",
+                data={"grant_type": "client_credentials"},
+                headers={"Authorization": _basic_auth(client_id, client_secret)},
+                provider="spotify", endpoint="token",
+            )
+            perf_rows.append(perf)
+            if resp.status_code != 200 or not data:
+                raise RuntimeError(f"Spotify token error {resp.status_code}: {resp.text[:200]}")
+            self.access_token = data["access_token"]
+            self.expires_at = time.time() + float(data.get("expires_in", 3600))
+            return self.access_token
+
+
+_token = _TokenCache()
+
+
+def _spotify_credentials():
+    client_id = os.getenv("SPOTIFY_CLIENT_ID")
+    client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+    if not client_id or not client_secret:
+        raise RuntimeError(
+            "No Spotify credentials. Provide SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET."
+        )
+    return client_id, client_secret
+
+
+def _basic_auth(client_id: str, client_secret: str) -> str:
+    raw = f"{client_id}:{client_secret}".encode("utf-8")
+    return "Basic " + base64.b64encode(raw).decode("ascii")
+
+
+# ---------- instrumented GET with token handling ----------
+
+async def _spotify_get(client, path: str, *, params=None, endpoint: str, perf_rows: list):
+    """
+    GET an API path with the cached bearer token. A 401 means the token was
+    revoked/expired early: drop it and retry once with a fresh one.
+    Every attempt's perf row is appended to perf_rows (including 429s).
+    """
+    for attempt in range(2):
+        token = await _token.get(client, perf_rows)
+        try:
+            data, perf, resp = await api_get(
+                client, f"{SPOTIFY_API_BASE}{path}",
+                params=params,
+                headers={"Authorization": f"Bearer {token}"},
+                provider="spotify", endpoint=endpoint,
+            )
+        except ApiError as e:
+            perf_rows.append(e.perf)
+            raise
+        perf_rows.append(perf)
+        if resp.status_code == 401 and attempt == 0:
+            _token.invalidate()
+            continue
+        if resp.status_code != 200:
+            raise RuntimeError(f"Spotify error {resp.status_code} on {path}: {resp.text[:200]}")
+        return data
+    raise RuntimeError(f"Spotify auth failed twice on {path}")
+
+
+async def fetch_spotify_several(client, kind: str, ids, perf_rows: list, market: str | None = None):
+    """
+    Bulk lookup via /tracks, /albums or /artists?ids=...
+    ids are de-duplicated and split into chunks of BATCH_LIMITS[kind];
+    chunks are requested concurrently. Returns the objects in input order
+    (unknown ids, which Spotify returns as null, are dropped).
+    """
+    limit = BATCH_LIMITS[kind]
+    unique = list(dict.fromkeys(i for i in ids if i))
+    chunks = [unique[i:i + limit] for i in range(0, len(unique), limit)]
+
+    async def one(chunk):
+        params = {"ids": ",".join(chunk)}
+        if market and kind != "artists":
+            params["market"] = market
+        data = await _spotify_get(client, f"/{kind}", params=params,
+                                  endpoint=f"several_{kind}", perf_rows=perf_rows)
+        return (data or {}).get(kind) or []
+
+    results = await asyncio.gather(*(one(c) for c in chunks))
+    return [obj for chunk in results for obj in chunk if obj]
+
+
+async def _playlist_track_ids(client, playlist_id: str, market: str, perf_rows: list):
+    """Track ids (in playlist order) for a playlist, paging 100 at a time."""
+    ids = []
+    offset = 0
+    while True:
+        data = await _spotify_get(
+            client, f"/playlists/{playlist_id}/tracks",
+            # only pull the ids here; details come from the bulk endpoints
+            params={"fields": "items(track(id)),next,total", "limit": 100,
+                    "offset": offset, "market": market},
+            endpoint="playlist_tracks", perf_rows=perf_rows,
+        )
+        items = (data or {}).get("items") or []
+        ids.extend((it.get("track") or {}).get("id") for it in items)
+        # an empty page with `next` set would never advance the offset
+        if not items or not data.get("next"):
+            break
+        offset += len(items)
+    return [i for i in ids if i]
+
+
+# ---------- trending music pull ----------
+
+async def fetch_spotify_trending(playlist_id: str = SPOTIFY_TRENDING_PLAYLIST, market: str = "US"):
+    """
+    Fetch the trending playlist and enrich it with the bulk endpoints:
+      playlist -> track ids -> /tracks (50/req) -> /albums (20/req) + /artists (50/req)
+    Writes/updates data/spotify_trending.parquet, appends perf rows to
+    data/perf_log.parquet and returns only this pull's rows (unlike
+    fetch_tmdb_trending, which returns the whole history); read the
+    parquet file for earlier pulls.
+    """
+    perf_rows = []
+    try:
+        async with httpx.AsyncClient(timeout=20) as client:
+            track_ids = await _playlist_track_ids(client, playlist_id, market, perf_rows)
+            tracks = await fetch_spotify_several(client, "tracks", track_ids, perf_rows, market)
+
+            album_ids = [(t.get("album") or {}).get("id") for t in tracks]
+            artist_ids = [a.get("id") for t in tracks for a in (t.get("artists") or [])]
+            albums, artists = await asyncio.gather(
+                fetch_spotify_several(client, "albums", album_ids, perf_rows, market),
+                fetch_spotify_several(client, "artists", artist_ids, perf_rows),
+            )
+    finally:
+        append_perf_rows(perf_rows)
+
+    albums_by_id = {a["id"]: a for a in albums}
+    artists_by_id = {a["id"]: a for a in artists}
+
+    # One timestamp per pull (so a batch stays together)
+    pull_ts = pd.Timestamp.now(tz="UTC")
+
+    rows = []
+    for rank, t in enumerate(tracks, start=1):
+        album = albums_by_id.get((t.get("album") or {}).get("id")) or t.get("album") or {}
+        track_artists = [artists_by_id.get(a.get("id")) or a for a in (t.get("artists") or [])]
+        genres = sorted({g for a in track_artists for g in (a.get("genres") or [])})
+        images = album.get("images") or []
+        rows.append({
+            "ts": pull_ts,
+            "playlist_id": playlist_id,
+            "market": market,
+            "rank": rank,
+            "id": t.get("id"),
+            "title": t.get("name"),
+            "artists": ", ".join(a.get("name") or "" for a in track_artists),
+            "album": album.get("name"),
+            "album_type": album.get("album_type"),
+            "label": album.get("label"),
+            "release_date": album.get("release_date"),
+            "popularity": t.get("popularity"),
+            "album_popularity": album.get("popularity"),
+            "artist_popularity": max((a.get("popularity") or 0 for a in track_artists), default=None),
+            "genres": ", ".join(genres),
+            "is_soundtrack": "soundtrack" in " ".join(genres) or "soundtrack" in (album.get("name") or "").lower(),
+            "duration_ms": t.get("duration_ms"),
+            "image_url": images[0].get("url") if images else None,
+        })
+    df = pd.DataFrame(rows)
+
+    out = DATA_DIR / "spotify_trending.parquet"
+    if len(df):
+        hist = df
+        if out.exists():
+            old = pd.read_parquet(out)
+            hist = pd.concat([old, df], ignore_index=True)
+        hist.to_parquet(out, index=False)
+
+    return df
@@ -1,16 +1,20 @@
 # providers/tmdb.py
 import os
-import json
 import pandas as pd
 import aiohttp
+import msgspec
 
 from dotenv import load_dotenv
 from etl_fetch import timed_get, append_perf, DATA_DIR
+from providers.models import (
+    TitleDetails, ExternalIds, trending_decoder, details_decoder, DecodeError,
+)
 
 # Load .env here so this module always sees the right key
 load_dotenv()
 
 TMDB_KEY = os.getenv("TMDB_API_KEY")
+TMDB_BASE = os.getenv("TMDB_API_BASE", "https://api.themoviedb.org/3")
 
 
 def _tmdb_headers_and_params():
@@ -66,12 +70,12 @@ async def fetch_tmdb_trending(media_type="all", window="day"):
       window: 'day' | 'week'
     Writes/updates data/tmdb_trending.parquet and returns the dataframe.
     """
-    url = f"https://api.themoviedb.org/3/trending/{media_type}/{window}"
+    url = f"{TMDB_BASE}/trending/{media_type}/{window}"
     headers, params = _tmdb_headers_and_params()
 
     async with aiohttp.ClientSession() as session:
         status, payload, latency, size, rl = await timed_get(
-            session, url, headers=headers, params=params
+            session, url, headers=headers, params=params, provider="tmdb"
         )
 
     append_perf("tmdb", f"trending_{media_type}_{window}", status, latency, size, rl)
@@ -80,25 +84,29 @@ async def fetch_tmdb_trending(media_type="all", window="day"):
         snippet = payload.decode("utf-8", errors="ignore")[:200]
         raise RuntimeError(f"TMDB error {status}: {snippet}")
 
-    data = json.loads(payload.decode("utf-8"))
+    # typed decode: only the fields below are materialised, and types are checked
+    try:
+        page = trending_decoder.decode(payload)
+    except DecodeError as e:
+        raise RuntimeError(f"TMDB trending payload did not match the expected shape: {e}")
 
     # One timestamp per pull (so a batch stays together)
-    pull_ts = pd.Timestamp.utcnow()
+    pull_ts = pd.Timestamp.now(tz="UTC")
 
     rows = []
-    for r in data.get("results", []):
+    for r in page.results:
         rows.append({
             "ts": pull_ts,
             "window": window,  # 'day' or 'week' so the app can filter
-            "id": r.get("id"),
-            "media_type": r.get("media_type"),
-            "title": r.get("title") or r.get("name"),
-            "overview": r.get("overview"),
-            "popularity": r.get("popularity"),
-            "vote_average": r.get("vote_average"),
-            "vote_count": r.get("vote_count"),
-            "release_date": r.get("release_date") or r.get("first_air_date"),
-            "poster_path": r.get("poster_path"),
+            "id": r.id,
+            "media_type": r.media_type,
+            "title": r.title or r.name,
+            "overview": r.overview,
+            "popularity": r.popularity,
+            "vote_average": r.vote_average,
+            "vote_count": r.vote_count,
+            "release_date": r.release_date or r.first_air_date,
+            "poster_path": r.poster_path,
         })
     df = pd.DataFrame(rows)
 
@@ -110,52 +118,127 @@ async def fetch_tmdb_trending(media_type="all", window="day"):
         df.to_parquet(out, index=False)
 
     return df
-# --- Streaming availability (watch/providers) ---
-# Docs: /movie/{movie_id}/watch/providers and /tv/{tv_id}/watch/providers
+# --- Title details: external ids + streaming availability in one call ---
+# Docs: /movie/{id} and /tv/{id} with append_to_response. watch/providers
+# carries every region, so one request covers all countries for a title.
 
+import time
+import threading
 import aiohttp
-
-async def fetch_tmdb_providers(item_id: int, media_type: str, region: str = "US"):
+from collections import OrderedDict
+
+DETAIL_APPENDS = "external_ids,watch/providers"
+PROVIDER_KINDS = ("flatrate", "rent", "buy", "free", "ads")
+DETAILS_TTL_S = float(os.getenv("TMDB_DETAILS_TTL_S", str(6 * 3600)))
+DETAILS_CACHE_SIZE = int(os.getenv("TMDB_DETAILS_CACHE_SIZE", "2048"))
+
+# (media_type, id) -> (fetched_at monotonic, parsed details); process-wide,
+# so external ids, every region's providers and the details themselves
+# all come from the same response. Least recently used titles are evicted
+# beyond DETAILS_CACHE_SIZE; sessions on several threads share it
+_DETAILS_CACHE: OrderedDict[tuple[str, int], tuple[float, dict]] = OrderedDict()
+_DETAILS_LOCK = threading.Lock()
+
+
+def _cached_details(key) -> dict | None:
+    with _DETAILS_LOCK:
+        hit = _DETAILS_CACHE.get(key)
+        if hit is None:
+            return None
+        if time.monotonic() - hit[0] >= DETAILS_TTL_S:
+            del _DETAILS_CACHE[key]
+            return None
+        _DETAILS_CACHE.move_to_end(key)
+        return hit[1]
+
+
+def _store_details(key, details: dict):
+    with _DETAILS_LOCK:
+        _DETAILS_CACHE[key] = (time.monotonic(), details)
+        _DETAILS_CACHE.move_to_end(key)
+        while len(_DETAILS_CACHE) > DETAILS_CACHE_SIZE:
+            _DETAILS_CACHE.popitem(last=False)
+
+
+def parse_tmdb_details(data: TitleDetails, media_type: str) -> dict:
+    """Plain dict (cacheable/picklable) of what we use from a details payload."""
+    runtime = data.runtime
+    if runtime is None and data.episode_run_time:
+        runtime = data.episode_run_time[0]  # tv: typical episode length
+    ext = data.external_ids or ExternalIds()
+    providers = {}
+    for region, block in (data.watch_providers.results if data.watch_providers else {}).items():
+        providers[region] = {
+            k: [(p.provider_name, p.logo_path) for p in getattr(block, k)]
+            for k in PROVIDER_KINDS
+        }
+    return {
+        "id": data.id,
+        "media_type": media_type,
+        "title": data.title or data.name,
+        "runtime": runtime,
+        "genres": [g.name for g in data.genres],
+        "imdb_id": ext.imdb_id,
+        "external_ids": msgspec.structs.asdict(ext),
+        "providers": providers,
+    }
+
+
+async def fetch_tmdb_details(item_id: int, media_type: str):
     """
-    Return a dict: { 'flatrate': [(provider_name, logo_path), ...], 'rent': [...], 'buy': [...] }
-    for the given TMDB item and region (country code like 'US', 'IN', 'GB').
+    Details, external ids and watch providers (all regions) for one title,
+    from a single TMDB request; cached for DETAILS_TTL_S. Returns {} on any
+    non-200 (not cached, so the next call retries).
     """
-    headers, params = _tmdb_headers_and_params()
-    url = f"https://api.themoviedb.org/3/{media_type}/{item_id}/watch/providers"
+    key = (media_type, int(item_id))
+    hit = _cached_details(key)
+    if hit is not None:
+        return hit
 
+    headers, params = _tmdb_headers_and_params()
+    params = {**(params or {}), "append_to_response": DETAIL_APPENDS}
+    url = f"{TMDB_BASE}/{media_type}/{item_id}"
     async with aiohttp.ClientSession() as session:
-        status, payload, latency, size, rl = await timed_get(session, url, headers=headers, params=params)
-
-    append_perf("tmdb", f"watch_providers_{media_type}_{region}", status, latency, size, rl)
+        status, payload, latency, size, rl = await timed_get(session, url, headers=headers, params=params, provider="tmdb")
+    append_perf("tmdb", f"details_{media_type}", status, latency, size, rl)
 
     if status != 200:
         return {}
+    try:
+        details = parse_tmdb_details(details_decoder.decode(payload), media_type)
+    except DecodeError as e:
+        print(f"[tmdb] unexpected details payload for {media_type}/{item_id}: {e}")
+        return {}
+    _store_details(key, details)
+    return details
+
+
+def providers_for_region(details: dict, region: str) -> dict:
+    """{'flatrate': [(provider_name, logo_path), ...], 'rent': [...], ...} (empty lists when none)."""
+    return details.get("providers", {}).get(region) or {k: [] for k in PROVIDER_KINDS}
+
+
+async def fetch_tmdb_providers(item_id: int, media_type: str, region: str = "US"):
+    """
+    Return a dict: { 'flatrate': [(provider_name, logo_path), ...], 'rent': [...], 'buy': [...] }
+    for the given TMDB item and region (country code like 'US', 'IN', 'GB').
+    Served from the cached details call; {} if it failed.
+    """
+    details = await fetch_tmdb_details(item_id, media_type)
+    return providers_for_region(details, region) if details else {}
+
 
-    data = json.loads(payload.decode("utf-8")).get("results", {})
-    region_block = data.get(region, {}) or {}
-    out = {}
-    for k in ("flatrate", "rent", "buy", "free", "ads"):
-        providers = region_block.get(k) or []
-        out[k] = [(p.get("provider_name"), p.get("logo_path")) for p in providers]
-    return out
-# at bottom of providers/tmdb.py
 async def fetch_tmdb_external_ids(item_id: int, media_type: str):
-    headers, params = _tmdb_headers_and_params()
-    url = f"https://api.themoviedb.org/3/{media_type}/{item_id}/external_ids"
-    async with aiohttp.ClientSession() as session:
-        status, payload, latency, size, rl = await timed_get(session, url, headers=headers, params=params)
-    append_perf("tmdb", f"external_ids_{media_type}", status, latency, size, rl)
-    if status != 200:
-        return {}
-    return json.loads(payload.decode("utf-8", errors="ignore"))
+    """External ids (imdb_id, ...) from the cached details call; {} if it failed."""
+    details = await fetch_tmdb_details(item_id, media_type)
+    return details.get("external_ids") or {}
 
 
 # providers/tmdb.py  (instrumented helpers)
 import os
 import httpx
-from providers.http_client import api_get, ApiError
+from providers.http_client import api_get
 
-TMDB_BASE = "https://api.themoviedb.org/3"
 TMDB_TOKEN = os.getenv("TMDB_BEARER")
 
 def _tmdb_headers():
@@ -172,24 +255,13 @@ async def i_tmdb_trending(media_type="all", window="day"):
         )
     return data, perf
 
-async def i_tmdb_external_ids(item_id: int, media_type: str):
-    url = f"{TMDB_BASE}/{media_type}/{item_id}/external_ids"
-    headers = _tmdb_headers()
-    async with httpx.AsyncClient(timeout=20) as client:
-        data, perf, _ = await api_get(
-            client, url,
-            params=None, headers=headers,
-            provider="tmdb", endpoint="external_ids_movie" if media_type=="movie" else "external_ids_tv"
-        )
-    return data, perf
-
-async def i_tmdb_watch_providers(item_id: int, media_type: str):
-    url = f"{TMDB_BASE}/{media_type}/{item_id}/watch/providers"
+async def i_tmdb_details(item_id: int, media_type: str):
+    url = f"{TMDB_BASE}/{media_type}/{item_id}"
     headers = _tmdb_headers()
     async with httpx.AsyncClient(timeout=20) as client:
         data, perf, _ = await api_get(
             client, url,
-            params=None, headers=headers,
-            provider="tmdb", endpoint=f"watch_providers_{media_type}"
+            params={"append_to_response": DETAIL_APPENDS}, headers=headers,
+            provider="tmdb", endpoint=f"details_{media_type}"
         )
     return data, perf
@@ -0,0 +1,314 @@
+# providers/youtube.py
+import os
+import asyncio
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
+import pandas as pd
+from dotenv import load_dotenv
+
+from etl_fetch import append_perf_rows, DATA_DIR
+from providers.http_client import api_get, ApiError
+from providers.tmdb import TMDB_BASE, _tmdb_headers_and_params
+
+# Load .env here so this module always sees the right key
+load_dotenv()
+
+# Overridable so the provider can be pointed at a local mock
+YOUTUBE_API_BASE = os.getenv("YOUTUBE_API_BASE", "https://www.googleapis.com/youtube/v3")
+
+# YouTube Data API charges quota per method call, not per returned item
+QUOTA_COSTS = {
+    "videos.list": 1,
+}
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+# Quota resets at midnight Pacific time
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+
+VIDEOS_PER_CALL = 50            # videos.list max ids per request
+STATS_MAX_AGE_HOURS = 6         # refresh view counts at most this often
+UNRESOLVED_RETRY_HOURS = 24     # re-check titles that had no trailer
+
+TRAILERS_FILE = DATA_DIR / "youtube_trailers.parquet"
+STATS_FILE = DATA_DIR / "youtube_stats.parquet"
+QUOTA_FILE = DATA_DIR / "youtube_quota.parquet"
+
+
+def _youtube_key() -> str:
+    key = os.getenv("YOUTUBE_API_KEY")
+    if not key:
+        raise RuntimeError("No YouTube credentials. Provide YOUTUBE_API_KEY.")
+    return key
+
+
+def _read(path, columns):
+    if path.exists():
+        return pd.read_parquet(path)
+    return pd.DataFrame(columns=columns)
+
+
+def _upsert(old: pd.DataFrame, new: pd.DataFrame, keys) -> pd.DataFrame:
+    """Newer rows win per key; skips the empty frame so dtypes survive."""
+    if old.empty:
+        return new.drop_duplicates(keys, keep="last")
+    return pd.concat([old, new], ignore_index=True).drop_duplicates(keys, keep="last")
+
+
+# ---------- quota ledger ----------
+
+def quota_day(ts: datetime | None = None) -> str:
+    """The quota day (Pacific date) a call made at `ts` is billed to."""
+    ts = ts or datetime.now(timezone.utc)
+    return ts.astimezone(QUOTA_TZ).date().isoformat()
+
+
+def quota_used_today() -> int:
+    """Quota units spent so far in the current quota day."""
+    ledger = _read(QUOTA_FILE, ["day", "method", "calls", "units"])
+    if ledger.empty:
+        return 0
+    return int(ledger.loc[ledger["day"] == quota_day(), "units"].sum())
+
+
+def _record_quota(usage: dict):
+    """Add {method: calls} for today to data/youtube_quota.parquet."""
+    if not usage:
+        return
+    day = quota_day()
+    new = pd.DataFrame([
+        {"day": day, "method": m, "calls": n, "units": n * QUOTA_COSTS[m]}
+        for m, n in usage.items()
+    ])
+    ledger = _read(QUOTA_FILE, list(new.columns))
+    ledger = (
+        pd.concat([ledger, new], ignore_index=True)
+        .groupby(["day", "method"], as_index=False)[["calls", "units"]].sum()
+    )
+    ledger.to_parquet(QUOTA_FILE, index=False)
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+class _QuotaMeter:
+    """Counts calls per method for one pull and enforces the daily budget."""
+
+    def __init__(self):
+        self.spent_before = quota_used_today()
+        self.calls = {}
+
+    @property
+    def units(self) -> int:
+        return sum(n * QUOTA_COSTS[m] for m, n in self.calls.items())
+
+    def charge(self, method: str):
+        cost = QUOTA_COSTS[method]
+        if self.spent_before + self.units + cost > YOUTUBE_DAILY_QUOTA:
+            raise QuotaExceeded(
+                f"YouTube quota budget reached ({YOUTUBE_DAILY_QUOTA} units/day)"
+            )
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+
+# ---------- trailer resolution (TMDB /videos, no YouTube quota) ----------
+
+def _pick_trailer(videos: list) -> str | None:
+    """Prefer official YouTube trailers, then teasers; newest first."""
+    yt = [v for v in videos if v.get("site") == "YouTube" and v.get("key")]
+    rank = {"Trailer": 0, "Teaser": 1}
+    yt = [v for v in yt if v.get("type") in rank]
+    if not yt:
+        return None
+    yt.sort(key=lambda v: v.get("published_at") or "", reverse=True)
+    yt.sort(key=lambda v: (rank[v["type"]], not v.get("official")))
+    return yt[0]["key"]
+
+
+async def _resolve_trailers(client, keys, perf_rows):
+    headers, params = _tmdb_headers_and_params()
+
+    async def one(item_id, media_type):
+        try:
+            data, perf, resp = await api_get(
+                client, f"{TMDB_BASE}/{media_type}/{item_id}/videos",
+                params=params, headers=headers,
+                provider="tmdb", endpoint=f"videos_{media_type}",
+            )
+        except ApiError as e:
+            perf_rows.append(e.perf)
+            return None
+        perf_rows.append(perf)
+        if resp.status_code != 200 or not data:
+            return None
+        return {
+            "id": item_id,
+            "media_type": media_type,
+            "video_id": _pick_trailer(data.get("results") or []),
+            "resolved_at": pd.Timestamp.now(tz="UTC"),
+        }
+
+    rows = await asyncio.gather(*(one(i, mt) for i, mt in keys))
+    return pd.DataFrame([r for r in rows if r])
+
+
+# ---------- statistics (batched videos.list) ----------
+
+async def fetch_youtube_video_stats(client, video_ids, perf_rows, meter: _QuotaMeter):
+    """
+    videos.list?part=statistics for up to 50 ids per call (1 quota unit per
+    call regardless of how many ids it carries). Returns one row per video.
+    """
+    key = _youtube_key()
+    unique = list(dict.fromkeys(v for v in video_ids if v))
+    chunks = [unique[i:i + VIDEOS_PER_CALL] for i in range(0, len(unique), VIDEOS_PER_CALL)]
+    fetched_at = pd.Timestamp.now(tz="UTC")
+
+    # charge up front so a budget stop never leaves calls half in flight
+    allowed = []
+    for chunk in chunks:
+        try:
+            meter.charge("videos.list")
+        except QuotaExceeded as e:
+            print(f"[youtube] {e}; skipping {len(chunks) - len(allowed)} videos.list call(s)")
+            break
+        allowed.append(chunk)
+
+    async def one(chunk):
+        try:
+            data, perf, resp = await api_get(
+                client, f"{YOUTUBE_API_BASE}/videos",
+                params={
+                    "part": "statistics",
+                    "id": ",".join(chunk),
+                    "fields": "items(id,statistics)",
+                    "maxResults": VIDEOS_PER_CALL,
+                    "key": key,
+                },
+                provider="youtube", endpoint="videos_list",
+            )
+        except ApiError as e:
+            perf_rows.append(e.perf)
+            return []
+        perf_rows.append(perf)
+        if resp.status_code != 200 or not data:
+            return []
+        return data.get("items") or []
+
+    results = await asyncio.gather(*(one(c) for c in allowed))
+
+    rows = []
+    for item in (it for chunk in results for it in chunk):
+        s = item.get("statistics") or {}
+        rows.append({
+            "video_id": item.get("id"),
+            "views": s.get("viewCount"),
+            "likes": s.get("likeCount"),
+            "comments": s.get("commentCount"),
+            "fetched_at": fetched_at,
+        })
+    df = pd.DataFrame(rows, columns=["video_id", "views", "likes", "comments", "fetched_at"])
+    # the API returns counts as strings; likes/comments may be hidden
+    for col in ("views", "likes", "comments"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    return df
+
+
+# ---------- join onto trending ----------
+
+def cache_versions() -> tuple:
+    """mtime_ns of the trailer and stats caches (None if missing); changes on every write."""
+    versions = []
+    for path in (TRAILERS_FILE, STATS_FILE):
+        try:
+            versions.append(path.stat().st_mtime_ns)
+        except FileNotFoundError:
+            versions.append(None)
+    return tuple(versions)
+
+
+def load_trailer_stats() -> pd.DataFrame:
+    """
+    Cached trailer ids and statistics per title (no network): id,
+    media_type, trailer_video_id, trailer_views, trailer_likes,
+    trailer_comments and trailer_engagement (likes+comments per view).
+    """
+    trailers = _read(TRAILERS_FILE, ["id", "media_type", "video_id", "resolved_at"])
+    stats = _read(STATS_FILE, ["video_id", "views", "likes", "comments", "fetched_at"])
+    out = trailers[["id", "media_type", "video_id"]].merge(
+        stats[["video_id", "views", "likes", "comments"]], on="video_id", how="left"
+    )
+    out = out.rename(columns={
+        "video_id": "trailer_video_id",
+        "views": "trailer_views",
+        "likes": "trailer_likes",
+        "comments": "trailer_comments",
+    })
+    engaged = out["trailer_likes"].fillna(0) + out["trailer_comments"].fillna(0)
+    out["trailer_engagement"] = (engaged / out["trailer_views"]).where(out["trailer_views"] > 0)
+    return out
+
+
+def join_trailer_stats(batch: pd.DataFrame, trailer_stats: pd.DataFrame | None = None) -> pd.DataFrame:
+    """
+    Left-join trailer stats (load_trailer_stats(), read now unless given)
+    onto a trending batch.
+    """
+    if trailer_stats is None:
+        trailer_stats = load_trailer_stats()
+    return batch.merge(trailer_stats, on=["id", "media_type"], how="left")
+
+
+async def fetch_youtube_trailer_stats(batch: pd.DataFrame, max_age_hours: float = STATS_MAX_AGE_HOURS):
+    """
+    For a trending batch (rows with id/media_type):
+      1) resolve each title's trailer via TMDB /videos (cached in
+         data/youtube_trailers.parquet),
+      2) refresh statistics for trailers whose cached stats are missing or
+         older than max_age_hours, 50 ids per videos.list call (cached in
+         data/youtube_stats.parquet),
+      3) record quota units per method in data/youtube_quota.parquet.
+    Returns the batch with trailer stats joined on.
+    """
+    now = pd.Timestamp.now(tz="UTC")
+    keys = list(dict.fromkeys(zip(batch["id"].astype(int), batch["media_type"])))
+
+    trailers = _read(TRAILERS_FILE, ["id", "media_type", "video_id", "resolved_at"])
+    stats = _read(STATS_FILE, ["video_id", "views", "likes", "comments", "fetched_at"])
+
+    known = {
+        (int(r.id), r.media_type)
+        for r in trailers.itertuples()
+        if pd.notna(r.video_id) or now - r.resolved_at < pd.Timedelta(hours=UNRESOLVED_RETRY_HOURS)
+    }
+    to_resolve = [k for k in keys if k not in known]
+
+    perf_rows = []
+    meter = _QuotaMeter()
+    try:
+        async with httpx.AsyncClient(timeout=20) as client:
+            if to_resolve:
+                resolved = await _resolve_trailers(client, to_resolve, perf_rows)
+                if len(resolved):
+                    trailers = _upsert(trailers, resolved, ["id", "media_type"])
+                    trailers.to_parquet(TRAILERS_FILE, index=False)
+
+            in_batch = set(keys)
+            wanted = {
+                vid for (i, mt), vid in
+                zip(zip(trailers["id"].astype(int), trailers["media_type"]), trailers["video_id"])
+                if pd.notna(vid) and (i, mt) in in_batch
+            }
+            fresh = set(stats.loc[now - stats["fetched_at"] < pd.Timedelta(hours=max_age_hours), "video_id"])
+            stale = sorted(wanted - fresh)
+            if stale:
+                new_stats = await fetch_youtube_video_stats(client, stale, perf_rows, meter)
+                if len(new_stats):
+                    stats = _upsert(stats, new_stats, ["video_id"])
+                    stats.to_parquet(STATS_FILE, index=False)
+    finally:
+        append_perf_rows(perf_rows)
+        _record_quota(meter.calls)
+
+    return join_trailer_stats(batch)
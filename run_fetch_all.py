@@ -1,10 +1,69 @@
 # run_fetch_all.py
+import os
 import asyncio
 from providers.tmdb import fetch_tmdb_trending
+from providers.spotify import fetch_spotify_trending
+from providers.youtube import fetch_youtube_trailer_stats
+from etl_enrich import run_enrichment
+from utils.queries import connect, latest_batch_ts
+from utils.snapshot import publish_latest
+from utils.search_index import sync_index
+
+def split_latest(history, window):
+    """
+    (pull the dashboard shows, the pull before it) for one window of the
+    trending history. The first is chosen by latest_batch_ts, as in the app
+    and API, so a partial newest pull is not the one enriched.
+    """
+    if history.empty:
+        return history, None
+    with connect() as con:
+        ts = latest_batch_ts(con, window)
+    hist = history[history["window"] == window]
+    if ts is None:
+        return hist.iloc[0:0], None
+    # DuckDB timestamps are microsecond precision
+    hist_ts = hist["ts"].dt.floor("us")
+    latest = hist[hist_ts == ts]
+    older = hist_ts[hist_ts < ts]
+    previous = hist[hist_ts == older.max()] if len(older) else None
+    return latest, previous
 
 async def main():
     df = await fetch_tmdb_trending(media_type="all", window="day")
     print("Fetched rows:", len(df))
+    # fetch_tmdb_trending returns the whole history; enrichment is per pull
+    batch, previous = split_latest(df, window="day")
+
+    # Providers + IMDb ids (and ratings, when an OMDb key is set) for
+    # new/stale titles, via the durable queue (resumes whatever an
+    # interrupted earlier run left unfinished)
+    if len(batch):
+        await run_enrichment(batch, previous)
+
+    # Memory-mappable snapshots (+ enrichment) of the pulls the dashboard
+    # shows; "week" too (pulled from the app), so its enrichment stays current
+    for window in ("day", "week"):
+        publish_latest(window)
+
+    # Title search index: only pulls newer than the last indexed one are read
+    print("Indexed title appearances:", sync_index())
+
+    # Trailer views/engagement for the titles in this pull
+    if os.getenv("YOUTUBE_API_KEY") and len(df):
+        try:
+            joined = await fetch_youtube_trailer_stats(batch)
+            print("Trailers with stats:", int(joined["trailer_views"].notna().sum()))
+        except Exception as e:
+            print("YouTube fetch failed:", e)
+
+    # Music trending is optional: only pulled when Spotify credentials exist
+    if os.getenv("SPOTIFY_CLIENT_ID") and os.getenv("SPOTIFY_CLIENT_SECRET"):
+        try:
+            sp = await fetch_spotify_trending()
+            print("Fetched Spotify rows:", len(sp))
+        except Exception as e:
+            print("Spotify fetch failed:", e)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,215 @@
+# scripts/bench_decode.py
+"""
+Micro-benchmark: decode cost per provider payload, before and after the
+typed models in providers/models.py.
+
+For each payload (TMDB trending page, TMDB details with external_ids +
+watch/providers appended, bare watch/providers, external_ids, OMDb title)
+it times decode + extracting the fields the fetchers keep:
+
+  json     json.loads(bytes.decode()) + dict .get() walking (the old path)
+  orjson   orjson.loads(bytes) + the same walking (if orjson is installed)
+  msgspec  typed Decoder(bytes) + attribute access (providers/models.py)
+
+Payloads are synthetic but shaped like the real responses, including the
+fields we don't use (that's where the typed decoder saves most).
+
+    python -m scripts.bench_decode
+    python -m scripts.bench_decode --repeat 2000
+"""
+import json
+import random
+import timeit
+import argparse
+
+import pandas as pd
+
+from providers.models import (
+    trending_decoder, details_decoder, watch_providers_decoder,
+    external_ids_decoder, omdb_decoder,
+)
+
+# Optional: orjson (skipped when missing)
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+KINDS = ("flatrate", "rent", "buy", "free", "ads")
+REGIONS = ["US", "GB", "IN", "CA", "AU", "DE", "FR", "BR", "MX", "ES", "IT", "NL", "SE", "NO",
+           "DK", "FI", "PL", "JP", "KR", "AR", "CL", "CO", "PE", "NZ", "IE", "BE", "AT", "CH",
+           "PT", "TR", "ZA", "SG", "PH", "ID", "TH", "MY", "HK", "TW", "CZ", "HU", "RO", "GR"]
+
+
+# ---------- sample payloads ----------
+
+def sample_trending(rnd) -> bytes:
+    results = []
+    for i in range(20):
+        movie = i % 3 != 0
+        r = {
+            "adult": False, "backdrop_path": f"/b{i}.jpg", "id": 1000 + i,
+            "original_language": "en", "overview": "Lorem ipsum dolor sit amet. " * 8,
+            "poster_path": f"/p{i}.jpg", "media_type": "movie" if movie else "tv",
+            "genre_ids": [18, 28, 12], "popularity": rnd.uniform(10, 900),
+            "vote_average": round(rnd.uniform(4, 9), 3), "vote_count": rnd.randint(10, 30000),
+        }
+        if movie:
+            r.update(title=f"Movie {i}", original_title=f"Movie {i}", release_date="2026-03-01", video=False)
+        else:
+            r.update(name=f"Show {i}", original_name=f"Show {i}", first_air_date="2025-11-01",
+                     origin_country=["US"])
+        results.append(r)
+    return json.dumps({"page": 1, "results": results, "total_pages": 500, "total_results": 10000}).encode()
+
+
+def _providers(rnd) -> dict:
+    def prov(j):
+        return {"logo_path": f"/l{j}.png", "provider_id": j, "provider_name": f"Provider {j}",
+                "display_priority": j}
+    return {"id": 1000, "results": {
+        c: {"link": f"https://www.themoviedb.org/movie/1000/watch?locale={c}",
+            **{k: [prov(rnd.randint(1, 400)) for _ in range(rnd.randint(0, 4))]
+               for k in rnd.sample(KINDS, 3)}}
+        for c in REGIONS
+    }}
+
+
+def _external_ids() -> dict:
+    return {"id": 1000, "imdb_id": "tt1234567", "wikidata_id": "Q123", "facebook_id": "fb",
+            "instagram_id": "ig", "twitter_id": "tw", "tvdb_id": None}
+
+
+def sample_details(rnd) -> bytes:
+    d = {
+        "adult": False, "backdrop_path": "/b.jpg", "budget": 150_000_000, "homepage": "https://example.com",
+        "belongs_to_collection": {"id": 1, "name": "Saga", "poster_path": "/c.jpg", "backdrop_path": "/cb.jpg"},
+        "genres": [{"id": 18, "name": "Drama"}, {"id": 28, "name": "Action"}], "id": 1000,
+        "imdb_id": "tt1234567", "original_language": "en", "original_title": "Movie",
+        "overview": "Lorem ipsum dolor sit amet. " * 10, "popularity": 512.3, "poster_path": "/p.jpg",
+        "production_companies": [{"id": j, "logo_path": f"/pc{j}.png", "name": f"Studio {j}",
+                                  "origin_country": "US"} for j in range(4)],
+        "production_countries": [{"iso_3166_1": "US", "name": "United States of America"}],
+        "release_date": "2026-03-01", "revenue": 900_000_000, "runtime": 148,
+        "spoken_languages": [{"english_name": "English", "iso_639_1": "en", "name": "English"}],
+        "status": "Released", "tagline": "It begins.", "title": "Movie", "video": False,
+        "vote_average": 7.9, "vote_count": 12000,
+        "external_ids": _external_ids(), "watch/providers": _providers(rnd),
+    }
+    return json.dumps(d).encode()
+
+
+def sample_watch_providers(rnd) -> bytes:
+    return json.dumps(_providers(rnd)).encode()
+
+
+def sample_external_ids(rnd) -> bytes:
+    return json.dumps(_external_ids()).encode()
+
+
+def sample_omdb(rnd) -> bytes:
+    return json.dumps({
+        "Title": "Movie", "Year": "2026", "Rated": "PG-13", "Released": "01 Mar 2026", "Runtime": "148 min",
+        "Genre": "Drama, Action", "Director": "Someone", "Writer": "Someone Else, Another",
+        "Actors": "A, B, C", "Plot": "Lorem ipsum dolor sit amet. " * 6, "Language": "English",
+        "Country": "United States", "Awards": "3 wins", "Poster": "https://example.com/p.jpg",
+        "Ratings": [{"Source": "Internet Movie Database", "Value": "7.9/10"},
+                    {"Source": "Rotten Tomatoes", "Value": "91%"}, {"Source": "Metacritic", "Value": "80/100"}],
+        "Metascore": "80", "imdbRating": "7.9", "imdbVotes": "123,456", "imdbID": "tt1234567",
+        "Type": "movie", "DVD": "N/A", "BoxOffice": "$300,000,000", "Production": "N/A",
+        "Website": "N/A", "Response": "True",
+    }).encode()
+
+
+# ---------- extraction: dicts (old path) vs typed structs ----------
+
+def trending_rows_dict(data: dict) -> list:
+    return [(r.get("id"), r.get("media_type"), r.get("title") or r.get("name"), r.get("overview"),
+             r.get("popularity"), r.get("vote_average"), r.get("vote_count"),
+             r.get("release_date") or r.get("first_air_date"), r.get("poster_path"))
+            for r in data.get("results", [])]
+
+
+def trending_rows_struct(page) -> list:
+    return [(r.id, r.media_type, r.title or r.name, r.overview, r.popularity, r.vote_average,
+             r.vote_count, r.release_date or r.first_air_date, r.poster_path)
+            for r in page.results]
+
+
+def providers_dict(results: dict) -> dict:
+    return {region: {k: [(p.get("provider_name"), p.get("logo_path")) for p in (block.get(k) or [])]
+                     for k in KINDS}
+            for region, block in results.items()}
+
+
+def providers_struct(results: dict) -> dict:
+    return {region: {k: [(p.provider_name, p.logo_path) for p in getattr(block, k)] for k in KINDS}
+            for region, block in results.items()}
+
+
+def details_dict(data: dict):
+    runtime = data.get("runtime") or (data.get("episode_run_time") or [None])[0]
+    ext = data.get("external_ids") or {}
+    return (data.get("id"), runtime, [g.get("name") for g in data.get("genres") or []], ext.get("imdb_id"),
+            providers_dict((data.get("watch/providers") or {}).get("results") or {}))
+
+
+def details_struct(d):
+    runtime = d.runtime or (d.episode_run_time or [None])[0]
+    return (d.id, runtime, [g.name for g in d.genres], d.external_ids.imdb_id if d.external_ids else None,
+            providers_struct(d.watch_providers.results if d.watch_providers else {}))
+
+
+def omdb_dict(data: dict):
+    return (data.get("imdbRating"), data.get("imdbVotes")) if data.get("Response") == "True" else None
+
+
+def omdb_struct(o):
+    return (o.imdb_rating, o.imdb_votes) if o.response == "True" else None
+
+
+# name -> (sample builder, dict extractor, typed decoder, struct extractor)
+PAYLOADS = {
+    "tmdb_trending": (sample_trending, trending_rows_dict, trending_decoder, trending_rows_struct),
+    "tmdb_details": (sample_details, details_dict, details_decoder, details_struct),
+    "tmdb_watch_providers": (sample_watch_providers, lambda d: providers_dict(d.get("results") or {}),
+                             watch_providers_decoder, lambda w: providers_struct(w.results)),
+    "tmdb_external_ids": (sample_external_ids, lambda d: d.get("imdb_id"),
+                          external_ids_decoder, lambda e: e.imdb_id),
+    "omdb_title": (sample_omdb, omdb_dict, omdb_decoder, omdb_struct),
+}
+
+
+def bench(fn, repeat: int) -> float:
+    """Best-of-5 microseconds per call."""
+    runs = timeit.repeat(fn, number=repeat, repeat=5)
+    return min(runs) / repeat * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode cost per provider payload.")
+    parser.add_argument("--repeat", type=int, default=1000, help="decodes per timing run")
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(7)
+    rows = []
+    for name, (make, walk_dict, decoder, walk_struct) in PAYLOADS.items():
+        payload = make(rnd)
+        expected = walk_dict(json.loads(payload.decode("utf-8")))
+        assert walk_struct(decoder.decode(payload)) == expected, f"{name}: typed decode differs"
+
+        row = {"payload": name, "bytes": len(payload)}
+        row["json_us"] = bench(lambda: walk_dict(json.loads(payload.decode("utf-8"))), args.repeat)
+        if orjson is not None:
+            row["orjson_us"] = bench(lambda: walk_dict(orjson.loads(payload)), args.repeat)
+        row["msgspec_us"] = bench(lambda: walk_struct(decoder.decode(payload)), args.repeat)
+        row["speedup_vs_json"] = row["json_us"] / row["msgspec_us"]
+        rows.append(row)
+
+    df = pd.DataFrame(rows).round(2)
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(df.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
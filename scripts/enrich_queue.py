@@ -0,0 +1,46 @@
+# scripts/enrich_queue.py
+"""
+Inspect the enrichment job queue (data/enrichment_queue.sqlite).
+
+    python -m scripts.enrich_queue                  # task counts + dead letters
+    python -m scripts.enrich_queue --requeue-dead   # give dead letters a fresh set of attempts
+    python -m scripts.enrich_queue --requeue-dead --drain   # ... and enrich them now
+"""
+import sys
+import asyncio
+import argparse
+
+import pandas as pd
+
+from utils.job_queue import JobQueue
+from etl_enrich import ENRICH_KIND, drain, export_cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrichment queue status and dead letters.")
+    parser.add_argument("--requeue-dead", action="store_true", help="re-queue every dead-lettered task")
+    parser.add_argument("--drain", action="store_true", help="process ready tasks and re-export the cache")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue()
+    try:
+        if args.requeue_dead:
+            print(f"[queue] re-queued {queue.requeue_dead(ENRICH_KIND)} dead-lettered tasks")
+        if args.drain:
+            print(f"[queue] drained: {asyncio.run(drain(queue))}")
+            export_cache(queue)
+
+        print(f"[queue] {queue.counts(ENRICH_KIND)}")
+        dead = queue.dead_letters(ENRICH_KIND)
+        if dead:
+            df = pd.DataFrame(dead).drop(columns="payload")
+            df["updated_at"] = pd.to_datetime(df["updated_at"], unit="s", utc=True)
+            with pd.option_context("display.width", 160, "display.max_colwidth", 80):
+                print(df.to_string(index=False))
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+# scripts/load_test.py
+"""
+Concurrent-session load test for app_streamlit.py.
+
+Simulates N concurrent viewers, each in its own process: a session is an
+AppTest (session state, caches, GIL of its own, like one app replica per
+viewer) that replays an interaction script: first load, switch horizon,
+change country, toggle dark mode, open the API Performance panel, go back.
+Each process runs the app once untimed, then all start together and every
+rerun is timed. For each session count the report shows rerun latency
+percentiles, throughput, CPU summed over the session processes and their
+summed peak RSS.
+
+Providers are served by a local stub (TMDB trending + details, OMDb) on
+127.0.0.1, wired in through TMDB_API_BASE / OMDB_API_BASE, so no real
+API is called and no keys are needed. The app runs against a synthetic
+data dir in a temp folder (trending history, enrichment cache, snapshots,
+search index, a week of perf log), as if the ETL had just run. Warm runs
+make no provider requests; --cold leaves out enrichment and snapshots so
+the gallery's live lookups hit the stub.
+
+    python -m scripts.load_test --sessions 1,2,4,8 --iterations 3
+    python -m scripts.load_test --sessions 4 --cold          # no ETL enrichment: live fallbacks
+    python -m scripts.load_test --stub-latency-ms 150 --out load_test.csv
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import pathlib
+import resource
+import tempfile
+import threading
+import multiprocessing as mp
+from queue import Empty
+
+import pandas as pd
+
+APP_PATH = pathlib.Path(__file__).resolve().parent.parent / "app_streamlit.py"
+COUNTRIES = ["US", "IN", "GB", "CA", "AU", "DE", "FR", "BR", "MX"]
+PROVIDER_NAMES = ["Netflix", "Disney Plus", "Max", "Apple TV", "Prime Video", "Hulu"]
+
+
+# ---------- provider stubs ----------
+
+def _title(item_id: int, media_type: str) -> str:
+    return f"Stub {'Movie' if media_type == 'movie' else 'Show'} {item_id}"
+
+
+def _trending_results(n: int = 20) -> list[dict]:
+    out = []
+    for i in random.sample(range(1, 400), n):
+        media_type = "movie" if i % 3 else "tv"
+        name_key = "title" if media_type == "movie" else "name"
+        date_key = "release_date" if media_type == "movie" else "first_air_date"
+        out.append({
+            "id": i, "media_type": media_type, name_key: _title(i, media_type),
+            "overview": "Synthetic title for load testing.",
+            "popularity": round(random.uniform(10, 500), 2),
+            "vote_average": round(random.uniform(4, 9), 1),
+            "vote_count": random.randint(10, 20000),
+            date_key: "2026-01-01", "poster_path": f"/stub{i}.jpg",
+        })
+    return out
+
+
+def _details(item_id: int, media_type: str) -> dict:
+    rnd = random.Random(item_id)
+    regions = {
+        c: {"flatrate": [{"provider_name": p, "logo_path": None}
+                         for p in rnd.sample(PROVIDER_NAMES, 2)]}
+        for c in COUNTRIES
+    }
+    return {
+        "id": item_id, "title": _title(item_id, media_type), "runtime": 100,
+        "genres": [{"id": 18, "name": "Drama"}],
+        "external_ids": {"imdb_id": f"tt{item_id:07d}"},
+        "watch/providers": {"results": regions},
+    }
+
+
+class ProviderStub:
+    """TMDB + OMDb lookalike on a background thread; `latency_ms` simulates upstream time."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self.port = _free_port()
+        self._loop = None
+        self._ready = threading.Event()
+
+    @property
+    def tmdb_base(self) -> str:
+        return f"http://127.0.0.1:{self.port}/3"
+
+    @property
+    def omdb_base(self) -> str:
+        return f"http://127.0.0.1:{self.port}/omdb/"
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait(10)
+        return self
+
+    def _serve(self):
+        from aiohttp import web
+
+        async def respond(payload):
+            self.requests += 1
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000.0)
+            return web.json_response(payload)
+
+        async def trending(request):
+            return await respond({"page": 1, "results": _trending_results()})
+
+        async def details(request):
+            mt, item_id = request.match_info["media_type"], int(request.match_info["item_id"])
+            return await respond(_details(item_id, mt))
+
+        async def omdb(request):
+            imdb_id = request.query.get("i", "")
+            return await respond({"Response": "True", "imdbID": imdb_id,
+                                  "imdbRating": "7.4", "imdbVotes": "123,456"})
+
+        app = web.Application()
+        app.router.add_get("/3/trending/{media_type}/{window}", trending)
+        app.router.add_get("/3/{media_type}/{item_id}", details)
+        app.router.add_get("/omdb/", omdb)
+
+        async def main():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", self.port).start()
+            self._ready.set()
+            await asyncio.Event().wait()
+
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(main())
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------- synthetic data dir ----------
+
+PERF_ENDPOINTS = {
+    "tmdb": ["trending_movie_day", "trending_tv_day", "details_movie", "details_tv", "videos_movie"],
+    "omdb": ["rating_lookup"],
+    "youtube": ["videos_list"],
+}
+
+
+def _perf_log(now: pd.Timestamp, days: int = 7, per_hour: int = 6) -> pd.DataFrame:
+    """Provider requests over the last `days`, in the shape etl_fetch.append_perf writes."""
+    from etl_fetch import PERF_COLUMNS
+
+    rnd = random.Random(0)
+    rows = []
+    for h in range(days * 24):
+        for _ in range(per_hour):
+            provider = rnd.choice(list(PERF_ENDPOINTS))
+            status = 429 if rnd.random() < 0.02 else 200
+            rows.append({
+                "ts": (now - pd.Timedelta(hours=h, seconds=rnd.randrange(3600))).isoformat(),
+                "provider": provider, "endpoint": rnd.choice(PERF_ENDPOINTS[provider]),
+                "status": status, "latency_ms": round(rnd.lognormvariate(5, 0.5), 1),
+                "bytes": rnd.randint(800, 40_000) if status == 200 else 0,
+                "ratelimit_limit": None, "ratelimit_remaining": None,
+                "retry_after": "2" if status == 429 else None,
+                "concurrency_limit": rnd.randint(4, 16) if provider == "tmdb" else None,
+            })
+    return pd.DataFrame(rows, columns=PERF_COLUMNS)
+
+
+def build_data_dir(workdir: pathlib.Path, pulls: int = 72, cold: bool = False):
+    """
+    Trending history for both windows, its search index and a perf log
+    (+ enrichment and snapshots unless cold).
+    """
+    from utils.snapshot import publish_snapshot
+    from utils.search_index import sync_index
+
+    data = workdir / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    rows = []
+    now = pd.Timestamp.now(tz="UTC").floor("h")
+    for window in ("day", "week"):
+        for h in range(pulls):
+            ts = now - pd.Timedelta(hours=pulls - h)
+            for r in _trending_results():
+                rows.append({
+                    "ts": ts, "window": window, "id": r["id"], "media_type": r["media_type"],
+                    "title": r.get("title") or r.get("name"), "overview": r["overview"],
+                    "popularity": r["popularity"], "vote_average": r["vote_average"],
+                    "vote_count": r["vote_count"],
+                    "release_date": r.get("release_date") or r.get("first_air_date"),
+                    "poster_path": r["poster_path"],
+                })
+    history = pd.DataFrame(rows)
+    history.to_parquet(data / "tmdb_trending.parquet", index=False)
+    sync_index(data / "title_index.sqlite", data)
+    _perf_log(now).to_parquet(data / "perf_log.parquet", index=False)
+    if cold:
+        return
+
+    titles = history[["id", "media_type"]].drop_duplicates()
+    enrichment = pd.DataFrame({
+        "id": titles["id"], "media_type": titles["media_type"],
+        "imdb_id": [f"tt{i:07d}" for i in titles["id"]],
+        "imdb_rating": "7.4", "imdb_votes": "123,456", "runtime": 100, "genres": "Drama",
+        "providers": [
+            json.dumps({c: {"flatrate": [[p["provider_name"], p["logo_path"]] for p in block["flatrate"]]}
+                        for c, block in _details(int(i), mt)["watch/providers"]["results"].items()})
+            for i, mt in zip(titles["id"], titles["media_type"])
+        ],
+        "enriched_at": now,
+    })
+    enrichment.to_parquet(data / "enrichment_cache.parquet", index=False)
+    for window in ("day", "week"):
+        hist = history[history["window"] == window]
+        publish_snapshot(hist[hist["ts"] == hist["ts"].max()], enrichment, data)
+
+
+# ---------- sessions ----------
+
+def _widget(elements, label):
+    for w in elements:
+        if w.label == label:
+            return w
+    raise LookupError(f"widget {label!r} not found")
+
+
+def interaction_script(rnd: random.Random) -> list:
+    """(step name, action(at) -> at) pairs for one pass of a typical viewer."""
+    return [
+        ("load", lambda at: at),
+        ("horizon_week", lambda at: _widget(at.radio, "Time horizon").set_value("This Week")),
+        ("country", lambda at: _widget(at.selectbox, "Country").set_value(rnd.choice(COUNTRIES))),
+        ("dark_mode", lambda at: _widget(at.toggle, "Dark mode").set_value(True)),
+        ("perf_panel", lambda at: _widget(at.toggle, "API Performance").set_value(True)),
+        ("horizon_today", lambda at: _widget(at.radio, "Time horizon").set_value("Today")),
+        ("light_mode", lambda at: _widget(at.toggle, "Dark mode").set_value(False)),
+        ("perf_panel_off", lambda at: _widget(at.toggle, "API Performance").set_value(False)),
+    ]
+
+
+def _cpu_s() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def run_session(session: int, iterations: int, think_ms: float, start, results, timeout: float):
+    """
+    One viewer in its own process: warm the app up, wait for the other
+    sessions, replay the script and put a report (timed reruns, CPU seconds,
+    wall clock span, peak RSS) on `results`.
+    """
+    rows = []
+    report = {"session": session, "rows": rows, "cpu_s": 0.0, "t0": time.time(), "t1": time.time()}
+    try:
+        from streamlit.testing.v1 import AppTest
+
+        rnd = random.Random(session)
+        at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        at.run()  # untimed: imports, first parquet/duckdb opens, this process's caches
+        start.wait(timeout)
+        cpu0, report["t0"] = _cpu_s(), time.time()
+        for it in range(iterations):
+            steps = interaction_script(rnd)
+            if it > 0:
+                steps = steps[1:]  # reload only once per session
+            for step, action in steps:
+                error = None
+                t = time.perf_counter()
+                try:
+                    action(at).run()
+                    if at.exception:
+                        error = str(at.exception[0].value)[:200]
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"[:200]
+                ms = (time.perf_counter() - t) * 1000.0
+                # the app always renders the dark mode toggle; a page without
+                # it is counted, kept in the latencies and re-run once so the
+                # next step starts from a rendered page
+                empty = error is None and not len(at.toggle)
+                if empty:
+                    at.run()
+                rows.append({"session": session, "iteration": it, "step": step,
+                             "latency_ms": round(ms, 1), "error": error, "empty_render": empty})
+                if think_ms:
+                    time.sleep(rnd.uniform(0.5, 1.5) * think_ms / 1000.0)
+        report.update(cpu_s=_cpu_s() - cpu0, t1=time.time())
+    except Exception as e:
+        start.abort()  # don't leave the other sessions waiting at the barrier
+        rows.append({"session": session, "iteration": -1, "step": "setup", "latency_ms": float("nan"),
+                     "error": f"{type(e).__name__}: {e}"[:200], "empty_render": False})
+    report["peak_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+    results.put(report)
+
+
+def run_round(sessions: int, iterations: int, think_ms: float, timeout: float) -> tuple[pd.DataFrame, dict]:
+    # spawn: every session starts from a fresh interpreter, with the env and
+    # cwd set up in main()
+    ctx = mp.get_context("spawn")
+    start, results = ctx.Barrier(sessions), ctx.Queue()
+    procs = [
+        ctx.Process(target=run_session, args=(s, iterations, think_ms, start, results, timeout), daemon=True)
+        for s in range(sessions)
+    ]
+    for p in procs:
+        p.start()
+    reports = []
+    while len(reports) < sessions:
+        try:
+            reports.append(results.get(timeout=1.0))
+        except Empty:
+            if not any(p.is_alive() for p in procs):
+                raise RuntimeError(f"{sessions - len(reports)} session processes exited without a report")
+    for p in procs:
+        p.join()
+
+    df = pd.DataFrame([r for rep in reports for r in rep["rows"]])
+    lat = df["latency_ms"]
+    wall_s = max(r["t1"] for r in reports) - min(r["t0"] for r in reports)
+    cpu_s = sum(r["cpu_s"] for r in reports)
+    summary = {
+        "sessions": sessions,
+        "reruns": int(lat.notna().sum()),
+        "errors": int(df["error"].notna().sum()),
+        "empty_renders": int(df["empty_render"].sum()),
+        "p50_ms": round(lat.quantile(0.50), 1),
+        "p90_ms": round(lat.quantile(0.90), 1),
+        "p95_ms": round(lat.quantile(0.95), 1),
+        "p99_ms": round(lat.quantile(0.99), 1),
+        "max_ms": round(lat.max(), 1),
+        "reruns_per_s": round(lat.notna().sum() / wall_s, 2) if wall_s > 0 else None,
+        # summed over the session processes: 100% is one core busy
+        "cpu_pct": round(100.0 * cpu_s / wall_s, 1) if wall_s > 0 else None,
+        "peak_rss_mb": round(sum(r["peak_rss"] for r in reports) / 2**20, 1),
+        "wall_s": round(wall_s, 1),
+    }
+    return df, summary
+
+
+# ---------- main ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app_streamlit.py.")
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma-separated session counts, one round each")
+    parser.add_argument("--iterations", type=int, default=2, help="passes of the interaction script per session")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between interactions")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="simulated upstream API latency")
+    parser.add_argument("--cold", action="store_true", help="no ETL enrichment/snapshot: gallery falls back to live lookups")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-rerun timeout (s)")
+    parser.add_argument("--workdir", help="where to build the synthetic data dir (default: temp)")
+    parser.add_argument("--out", help="write every timed rerun to this CSV")
+    parser.add_argument("--allow-empty-renders", action="store_true",
+                        help="don't fail the run when AppTest returns empty pages")
+    args = parser.parse_args(argv)
+    counts = [int(n) for n in args.sessions.split(",") if n.strip()]
+
+    stub = ProviderStub(args.stub_latency_ms).start()
+    os.environ.update({
+        "TMDB_API_BASE": stub.tmdb_base, "TMDB_V3_KEY": "load-test",
+        "OMDB_API_BASE": stub.omdb_base, "OMDB_API_KEY": "load-test",
+    })
+    os.environ.pop("TMDB_BEARER", None)
+    os.environ.pop("TMDB_API_KEY", None)
+
+    out = pathlib.Path(args.out).resolve() if args.out else None
+    workdir = pathlib.Path(args.workdir or tempfile.mkdtemp(prefix="media_load_")).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    sys.path.insert(0, str(APP_PATH.parent))
+    os.chdir(workdir)  # the app and providers use ./data; session processes inherit cwd and env
+    print(f"[load] data dir {workdir / 'data'} (cold={args.cold}); stub on :{stub.port}; "
+          f"{len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()} cores")
+    build_data_dir(workdir, cold=args.cold)
+
+    frames, summaries = [], []
+    for n in counts:
+        df, summary = run_round(n, args.iterations, args.think_ms, args.timeout)
+        frames.append(df.assign(sessions=n))
+        summaries.append(summary)
+        print(f"[load] {n} sessions: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, "
+              f"cpu {summary['cpu_pct']}%, rss {summary['peak_rss_mb']} MB, errors {summary['errors']}")
+        if summary["empty_renders"]:
+            print(f"[load] WARNING: {summary['empty_renders']} of {summary['reruns']} reruns came back "
+                  f"as an empty page at {n} sessions; their latencies are included above")
+
+    report = pd.DataFrame(summaries)
+    timed = pd.concat(frames)
+    steps = (timed.groupby(["sessions", "step"])["latency_ms"]
+             .quantile(0.95).unstack("step").round(1))
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print("\nRerun latency by session count")
+        print(report.to_string(index=False))
+        print("\np95 latency (ms) by interaction")
+        print(steps.to_string())
+    print(f"\n[load] stub served {stub.requests} provider requests"
+          + ("" if args.cold else " (warm data dir: the gallery reads the ETL caches)"))
+
+    errors = pd.concat(frames).dropna(subset=["error"])
+    if len(errors):
+        print("\n[load] first errors:")
+        print(errors.drop_duplicates("error").head(5).to_string(index=False))
+    if out is not None:
+        pd.concat(frames).to_csv(out, index=False)
+        print(f"[load] wrote {out}")
+    empty = int(report["empty_renders"].sum())
+    if empty and not args.allow_empty_renders:
+        print(f"\n[load] FAILED: {empty} reruns rendered an empty page (see empty_renders); "
+              f"re-run, or pass --allow-empty-renders to accept them")
+    return 1 if len(errors) or (empty and not args.allow_empty_renders) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# scripts/search_titles.py
+"""
+Search the trending history from the command line.
+
+    python -m scripts.search_titles "spider verse"
+    python -m scripts.search_titles "dune" --appearances
+    python -m scripts.search_titles --rebuild      # re-index every pull
+"""
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+from utils.search_index import INDEX_PATH, search, appearances_for, sync_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search titles across the trending history.")
+    parser.add_argument("query", nargs="?", help="title words (prefixes are fine)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--appearances", action="store_true", help="list every pull of the top match")
+    parser.add_argument("--rebuild", action="store_true", help="drop the index and re-index all pulls")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        for suffix in ("", "-wal", "-shm"):
+            INDEX_PATH.with_name(INDEX_PATH.name + suffix).unlink(missing_ok=True)
+    if args.rebuild or not INDEX_PATH.exists():
+        print(f"[search] indexed {sync_index()} title appearances")
+    if not args.query:
+        return 0
+
+    t = time.perf_counter()
+    hits = search(args.query, limit=args.limit)
+    ms = (time.perf_counter() - t) * 1000.0
+    if hits.empty:
+        print(f"[search] no matches for {args.query!r} ({ms:.1f} ms)")
+        return 1
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(hits.to_string(index=False))
+        print(f"[search] {len(hits)} matches in {ms:.1f} ms")
+        if args.appearances:
+            top = hits.iloc[0]
+            print(f"\nAppearances of {top['title']} ({top['media_type']}):")
+            print(appearances_for(int(top["id"]), top["media_type"]).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# tests/conftest.py
+import sys
+import socket
+import asyncio
+import pathlib
+import threading
+
+import pytest
+
+# run from anywhere: modules import as top-level packages (providers, utils, ...)
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+
+class StubServer:
+    """An aiohttp app served on 127.0.0.1 from a background thread."""
+
+    def __init__(self, app):
+        self.app = app
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.port = s.getsockname()[1]
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._runner = None
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        assert self._ready.wait(10), "stub server did not start"
+        return self
+
+    def _serve(self):
+        from aiohttp import web
+
+        async def main():
+            self._runner = web.AppRunner(self.app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+            self._ready.set()
+
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(main())
+        self._loop.run_forever()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+@pytest.fixture
+def stub_server():
+    """Call with an aiohttp web.Application; returns the running StubServer."""
+    servers = []
+
+    def start(app):
+        servers.append(StubServer(app).start())
+        return servers[-1]
+
+    yield start
+    for s in servers:
+        s.stop()
@@ -0,0 +1,168 @@
+# tests/test_api.py
+"""api_server.py response cache, content negotiation and endpoints (TestClient)."""
+import gzip
+import json
+import threading
+
+import pandas as pd
+import pytest
+from starlette.requests import Request
+from starlette.testclient import TestClient
+
+import api_server
+from utils.snapshot import publish_snapshot
+from utils.search_index import sync_index
+
+TS = pd.Timestamp("2026-10-19 08:00", tz="UTC")
+TS_TEXT = "2026-10-19T08:00:00.000000Z"
+N_TITLES = 30
+
+
+def _request(accept_encoding: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"",
+                    "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+def test_response_cache_is_bounded_lru():
+    cache = api_server.ResponseCache(max_entries=3)
+    builds = []
+
+    def get(q):
+        def build():
+            builds.append(q)
+            return 200, {"q": q}
+        return cache.get_or_build(f"/v1/search?q={q}", "batch-1", build)
+
+    for q in ("a", "b", "c"):
+        get(q)
+    get("a")                      # a is now the most recently used
+    get("d")                      # evicts b
+    assert list(cache.entries) == ["/v1/search?q=c", "/v1/search?q=a", "/v1/search?q=d"]
+
+    get("a")
+    get("b")
+    assert builds == ["a", "b", "c", "d", "b"]
+    assert len(cache.entries) == 3
+
+
+def test_new_batch_drops_every_entry():
+    cache = api_server.ResponseCache(max_entries=3)
+    cache.get_or_build("/x", "batch-1", lambda: (200, {}))
+    cache.get_or_build("/y", "batch-2", lambda: (200, {}))
+    assert list(cache.entries) == ["/y"]
+
+
+def test_brotli_preferred_when_offered():
+    pytest.importorskip("brotli")
+    body = b'{"items":[' + b",".join(b'{"id":%d}' % i for i in range(200)) + b"]}"
+    entry = api_server._Cached(body)
+
+    assert api_server._pick_encoding(_request("gzip, deflate, br"), len(body)) == "br"
+    assert api_server.brotli.decompress(entry.encoded("br")) == body
+    assert api_server._pick_encoding(_request("gzip"), len(body)) == "gzip"
+    assert gzip.decompress(entry.encoded("gzip")) == body
+    assert api_server._pick_encoding(_request("br"), 100) == "identity"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The API over one day pull (+ snapshot, enrichment, search index) in ./data."""
+    data = tmp_path / "data"
+    data.mkdir()
+    batch = pd.DataFrame({
+        "ts": TS, "window": "day", "id": range(1, N_TITLES + 1),
+        "media_type": ["movie", "tv"] * (N_TITLES // 2),
+        "title": [f"Title {i}" for i in range(1, N_TITLES + 1)],
+        "popularity": [float(i) for i in range(1, N_TITLES + 1)],
+    })
+    batch.to_parquet(data / "tmdb_trending.parquet", index=False)
+    enrichment = pd.DataFrame({
+        "id": [1], "media_type": ["tv"], "imdb_rating": ["7.1"], "imdb_votes": ["1,234"],
+        "providers": [json.dumps({"US": {"flatrate": [["Netflix", None]]}})], "enriched_at": [TS],
+    })
+    enrichment.to_parquet(data / "enrichment_cache.parquet", index=False)
+    publish_snapshot(batch, enrichment, data)
+
+    monkeypatch.chdir(tmp_path)
+    sync_index()
+    monkeypatch.setattr(api_server, "cache", api_server.ResponseCache())
+    monkeypatch.setattr(api_server, "_local", threading.local())
+    with TestClient(api_server.app) as c:
+        yield c
+
+
+def test_latest_pages_and_filters_the_snapshot(client):
+    r = client.get("/v1/trending/latest", params={"media_type": "tv", "per_page": 10, "page": 1})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == N_TITLES // 2 and body["next_page"] == 2 and body["ts"] == TS_TEXT
+    assert [i["id"] for i in body["items"]] == list(range(N_TITLES, N_TITLES - 20, -2))
+
+    last = client.get("/v1/trending/latest", params={"media_type": "tv", "per_page": 10, "page": 2}).json()
+    assert len(last["items"]) == 5 and last["next_page"] is None
+    assert last["items"][0]["ts"] == TS_TEXT
+
+
+def test_etag_revalidation_per_encoding(client):
+    plain = client.get("/v1/trending/latest", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/v1/trending/latest", headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert plain.headers["vary"] == zipped.headers["vary"] == "Accept-Encoding"
+    assert plain.headers["etag"] != zipped.headers["etag"]
+    assert plain.json() == zipped.json()
+
+    same = client.get("/v1/trending/latest", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": zipped.headers["etag"]})
+    assert same.status_code == 304 and same.headers["etag"] == zipped.headers["etag"]
+    # the identity tag does not validate the gzip body
+    other = client.get("/v1/trending/latest", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]})
+    assert other.status_code == 200
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/v1/trending/latest", {"page": "x"}),
+    ("/v1/trending/latest", {"window": "month"}),
+    ("/v1/trending/batches", {"per_page": "1.5"}),
+    ("/v1/trending/batches/not-a-time", {}),
+    ("/v1/enrichment", {"ids": "1,a"}),
+    ("/v1/enrichment", {"ids": ",".join(str(i) for i in range(api_server.MAX_PER_PAGE + 1))}),
+    ("/v1/search", {}),
+])
+def test_bad_parameters_are_400(client, path, params):
+    r = client.get(path, params=params)
+    assert r.status_code == 400 and "error" in r.json()
+
+
+@pytest.mark.parametrize("path", [
+    "/v1/trending/batches/2020-01-01T00:00:00Z",
+    "/v1/trending/batches/now",
+    "/v1/enrichment/movie/999",
+    "/v1/titles/movie/999/appearances",
+])
+def test_unknown_resources_are_404(client, path):
+    assert client.get(path).status_code == 404
+
+
+def test_batch_by_ts_in_any_offset(client):
+    for ts in (TS_TEXT, "2026-10-19T08:00:00+00:00", "2026-10-19T10:00:00+02:00", "2026-10-19 08:00"):
+        r = client.get(f"/v1/trending/batches/{ts}", params={"per_page": 100})
+        assert r.status_code == 200, ts
+        body = r.json()
+        assert body["ts"] == TS_TEXT and body["total"] == N_TITLES
+
+
+def test_timestamps_match_across_endpoints(client):
+    batches = client.get("/v1/trending/batches").json()["items"]
+    hit = client.get("/v1/search", params={"q": "title 7"}).json()["items"][0]
+    apps = client.get(f"/v1/titles/{hit['media_type']}/{hit['id']}/appearances").json()["items"]
+    enr = client.get("/v1/enrichment/tv/1").json()
+    assert batches[0]["ts"] == hit["last_seen"] == apps[0]["ts"] == enr["enriched_at"] == TS_TEXT
+    assert enr["providers"] == {"US": {"flatrate": [["Netflix", None]]}}
+
+
+def test_top_titles_and_churn(client):
+    top = client.get("/v1/titles/top", params={"limit": 3}).json()
+    assert [i["id"] for i in top["items"]] == [30, 29, 28]
+    assert top["items"][0]["first_seen"] == TS_TEXT
+    assert client.get("/v1/trending/churn").json()["items"] == []
@@ -0,0 +1,135 @@
+# tests/test_app.py
+"""app_streamlit.py rendered with AppTest on a local data dir (no API calls)."""
+import os
+import json
+import asyncio
+import pathlib
+
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from utils.snapshot import publish_snapshot, publish_latest, open_snapshot, snapshot_ts
+
+os.environ.setdefault("OMDB_API_KEY", "test-key")
+
+import providers.omdb as omdb
+import providers.tmdb as tmdb
+
+APP_PATH = pathlib.Path(__file__).resolve().parent.parent / "app_streamlit.py"
+N_TITLES = 12
+
+
+def _data_dir(root: pathlib.Path, snapshot: bool, enriched: bool = True):
+    """One day pull; every other title has no IMDb data in the enrichment cache."""
+    data = root / "data"
+    data.mkdir()
+    ts = pd.Timestamp.now(tz="UTC").floor("h")
+    batch = pd.DataFrame({
+        "ts": ts, "window": "day", "id": range(1, N_TITLES + 1),
+        "media_type": ["movie", "tv"] * (N_TITLES // 2),
+        "title": [f"Title {i}" for i in range(1, N_TITLES + 1)],
+        "overview": "", "popularity": [100.0 - i for i in range(N_TITLES)],
+        "vote_average": 7.0, "vote_count": 100, "release_date": "2026-01-01",
+        "poster_path": [f"/p{i}.jpg" for i in range(1, N_TITLES + 1)],
+    })
+    batch.to_parquet(data / "tmdb_trending.parquet", index=False)
+
+    has_imdb = [i % 2 == 0 for i in range(N_TITLES)]
+    enrichment = pd.DataFrame({
+        "id": batch["id"], "media_type": batch["media_type"],
+        "imdb_id": [f"tt{i:07d}" if ok else None for i, ok in zip(batch["id"], has_imdb)],
+        "imdb_rating": ["7.4" if ok else None for ok in has_imdb],
+        "imdb_votes": ["123,456" if ok else None for ok in has_imdb],
+        "runtime": 100, "genres": "Drama",
+        "providers": json.dumps({"US": {"flatrate": [["Netflix", None]]}}),
+        "enriched_at": ts,
+    })
+    if enriched:
+        enrichment.to_parquet(data / "enrichment_cache.parquet", index=False)
+    if snapshot:
+        publish_snapshot(batch, enrichment if enriched else None, data)
+
+
+@pytest.fixture
+def app_in(tmp_path, monkeypatch):
+    def start(snapshot: bool, enriched: bool = True) -> AppTest:
+        _data_dir(tmp_path, snapshot, enriched)
+        monkeypatch.chdir(tmp_path)    # the app reads ./data
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        at = AppTest.from_file(str(APP_PATH), default_timeout=60)
+        return at.run()
+    return start
+
+
+@pytest.mark.parametrize("snapshot", [True, False], ids=["snapshot", "duckdb"])
+def test_gallery_renders_titles_without_imdb_data(app_in, snapshot):
+    at = app_in(snapshot)
+    assert not at.exception, at.exception[0].value if at.exception else None
+
+    cards = [m.value for m in at.markdown if 'class="poster-card"' in m.value]
+    assert len(cards) == N_TITLES
+    assert sum("IMDb 7.4 / 10 • 123 456 votes" in c for c in cards) == N_TITLES // 2
+    assert sum("IMDb N/A / 10" in c for c in cards) == N_TITLES // 2
+    assert not any("IMDb nan" in c for c in cards)
+
+
+def test_snapshot_older_than_history_is_not_used(app_in, tmp_path):
+    at = app_in(snapshot=True)
+    data = tmp_path / "data"
+    # a newer pull written without republishing (e.g. another writer)
+    hist = pd.read_parquet(data / "tmdb_trending.parquet")
+    newer = hist.assign(ts=hist["ts"] + pd.Timedelta(hours=1), title=hist["title"] + " (new)")
+    pd.concat([hist, newer]).to_parquet(data / "tmdb_trending.parquet", index=False)
+
+    at.run()
+    assert not at.exception
+    cards = [m.value for m in at.markdown if 'class="poster-card"' in m.value]
+    assert len(cards) == N_TITLES and all("(new)" in c for c in cards)
+
+    # republishing brings the snapshot up to the history's pull
+    publish_latest("day", data)
+    assert snapshot_ts(open_snapshot("day", data)) == newer["ts"].iloc[0]
+
+
+def test_rerun_ending_in_st_stop_is_profiled(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()               # no pulls yet: the script stops early
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("APP_PROFILE", "1")
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(str(APP_PATH), default_timeout=60).run()
+    assert not at.exception
+    assert "No TMDB data yet" in at.info[0].value
+
+    profile = pd.read_parquet(tmp_path / "data" / "app_profile.parquet")
+    assert profile["stage"].tolist() == ["total"]
+
+
+def test_unenriched_gallery_titles_are_looked_up_together(app_in, monkeypatch):
+    in_flight, peak, looked_up = [0], [0], []
+
+    async def details(item_id, media_type):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.02)
+        in_flight[0] -= 1
+        looked_up.append(item_id)
+        return {"imdb_id": f"tt{item_id:07d}",
+                "providers": {"US": {"flatrate": [["Stub+", None]]}}}
+
+    async def rating(imdb_id, raise_on_error=False):
+        return {"imdbRating": "6.5", "imdbVotes": "1,000"}
+
+    monkeypatch.setattr(tmdb, "fetch_tmdb_details", details)
+    monkeypatch.setattr(omdb, "fetch_omdb_rating", rating)
+    at = app_in(snapshot=False, enriched=False)
+    assert not at.exception, at.exception[0].value if at.exception else None
+
+    cards = [m.value for m in at.markdown if 'class="poster-card"' in m.value]
+    assert len(cards) == N_TITLES
+    assert all("IMDb 6.5 / 10" in c and "Stub+" in c for c in cards)
+    assert sorted(looked_up) == list(range(1, N_TITLES + 1))
+    assert peak[0] > 1          # fanned out, not one card at a time
@@ -0,0 +1,111 @@
+# tests/test_concurrency.py
+"""providers/concurrency.py: one limiter shared by event loops on several threads."""
+import asyncio
+import threading
+
+from providers.concurrency import AdaptiveLimiter
+
+
+def _fixed(limit: int) -> AdaptiveLimiter:
+    return AdaptiveLimiter("test", initial=limit, min_limit=limit, max_limit=limit)
+
+
+def test_limit_holds_across_threads_and_loops():
+    limiter = _fixed(2)
+    lock = threading.Lock()
+    active, peak, done = [0], [0], []
+
+    async def request():
+        async with limiter.slot():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.0005)
+            with lock:
+                active[0] -= 1
+        limiter.record(200, 1.0)
+
+    def session():
+        async def run():
+            await asyncio.gather(*(request() for _ in range(200)))
+        asyncio.run(run())
+        done.append(True)
+
+    threads = [threading.Thread(target=session, daemon=True) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+
+    assert len(done) == 4, "an event loop never got a slot"
+    assert peak[0] <= 2
+    assert limiter.in_flight == 0 and not limiter._waiters
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = _fixed(1)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def holder():
+            async with limiter.slot():
+                await release.wait()
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        await held
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        # the slot is free again for the next request
+        async with limiter.slot():
+            assert limiter.in_flight == 1
+        assert limiter.in_flight == 0
+
+    asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_raised_limit_admits_waiters():
+    limiter = AdaptiveLimiter("test", initial=1, max_limit=4)
+
+    async def run():
+        started = []
+
+        async def request(n):
+            async with limiter.slot():
+                started.append(n)
+                await asyncio.sleep(0.05)
+
+        tasks = [asyncio.create_task(request(n)) for n in range(3)]
+        await asyncio.sleep(0.01)
+        assert started == [0]
+        limiter.limit = 3.0
+        limiter.record(200, 1.0)        # feedback wakes the queued requests
+        await asyncio.sleep(0.01)
+        assert sorted(started) == [0, 1, 2]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_get_limiter_creates_one_limiter_per_provider(monkeypatch):
+    from providers import concurrency
+
+    monkeypatch.setattr(concurrency, "_LIMITERS", {})
+    barrier = threading.Barrier(8)
+    got = []
+
+    def session():
+        barrier.wait()
+        got.append(concurrency.get_limiter("tmdb"))
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert len(got) == 8 and all(lim is got[0] for lim in got)
@@ -0,0 +1,84 @@
+# tests/test_enrich.py
+"""etl_enrich task handling: failed OMDb lookups retry, dead letters come back."""
+import os
+import asyncio
+
+import pytest
+from aiohttp import web
+
+os.environ.setdefault("OMDB_API_KEY", "test-key")
+
+import etl_enrich
+import etl_fetch
+import providers.omdb as omdb
+import providers.tmdb as tmdb
+from utils.job_queue import JobQueue
+
+PAYLOAD = {"id": 7, "media_type": "movie", "regions": ["US"]}
+
+
+@pytest.fixture
+def omdb_stub(stub_server, monkeypatch, tmp_path):
+    """OMDb answering with the given (status, body); TMDB details stubbed in-process."""
+    def start(status: int, body: dict):
+        async def lookup(request):
+            return web.json_response(body, status=status)
+
+        app = web.Application()
+        app.router.add_get("/", lookup)
+        server = stub_server(app)
+        monkeypatch.setattr(omdb, "OMDB_BASE", server.base + "/")
+        monkeypatch.setattr(etl_fetch, "DATA_DIR", tmp_path)
+
+        async def details(item_id, media_type):
+            return {"imdb_id": "tt0000007", "runtime": 90, "genres": ["Drama"], "providers": {}}
+        monkeypatch.setattr(tmdb, "fetch_tmdb_details", details)
+    return start
+
+
+def test_omdb_limit_reached_is_retried(omdb_stub):
+    omdb_stub(401, {"Response": "False", "Error": "Request limit reached!"})
+    with pytest.raises(RuntimeError, match="OMDb error 401"):
+        asyncio.run(etl_enrich.enrich_title(PAYLOAD))
+
+
+def test_omdb_server_error_is_retried(omdb_stub):
+    omdb_stub(503, {})
+    with pytest.raises(RuntimeError, match="OMDb error 503"):
+        asyncio.run(etl_enrich.enrich_title(PAYLOAD))
+
+
+def test_omdb_not_found_completes_without_rating(omdb_stub):
+    omdb_stub(200, {"Response": "False", "Error": "Incorrect IMDb ID."})
+    result = asyncio.run(etl_enrich.enrich_title(PAYLOAD))
+    assert result["imdb_id"] == "tt0000007"
+    assert result["imdb_rating"] is None and result["imdb_votes"] is None
+
+
+def test_dead_letters_reported_and_requeued(tmp_path, capsys):
+    queue = JobQueue(tmp_path / "queue.sqlite", max_attempts=1)
+    try:
+        etl_enrich.enqueue_titles(queue, [(7, "movie")])
+
+        async def failing(payload):
+            raise RuntimeError("OMDb error 401")
+
+        assert asyncio.run(etl_enrich.drain(queue, handler=failing, workers=1)) == {"dead": 1}
+        dead = etl_enrich.report_dead_letters(queue)
+        assert [d["task_key"] for d in dead] == ["movie:7"]
+        assert "movie:7 after 1 attempts" in capsys.readouterr().out
+
+        # too recent for the automatic retry, but a manual requeue revives it
+        assert queue.requeue_dead(older_than_s=3600) == 0
+        assert queue.requeue_dead() == 1
+        assert queue.counts() == {"pending": 1}
+    finally:
+        queue.close()
+
+
+def test_without_omdb_key_titles_are_enriched_from_tmdb(omdb_stub, monkeypatch):
+    omdb_stub(500, {})                      # would fail the task if it were called
+    monkeypatch.setattr(etl_enrich, "omdb_enabled", lambda: False)
+    result = asyncio.run(etl_enrich.enrich_title(PAYLOAD))
+    assert result["imdb_id"] == "tt0000007" and result["imdb_rating"] is None
+    assert result["providers"] == {"US": tmdb.providers_for_region({"providers": {}}, "US")}
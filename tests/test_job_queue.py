@@ -0,0 +1,127 @@
+# tests/test_job_queue.py
+"""utils/job_queue.py: leases, crashed workers, concurrent leasing, dead letters."""
+import time
+import threading
+
+import pytest
+
+from utils.job_queue import JobQueue
+
+LEASE_S = 0.2
+
+
+@pytest.fixture
+def open_queue(tmp_path):
+    queues = []
+
+    def open_(**kwargs):
+        kwargs.setdefault("lease_seconds", LEASE_S)
+        queues.append(JobQueue(tmp_path / "queue.sqlite", **kwargs))
+        return queues[-1]
+
+    yield open_
+    for q in queues:
+        q.close()
+
+
+def test_expired_lease_is_leased_again(open_queue):
+    queue = open_queue()
+    queue.enqueue("movie:1", {"id": 1})
+    first = queue.lease("w1")
+    assert [t.task_key for t in first] == ["movie:1"]
+    assert queue.lease("w2") == []          # still held by w1
+
+    time.sleep(LEASE_S + 0.05)
+    second = queue.lease("w2")
+    assert [(t.task_key, t.attempts, t.lease_owner) for t in second] == [("movie:1", 2, "w2")]
+
+
+def test_stale_lease_owner_cannot_complete(open_queue):
+    queue = open_queue()
+    queue.enqueue("movie:1", {"id": 1})
+    [stale] = queue.lease("w1")
+    time.sleep(LEASE_S + 0.05)
+    [current] = queue.lease("w2")
+
+    assert queue.complete(stale, {"from": "w1"}) is False
+    assert queue.fail(stale, "late error") == "lost"
+    assert queue.complete(current, {"from": "w2"}) is True
+    assert [r for _, r, _ in queue.results()] == [{"from": "w2"}]
+    # completing again is a no-op
+    assert queue.complete(current, {"from": "w2 again"}) is False
+
+
+def test_run_resumes_after_a_crashed_worker(open_queue):
+    crashed = open_queue()
+    for i in range(3):
+        crashed.enqueue(f"movie:{i}", {"id": i})
+    [done, lost] = crashed.lease("crashed", limit=2)
+    crashed.complete(done, {"ok": True})
+    crashed.close()                         # dies holding `lost`
+
+    resumed = open_queue()
+    # a restarted run re-queues the same titles; unfinished ones are kept as they are
+    assert not any(resumed.enqueue(f"movie:{i}", {"id": i}) for i in range(3))
+    assert [t.task_key for t in resumed.lease("next", limit=10)] == ["movie:2"]
+
+    time.sleep(LEASE_S + 0.05)
+    [retry] = resumed.lease("next")
+    assert retry.task_key == lost.task_key and retry.attempts == 2
+    assert resumed.counts() == {"done": 1, "leased": 2}
+
+
+def test_two_connections_never_lease_the_same_task(open_queue):
+    queues = [open_queue(lease_seconds=60), open_queue(lease_seconds=60)]
+    for i in range(200):
+        queues[0].enqueue(f"movie:{i}", {"id": i})
+
+    leased = [[], []]
+
+    def worker(n):
+        while True:
+            tasks = queues[n].lease(f"w{n}", limit=3)
+            if not tasks:
+                return
+            leased[n].extend(t.task_key for t in tasks)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+
+    assert not set(leased[0]) & set(leased[1])
+    assert len(leased[0]) + len(leased[1]) == 200
+
+
+def test_max_attempts_moves_task_to_dead(open_queue):
+    queue = open_queue(max_attempts=2, backoff_base_s=0)
+    queue.enqueue("movie:1", {"id": 1})
+    [task] = queue.lease("w1")
+    assert queue.fail(task, "boom") == "pending"
+    [task] = queue.lease("w1")
+    assert queue.fail(task, "boom again") == "dead"
+    assert queue.lease("w1") == []
+    assert [(d["task_key"], d["attempts"], d["last_error"]) for d in queue.dead_letters()] == [
+        ("movie:1", 2, "boom again"),
+    ]
+
+    # a worker that dies on its last attempt: the expired lease dead-letters it
+    queue.enqueue("movie:2", {"id": 2})
+    queue.lease("w1")
+    time.sleep(LEASE_S + 0.05)
+    queue.lease("w2")
+    time.sleep(LEASE_S + 0.05)
+    assert queue.lease("w3") == []
+    assert queue.counts() == {"dead": 2}
+
+
+def test_completed_reads_only_completion_times(open_queue):
+    queue = open_queue()
+    queue.enqueue("movie:1", {"id": 1})
+    queue.enqueue("movie:2", {"id": 2})
+    [task, _] = queue.lease("w1", limit=2)
+    before = time.time()
+    queue.complete(task, {"id": 1})
+    completed = queue.completed()
+    assert list(completed) == [task.task_key] and completed[task.task_key] >= before
@@ -0,0 +1,36 @@
+# tests/test_models.py
+"""providers/models.py: typed decoding of provider payloads."""
+import json
+
+import pytest
+
+from providers.models import details_decoder, omdb_decoder, DecodeError
+
+
+def _details(**external_ids) -> bytes:
+    return json.dumps({
+        "id": 1, "title": "Movie", "runtime": 120, "genres": [{"id": 18, "name": "Drama"}],
+        "external_ids": {"imdb_id": "tt0000001", **external_ids},
+        "watch/providers": {"results": {"US": {"flatrate": [{"provider_name": "Netflix", "logo_path": "/n.png"}]}}},
+    }).encode()
+
+
+@pytest.mark.parametrize("extra", [
+    {},
+    {"tvdb_id": "not-a-number", "wikidata_id": 42},
+    {"facebook_id": None, "instagram_id": ["odd"]},
+])
+def test_unread_external_ids_never_fail_the_decode(extra):
+    d = details_decoder.decode(_details(**extra))
+    assert d.external_ids.imdb_id == "tt0000001"
+    assert d.watch_providers.results["US"].flatrate[0].provider_name == "Netflix"
+
+
+def test_fields_we_read_are_validated():
+    with pytest.raises(DecodeError):
+        details_decoder.decode(_details(imdb_id=123))
+
+
+def test_omdb_renamed_fields():
+    o = omdb_decoder.decode(b'{"Response": "True", "imdbID": "tt1", "imdbRating": "7.9", "imdbVotes": "1,234"}')
+    assert (o.response, o.imdb_id, o.imdb_rating, o.imdb_votes) == ("True", "tt1", "7.9", "1,234")
@@ -0,0 +1,64 @@
+# tests/test_profiling.py
+"""utils/profiling.py: concurrent store writes and the stdlib sampler fallback."""
+import time
+import threading
+
+import pandas as pd
+import pytest
+
+import utils.profiling as profiling
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_FILE", tmp_path / "app_profile.parquet")
+    monkeypatch.setattr(profiling, "REPORT_DIR", tmp_path / "profiles")
+    return tmp_path
+
+
+def test_concurrent_reruns_keep_every_row(store):
+    def session(n):
+        for _ in range(10):
+            prof = profiling.RerunProfiler(enabled=True, session_id=f"s{n}")
+            with prof.span("load_batch"):
+                pass
+            prof.finish()
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    df = pd.read_parquet(profiling.PROFILE_FILE)
+    assert len(df) == 8 * 10 * 2          # load_batch + total per rerun
+    assert df["rerun_id"].nunique() == 80
+    assert not list(store.glob("*.tmp"))
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_stack_sampler_fallback(store, monkeypatch):
+    monkeypatch.setattr(profiling, "Profiler", None)
+    prof = profiling.RerunProfiler(enabled=True)
+    prof.start_sampling()
+    _busy(0.3)
+    prof.finish()
+
+    report = prof.report_path.read_text()
+    assert prof.report_path.suffix == ".txt"
+    assert "samples, every 1.0 ms" in report
+    assert "_busy (" in report
+
+
+def test_finish_records_a_rerun_once(store):
+    prof = profiling.RerunProfiler(enabled=True)
+    with prof.span("table"):
+        pass
+    prof.finish()
+    prof.finish()           # e.g. the developer panel, then the script's finally
+    assert len(pd.read_parquet(profiling.PROFILE_FILE)) == 2
@@ -0,0 +1,107 @@
+# tests/test_queries.py
+"""utils/queries.py over small parquet stores in a temp data dir."""
+import json
+
+import pandas as pd
+import pytest
+
+from utils import queries
+
+T0 = pd.Timestamp("2026-10-19 08:00", tz="UTC")
+T1 = T0 + pd.Timedelta(hours=1)
+T2 = T0 + pd.Timedelta(hours=2)
+
+
+def _pull(ts, window, ids, media_type="movie"):
+    return pd.DataFrame({
+        "ts": ts, "window": window, "id": ids, "media_type": media_type,
+        "title": [f"Title {i}" for i in ids],
+        "popularity": [float(i) for i in ids],
+    })
+
+
+@pytest.fixture
+def data(tmp_path):
+    pd.concat([
+        _pull(T0, "day", [1, 2, 3, 4]),
+        _pull(T1, "day", [3, 4, 5, 6]),
+        _pull(T2, "day", [5, 6]),                  # partial pull
+        _pull(T0, "week", [1, 2], media_type="tv"),
+    ]).to_parquet(tmp_path / "tmdb_trending.parquet", index=False)
+    return tmp_path
+
+
+@pytest.fixture
+def con(data):
+    con = queries.connect(data)
+    yield con
+    con.close()
+
+
+def test_latest_batch_is_the_most_complete_pull(con):
+    # T0 and T1 both hold 4 titles; the newer one wins, the partial T2 does not
+    assert queries.latest_batch_ts(con, "day") == T1
+    df = queries.latest_batch(con, "day")
+    assert df["id"].tolist() == [6, 5, 4, 3]
+    assert queries.latest_batch(con, "day", limit=2)["id"].tolist() == [6, 5]
+    assert queries.latest_batch(con, "day", media_type="tv").empty
+    assert queries.latest_batch(con, "week", media_type="tv")["id"].tolist() == [2, 1]
+
+
+def test_batches_and_batch_at(con):
+    summary = queries.batch_summary(con, "day")
+    assert summary["ts"].tolist() == [T2, T1, T0]
+    assert summary["titles"].tolist() == [2, 4, 4]
+    assert queries.batch_at(con, T0.isoformat(), "day")["id"].tolist() == [4, 3, 2, 1]
+    assert queries.batch_at(con, T0.isoformat(), "week")["media_type"].unique().tolist() == ["tv"]
+
+
+def test_trending_since_ranks_within_each_pull(con):
+    df = queries.trending_since(con, T0)
+    assert set(df["ts"]) == {T1, T2}
+    t1 = df[df["ts"] == T1].sort_values("rank")
+    assert t1["id"].tolist() == [6, 5, 4, 3] and t1["rank"].tolist() == [1, 2, 3, 4]
+    assert len(queries.trending_since(con)) == 12
+
+
+def test_top_titles_counts_pulls(con):
+    df = queries.top_titles(con, "day", limit=3)
+    # 5 and 6 trended in two pulls each, 3 and 4 too; ties go to peak popularity
+    assert df["id"].tolist() == [6, 5, 4]
+    assert df["pulls"].tolist() == [2, 2, 2]
+    top = df.iloc[0]
+    assert top["first_seen"] == T1 and top["last_seen"] == T2
+
+
+def test_missing_store_is_empty_until_written(con, data):
+    assert queries.batch_churn(con, "day").empty
+    assert queries.perf_recent(con).empty
+
+    diff = pd.DataFrame({
+        "id": [1, 2, 5], "media_type": "movie",
+        "change": ["removed", "removed", "added"],
+        "ts": T1, "window": "day", "previous_ts": T0,
+    })
+    diff.to_parquet(data / "tmdb_batch_diff.parquet", index=False)
+
+    churn = queries.batch_churn(con, "day")
+    assert churn[["added", "removed", "unchanged"]].iloc[0].tolist() == [1, 2, 0]
+    assert churn["previous_ts"].iloc[0] == T0
+
+
+def test_existing_view_reads_the_latest_file(con, data):
+    assert queries.latest_batch_ts(con, "day") == T1
+    _pull(T2, "day", [1, 2, 3, 4, 5]).to_parquet(data / "tmdb_trending.parquet", index=False)
+    assert queries.latest_batch_ts(con, "day") == T2
+
+
+def test_enrichment_for_keeps_the_newest_row(con, data):
+    pd.DataFrame({
+        "id": [1, 1, 2], "media_type": "movie",
+        "imdb_rating": ["6.0", "7.0", "8.0"],
+        "providers": json.dumps({}),
+        "enriched_at": [T0, T1, T0],
+    }).to_parquet(data / "enrichment_cache.parquet", index=False)
+
+    df = queries.enrichment_for(con, [1, 3]).sort_values("id")
+    assert df["id"].tolist() == [1] and df["imdb_rating"].tolist() == ["7.0"]
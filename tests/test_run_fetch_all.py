@@ -0,0 +1,36 @@
+# tests/test_run_fetch_all.py
+"""run_fetch_all.split_latest picks the same pull as the app and API."""
+import pandas as pd
+
+import run_fetch_all
+
+T0 = pd.Timestamp("2026-10-19 08:00", tz="UTC")
+
+
+def _pull(ts, ids):
+    return pd.DataFrame({"ts": ts, "window": "day", "id": ids, "media_type": "movie",
+                         "popularity": [float(i) for i in ids]})
+
+
+def test_partial_newest_pull_is_not_the_latest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    history = pd.concat([
+        _pull(T0, [1, 2, 3]),
+        _pull(T0 + pd.Timedelta(hours=1, nanoseconds=1500), [2, 3, 4]),   # ns, as pandas writes it
+        _pull(T0 + pd.Timedelta(hours=2), [4]),                          # partial
+    ])
+    history.to_parquet(tmp_path / "data" / "tmdb_trending.parquet", index=False)
+
+    latest, previous = run_fetch_all.split_latest(history, "day")
+    assert latest["id"].tolist() == [2, 3, 4]
+    assert previous["id"].tolist() == [1, 2, 3]
+
+
+def test_no_pull_for_window(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    history = _pull(T0, [1, 2])
+    history.to_parquet(tmp_path / "data" / "tmdb_trending.parquet", index=False)
+    latest, previous = run_fetch_all.split_latest(history, "week")
+    assert latest.empty and previous is None
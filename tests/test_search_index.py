@@ -0,0 +1,70 @@
+# tests/test_search_index.py
+"""utils/search_index.py: normalization across scripts and prefix search."""
+import pandas as pd
+import pytest
+
+from utils import search_index
+from utils.search_index import normalize, index_rows, open_index, search
+
+TITLES = ["Ørkenens sønner", "Straße der Sehnsucht", "Лёд 3", "鬼滅の刃",
+          "Spider-Man: Across the Spider-Verse", "Amélie"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Amélie (2001)!", "amelie 2001"),
+    ("Ørkenens sønner", "ørkenens sønner"),
+    ("Straße", "strasse"),
+    ("Лёд 3", "лед 3"),
+    ("鬼滅の刃", "鬼滅の刃"),
+    ("snake_case title", "snake case title"),
+    (None, ""),
+])
+def test_normalize_keeps_every_script(text, expected):
+    assert normalize(text) == expected
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "title_index.sqlite"
+    rows = pd.DataFrame({
+        "ts": pd.Timestamp("2026-10-01", tz="UTC"), "window": "day",
+        "id": range(1, len(TITLES) + 1), "media_type": "movie", "title": TITLES,
+        "popularity": 10.0, "rank": range(1, len(TITLES) + 1),
+    })
+    conn = open_index(path, create=True)
+    try:
+        index_rows(conn, rows)
+    finally:
+        conn.close()
+    return path
+
+
+@pytest.mark.parametrize("query, title", [
+    ("sønner", "Ørkenens sønner"),
+    ("ØRKEN", "Ørkenens sønner"),
+    ("strasse", "Straße der Sehnsucht"),
+    ("straße sehn", "Straße der Sehnsucht"),
+    ("лед", "Лёд 3"),
+    ("鬼滅", "鬼滅の刃"),
+    ("spider ver", "Spider-Man: Across the Spider-Verse"),
+])
+def test_search_matches_prefixes_in_any_script(index, query, title):
+    hits = search(query, path=index)
+    assert hits["title"].tolist()[:1] == [title]
+
+
+def test_old_tokenizer_index_is_rebuilt(index, monkeypatch):
+    monkeypatch.setattr(search_index, "TOKENIZER_VERSION", "next")
+    conn = open_index(index)
+    try:
+        search_index._check_tokenizer(conn)
+        assert conn.execute("SELECT count(*) FROM tokens").fetchone()[0] == 0
+        assert conn.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()[0] == "next"
+    finally:
+        conn.close()
+
+
+def test_search_leaves_schema_setup_to_sync(index, monkeypatch):
+    monkeypatch.setattr(search_index, "SCHEMA", "this is not SQL")
+    assert search("spider", path=index)["id"].tolist() == [5]
+    assert search_index.appearances_for(5, "movie", path=index)["rank"].tolist() == [5]
@@ -0,0 +1,35 @@
+# tests/test_snapshot.py
+"""utils/snapshot.py: publish, memory-map and select rows in Arrow."""
+import pandas as pd
+
+from utils.snapshot import publish_snapshot, publish_latest, open_snapshot, select_snapshot, snapshot_ts
+
+TS = pd.Timestamp("2026-10-19 08:00", tz="UTC")
+
+
+def _batch(window="day", n=6):
+    return pd.DataFrame({
+        "ts": TS, "window": window, "id": range(1, n + 1),
+        "media_type": ["movie", "tv"] * (n // 2),
+        "popularity": [float(i) for i in range(1, n + 1)],
+    })
+
+
+def test_select_filters_in_arrow_and_keeps_popularity_order(tmp_path):
+    publish_snapshot(_batch(), None, tmp_path)
+    table = open_snapshot("day", tmp_path)
+    assert snapshot_ts(table) == TS
+
+    tv = select_snapshot(table, "tv")
+    assert tv.column("id").to_pylist() == [6, 4, 2]
+    assert tv.slice(1, 5).to_pandas()["id"].tolist() == [4, 2]
+    assert select_snapshot(table, None).num_rows == 6
+    assert select_snapshot(table, "short").num_rows == 0
+
+
+def test_publish_latest_per_window(tmp_path):
+    pd.concat([_batch("day"), _batch("week", 4)]).to_parquet(tmp_path / "tmdb_trending.parquet", index=False)
+    publish_latest("day", tmp_path)
+    publish_latest("week", tmp_path)
+    assert open_snapshot("day", tmp_path).num_rows == 6
+    assert open_snapshot("week", tmp_path).num_rows == 4
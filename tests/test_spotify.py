@@ -0,0 +1,166 @@
+# tests/test_spotify.py
+"""providers/spotify.py against a local stand-in for the Spotify Web API."""
+import asyncio
+from collections import Counter
+
+import httpx
+import pandas as pd
+import pytest
+from aiohttp import web
+
+import etl_fetch
+import providers.spotify as spotify
+
+N_TRACKS = 120      # 3 /tracks chunks (50, 50, 20)
+N_ALBUMS = 30       # 2 /albums chunks (20, 10)
+N_ARTISTS = 60      # 2 /artists chunks (50, 10)
+
+
+class FakeSpotify:
+    """Accounts + Web API lookalike that records what it was asked for."""
+
+    def __init__(self, expires_in: int = 3600, empty_page_with_next: bool = False):
+        self.expires_in = expires_in
+        self.empty_page_with_next = empty_page_with_next
+        self.tokens_issued = 0
+        self.revoked = set()
+        self.calls = []                 # (path, ids per request or None)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/token", self.token)
+        app.router.add_get("/v1/playlists/{playlist_id}/tracks", self.playlist_tracks)
+        app.router.add_get("/v1/{kind}", self.several)
+        return app
+
+    def _authorized(self, request) -> bool:
+        auth = request.headers.get("Authorization", "")
+        return auth.startswith("Bearer tok-") and auth[len("Bearer "):] not in self.revoked
+
+    async def token(self, request):
+        form = await request.post()
+        assert form["grant_type"] == "client_credentials"
+        assert request.headers["Authorization"].startswith("Basic ")
+        self.tokens_issued += 1
+        return web.json_response({"access_token": f"tok-{self.tokens_issued}",
+                                  "token_type": "Bearer", "expires_in": self.expires_in})
+
+    async def playlist_tracks(self, request):
+        if not self._authorized(request):
+            return web.json_response({"error": {"status": 401}}, status=401)
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        self.calls.append(("playlist_tracks", None))
+        if self.empty_page_with_next:
+            return web.json_response({"items": [], "next": "more", "total": N_TRACKS})
+        items = [{"track": {"id": f"t{i}"}} for i in range(offset, min(offset + limit, N_TRACKS))]
+        more = offset + limit < N_TRACKS
+        return web.json_response({"items": items, "next": "more" if more else None, "total": N_TRACKS})
+
+    async def several(self, request):
+        if not self._authorized(request):
+            return web.json_response({"error": {"status": 401}}, status=401)
+        kind = request.match_info["kind"]
+        ids = request.query["ids"].split(",")
+        self.calls.append((kind, len(ids)))
+        objs = [_object(kind, i) for i in ids]
+        return web.json_response({kind: objs})
+
+
+def _object(kind: str, obj_id: str) -> dict:
+    n = int(obj_id[1:])
+    if kind == "tracks":
+        return {"id": obj_id, "name": f"Track {n}", "popularity": 90 - n % 50, "duration_ms": 180000,
+                "album": {"id": f"a{n % N_ALBUMS}"},
+                "artists": [{"id": f"r{n % N_ARTISTS}"}, {"id": f"r{(n + 1) % N_ARTISTS}"}]}
+    if kind == "albums":
+        return {"id": obj_id, "name": f"Album {n}", "album_type": "album", "label": "Label",
+                "release_date": "2026-01-01", "popularity": 70, "images": [{"url": f"https://img/{n}"}]}
+    return {"id": obj_id, "name": f"Artist {n}", "popularity": 60 + n % 30, "genres": ["pop"]}
+
+
+@pytest.fixture
+def fake_spotify(stub_server, monkeypatch, tmp_path):
+    def start(**kwargs):
+        fake = FakeSpotify(**kwargs)
+        server = stub_server(fake.app())
+        monkeypatch.setattr(spotify, "SPOTIFY_API_BASE", f"{server.base}/v1")
+        monkeypatch.setattr(spotify, "SPOTIFY_ACCOUNTS_BASE", server.base)
+        monkeypatch.setattr(spotify, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(etl_fetch, "DATA_DIR", tmp_path)
+        monkeypatch.setattr(spotify, "_token", spotify._TokenCache())
+        monkeypatch.setenv("SPOTIFY_CLIENT_ID", "client")
+        monkeypatch.setenv("SPOTIFY_CLIENT_SECRET", "secret")
+        return fake
+    return start
+
+
+def _several(kind, ids, perf_rows):
+    async def run():
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await spotify.fetch_spotify_several(client, kind, ids, perf_rows)
+    return asyncio.run(run())
+
+
+def test_trending_pull_uses_bulk_chunks_and_one_token(fake_spotify, tmp_path):
+    fake = fake_spotify()
+    df = asyncio.run(spotify.fetch_spotify_trending("playlist", market="US"))
+
+    assert len(df) == N_TRACKS
+    assert df["rank"].tolist() == list(range(1, N_TRACKS + 1))
+    assert df["album"].notna().all() and df["genres"].eq("pop").all()
+
+    sizes = {kind: sorted((n for k, n in fake.calls if k == kind), reverse=True)
+             for kind in ("tracks", "albums", "artists")}
+    assert sizes == {"tracks": [50, 50, 20], "albums": [20, 10], "artists": [50, 10]}
+    assert fake.tokens_issued == 1
+
+    perf = pd.read_parquet(tmp_path / "perf_log.parquet")
+    assert list(perf.columns) == etl_fetch.PERF_COLUMNS
+    assert Counter(perf["endpoint"]) == {
+        "token": 1, "playlist_tracks": 2,
+        "several_tracks": 3, "several_albums": 2, "several_artists": 2,
+    }
+    assert (perf["provider"] == "spotify").all() and (perf["status"] == 200).all()
+    assert (tmp_path / "spotify_trending.parquet").exists()
+
+
+def test_token_is_cached_across_pulls(fake_spotify):
+    fake = fake_spotify()
+    perf_rows = []
+    _several("artists", ["r1", "r2"], perf_rows)
+    _several("artists", ["r3"], perf_rows)
+    assert fake.tokens_issued == 1
+    assert [r["endpoint"] for r in perf_rows].count("token") == 1
+
+
+def test_token_renewed_when_about_to_expire(fake_spotify):
+    # expires_in inside the refresh margin: every lookup needs a new token
+    fake = fake_spotify(expires_in=spotify.TOKEN_EXPIRY_MARGIN_S - 1)
+    _several("artists", ["r1"], [])
+    _several("artists", ["r2"], [])
+    assert fake.tokens_issued == 2
+
+
+def test_401_drops_token_and_retries_once(fake_spotify):
+    fake = fake_spotify()
+    _several("artists", ["r1"], [])
+    fake.revoked.add("tok-1")
+
+    perf_rows = []
+    artists = _several("artists", ["r2", "r3"], perf_rows)
+
+    assert [a["id"] for a in artists] == ["r2", "r3"]
+    assert fake.tokens_issued == 2
+    assert [(r["endpoint"], r["status"]) for r in perf_rows] == [
+        ("several_artists", 401), ("token", 200), ("several_artists", 200),
+    ]
+
+
+def test_playlist_paging_stops_on_empty_page(fake_spotify):
+    fake_spotify(empty_page_with_next=True)
+
+    async def run():
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await spotify._playlist_track_ids(client, "playlist", "US", [])
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=10)) == []
@@ -0,0 +1,114 @@
+# tests/test_tmdb.py
+"""providers/tmdb.py: details parsing, per-region providers and the details cache."""
+import json
+import asyncio
+
+import pytest
+from aiohttp import web
+
+import etl_fetch
+import providers.tmdb as tmdb
+from providers.models import details_decoder, DecodeError
+
+MOVIE = {
+    "id": 603, "title": "The Matrix", "runtime": 136,
+    "genres": [{"id": 28, "name": "Action"}, {"id": 878, "name": "Science Fiction"}],
+    "external_ids": {"imdb_id": "tt0133093", "wikidata_id": "Q83495"},
+    "watch/providers": {"results": {
+        "US": {"link": "https://tmdb/603/watch",
+               "flatrate": [{"provider_id": 8, "provider_name": "Netflix", "logo_path": "/n.png"}],
+               "rent": [{"provider_name": "Apple TV", "logo_path": None}]},
+        "DE": {"buy": [{"provider_name": "Google Play", "logo_path": "/g.png"}]},
+    }},
+}
+SHOW = {
+    "id": 1399, "name": "Game of Thrones", "episode_run_time": [60, 55],
+    "genres": [{"name": "Drama"}], "external_ids": {"imdb_id": None},
+}
+
+
+def _parse(payload: dict, media_type: str) -> dict:
+    return tmdb.parse_tmdb_details(details_decoder.decode(json.dumps(payload).encode()), media_type)
+
+
+def test_parse_movie_details():
+    d = _parse(MOVIE, "movie")
+    assert (d["id"], d["media_type"], d["title"], d["runtime"]) == (603, "movie", "The Matrix", 136)
+    assert d["genres"] == ["Action", "Science Fiction"]
+    assert d["imdb_id"] == "tt0133093" and d["external_ids"] == {"imdb_id": "tt0133093"}
+    assert set(d["providers"]) == {"US", "DE"}
+
+
+def test_parse_tv_details_without_providers():
+    d = _parse(SHOW, "tv")
+    assert (d["title"], d["runtime"], d["imdb_id"]) == ("Game of Thrones", 60, None)
+    assert d["providers"] == {}
+
+
+def test_providers_for_region():
+    d = _parse(MOVIE, "movie")
+    us = tmdb.providers_for_region(d, "US")
+    assert us["flatrate"] == [("Netflix", "/n.png")] and us["rent"] == [("Apple TV", None)]
+    assert us["buy"] == us["free"] == us["ads"] == []
+    assert tmdb.providers_for_region(d, "DE")["buy"] == [("Google Play", "/g.png")]
+    # a region TMDB has no data for: every kind present and empty
+    assert tmdb.providers_for_region(d, "IN") == {k: [] for k in tmdb.PROVIDER_KINDS}
+    assert tmdb.providers_for_region({}, "US") == {k: [] for k in tmdb.PROVIDER_KINDS}
+
+
+@pytest.mark.parametrize("payload", [
+    {"title": "no id"},
+    {**MOVIE, "runtime": "136 min"},
+    {**MOVIE, "watch/providers": {"results": {"US": {"flatrate": "Netflix"}}}},
+])
+def test_malformed_details_fail_the_decode(payload):
+    with pytest.raises(DecodeError):
+        details_decoder.decode(json.dumps(payload).encode())
+
+
+@pytest.fixture
+def fake_details(stub_server, monkeypatch, tmp_path):
+    """TMDB /{media_type}/{id}; ids >= 900 answer with a malformed payload."""
+    calls = []
+
+    async def details(request):
+        item_id = int(request.match_info["item_id"])
+        calls.append(item_id)
+        if item_id >= 900:
+            return web.json_response({"id": "not-an-int"})
+        return web.json_response({**MOVIE, "id": item_id})
+
+    app = web.Application()
+    app.router.add_get("/3/{media_type}/{item_id}", details)
+    server = stub_server(app)
+    monkeypatch.setattr(tmdb, "TMDB_BASE", f"{server.base}/3")
+    monkeypatch.setattr(etl_fetch, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(tmdb, "_DETAILS_CACHE", tmdb.OrderedDict())
+    monkeypatch.setenv("TMDB_V3_KEY", "tmdb-key")
+    return calls
+
+
+def _fetch(*ids):
+    async def run():
+        return [await tmdb.fetch_tmdb_details(i, "movie") for i in ids]
+    return asyncio.run(run())
+
+
+def test_malformed_payload_is_not_cached(fake_details):
+    assert _fetch(900, 900) == [{}, {}]
+    assert fake_details == [900, 900]
+
+
+def test_details_cache_evicts_least_recently_used(fake_details, monkeypatch):
+    monkeypatch.setattr(tmdb, "DETAILS_CACHE_SIZE", 2)
+    _fetch(1, 2, 1, 3)              # 1 was used after 2, so 2 is evicted
+    assert list(tmdb._DETAILS_CACHE) == [("movie", 1), ("movie", 3)]
+    _fetch(1, 3, 2)
+    assert fake_details == [1, 2, 3, 2]
+
+
+def test_expired_details_are_fetched_again(fake_details, monkeypatch):
+    _fetch(1)
+    monkeypatch.setattr(tmdb, "DETAILS_TTL_S", 0)
+    _fetch(1)
+    assert fake_details == [1, 1]
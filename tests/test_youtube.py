@@ -0,0 +1,135 @@
+# tests/test_youtube.py
+"""providers/youtube.py against local stand-ins for TMDB /videos and YouTube videos.list."""
+import asyncio
+
+import httpx
+import pandas as pd
+import pytest
+from aiohttp import web
+
+import etl_fetch
+import providers.youtube as youtube
+
+
+class FakeVideos:
+    """TMDB /videos + YouTube videos.list lookalike that records what it was asked for."""
+
+    def __init__(self):
+        self.videos_list = []           # ids per videos.list call
+        self.tmdb_calls = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/3/{media_type}/{item_id}/videos", self.tmdb_videos)
+        app.router.add_get("/youtube/v3/videos", self.videos)
+        return app
+
+    async def tmdb_videos(self, request):
+        self.tmdb_calls += 1
+        item_id = request.match_info["item_id"]
+        return web.json_response({"results": [
+            {"site": "YouTube", "key": f"v{item_id}", "type": "Trailer", "official": True},
+        ]})
+
+    async def videos(self, request):
+        assert request.query["key"] == "yt-key"
+        ids = request.query["id"].split(",")
+        self.videos_list.append(len(ids))
+        return web.json_response({"items": [
+            {"id": i, "statistics": {"viewCount": "1000", "likeCount": "40", "commentCount": "10"}}
+            for i in ids
+        ]})
+
+
+@pytest.fixture
+def fake_videos(stub_server, monkeypatch, tmp_path):
+    fake = FakeVideos()
+    server = stub_server(fake.app())
+    monkeypatch.setattr(youtube, "TMDB_BASE", f"{server.base}/3")
+    monkeypatch.setattr(youtube, "YOUTUBE_API_BASE", f"{server.base}/youtube/v3")
+    monkeypatch.setattr(youtube, "TRAILERS_FILE", tmp_path / "youtube_trailers.parquet")
+    monkeypatch.setattr(youtube, "STATS_FILE", tmp_path / "youtube_stats.parquet")
+    monkeypatch.setattr(youtube, "QUOTA_FILE", tmp_path / "youtube_quota.parquet")
+    monkeypatch.setattr(etl_fetch, "DATA_DIR", tmp_path)
+    monkeypatch.setenv("YOUTUBE_API_KEY", "yt-key")
+    monkeypatch.setenv("TMDB_V3_KEY", "tmdb-key")
+    return fake
+
+
+def _stats(video_ids, meter):
+    async def run():
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await youtube.fetch_youtube_video_stats(client, video_ids, [], meter)
+    return asyncio.run(run())
+
+
+def _batch(n: int) -> pd.DataFrame:
+    return pd.DataFrame({"id": range(1, n + 1), "media_type": "movie"})
+
+
+def test_videos_list_is_chunked_by_50(fake_videos):
+    meter = youtube._QuotaMeter()
+    df = _stats([f"v{i}" for i in range(120)] + ["v0", None], meter)
+
+    assert sorted(fake_videos.videos_list, reverse=True) == [50, 50, 20]
+    assert len(df) == 120 and df["views"].eq(1000.0).all()
+    assert meter.calls == {"videos.list": 3} and meter.units == 3
+
+
+def test_quota_budget_stops_calls_and_is_recorded(fake_videos, monkeypatch):
+    monkeypatch.setattr(youtube, "YOUTUBE_DAILY_QUOTA", 2)
+    meter = youtube._QuotaMeter()
+    df = _stats([f"v{i}" for i in range(120)], meter)
+
+    assert fake_videos.videos_list == [50, 50]
+    assert len(df) == 100
+    youtube._record_quota(meter.calls)
+    assert youtube.quota_used_today() == 2
+
+    # the next pull today starts from the ledger and makes no calls
+    assert _stats(["v1"], youtube._QuotaMeter()).empty
+    assert fake_videos.videos_list == [50, 50]
+
+
+def test_trailer_stats_are_cached_until_stale(fake_videos):
+    batch = _batch(3)
+    df = asyncio.run(youtube.fetch_youtube_trailer_stats(batch))
+    assert df["trailer_video_id"].tolist() == ["v1", "v2", "v3"]
+    assert df["trailer_engagement"].tolist() == [0.05] * 3
+    assert fake_videos.tmdb_calls == 3 and fake_videos.videos_list == [3]
+
+    # fresh cache: trailers and stats are reused, nothing is requested
+    again = asyncio.run(youtube.fetch_youtube_trailer_stats(batch))
+    pd.testing.assert_frame_equal(again, df)
+    assert fake_videos.tmdb_calls == 3 and fake_videos.videos_list == [3]
+
+    # stats older than max_age_hours are refreshed in one call; trailers stay cached
+    asyncio.run(youtube.fetch_youtube_trailer_stats(batch, max_age_hours=0))
+    assert fake_videos.tmdb_calls == 3 and fake_videos.videos_list == [3, 3]
+
+    ledger = pd.read_parquet(youtube.QUOTA_FILE)
+    assert ledger[["method", "calls", "units"]].values.tolist() == [["videos.list", 2, 2]]
+
+
+def test_join_without_caches_adds_empty_columns(fake_videos):
+    df = youtube.join_trailer_stats(_batch(2))
+    assert df["trailer_views"].isna().all() and len(df) == 2
+
+
+def test_pick_trailer_prefers_official_youtube_trailers():
+    videos = [
+        {"site": "Vimeo", "key": "vimeo", "type": "Trailer", "official": True},
+        {"site": "YouTube", "key": "teaser", "type": "Teaser", "official": True,
+         "published_at": "2026-06-01"},
+        {"site": "YouTube", "key": "fan", "type": "Trailer", "official": False,
+         "published_at": "2026-05-01"},
+        {"site": "YouTube", "key": "old", "type": "Trailer", "official": True,
+         "published_at": "2026-01-01"},
+        {"site": "YouTube", "key": "new", "type": "Trailer", "official": True,
+         "published_at": "2026-03-01"},
+        {"site": "YouTube", "key": "clip", "type": "Clip", "official": True},
+    ]
+    assert youtube._pick_trailer(videos) == "new"
+    assert youtube._pick_trailer(videos[1:3]) == "fan"
+    assert youtube._pick_trailer([videos[1]]) == "teaser"
+    assert youtube._pick_trailer([videos[0], videos[-1]]) is None
@@ -0,0 +1,283 @@
+# utils/job_queue.py
+"""
+Durable local job queue backed by SQLite (data/enrichment_queue.sqlite).
+
+Tasks survive process death: a worker leases a task for a fixed time,
+and if it dies before completing, the lease expires and another worker
+(or the next run) picks the task up again. Each lease counts as an
+attempt; tasks that keep failing are moved to a dead-letter state
+instead of being retried forever.
+
+Leasing happens inside a write transaction (BEGIN IMMEDIATE), so any
+number of workers, in one process or several, can drain the same queue
+without two of them holding the same task. A JobQueue may be called from
+several threads (e.g. asyncio.to_thread); its calls run one at a time.
+
+Task states: pending -> leased -> done
+                           \\-> pending (retry with backoff) -> ... -> dead
+"""
+import json
+import time
+import sqlite3
+import pathlib
+import threading
+from dataclasses import dataclass
+
+DATA_DIR = pathlib.Path("data")
+DEFAULT_QUEUE_PATH = DATA_DIR / "enrichment_queue.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_key      TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,
+    payload       TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  REAL NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    result        TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    completed_at  REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (kind, status, available_at);
+"""
+
+
+@dataclass
+class Task:
+    task_key: str
+    kind: str
+    payload: dict
+    attempts: int
+    lease_owner: str
+
+
+class JobQueue:
+    def __init__(
+        self,
+        path: pathlib.Path = DEFAULT_QUEUE_PATH,
+        *,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 5,
+        backoff_base_s: float = 30.0,
+        backoff_max_s: float = 3600.0,
+    ):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+
+        # autocommit mode; transactions are opened explicitly where needed.
+        # Callers may be on worker threads: the lock keeps one statement or
+        # transaction on the connection at a time
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets readers (the app, stats) run while a worker writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _tx(self):
+        return _Immediate(self.conn, self._lock)
+
+    def _query(self, sql: str, params=()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _update(self, sql: str, params=()) -> int:
+        """Run one write statement; returns the number of rows changed."""
+        with self._lock:
+            return self.conn.execute(sql, params).rowcount
+
+    # ---------- producer side ----------
+
+    def enqueue(self, task_key: str, payload: dict, *, kind: str = "enrich", reset_done: bool = False) -> bool:
+        """
+        Add a task if it is not already queued. Existing pending/leased
+        tasks are left alone (so a restarted run resumes them). A done task
+        is only re-queued when reset_done=True. Returns True if the task
+        is (now) pending because of this call.
+        """
+        now = time.time()
+        with self._tx():
+            row = self.conn.execute(
+                "SELECT status FROM tasks WHERE task_key = ?", (task_key,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO tasks (task_key, kind, payload, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (task_key, kind, json.dumps(payload), now, now, now),
+                )
+                return True
+            if row["status"] == "done" and reset_done:
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'pending', payload = ?, attempts = 0, "
+                    "available_at = ?, last_error = NULL, lease_owner = NULL, "
+                    "lease_expires = NULL, updated_at = ? WHERE task_key = ?",
+                    (json.dumps(payload), now, now, task_key),
+                )
+                return True
+            return False
+
+    # ---------- worker side ----------
+
+    def lease(self, worker_id: str, *, kind: str = "enrich", limit: int = 1) -> list[Task]:
+        """
+        Atomically claim up to `limit` ready tasks: pending ones whose
+        backoff has elapsed, or leased ones whose lease expired (their
+        worker died). Tasks that already used all attempts are dead-lettered.
+        """
+        now = time.time()
+        leased = []
+        with self._tx():
+            rows = self.conn.execute(
+                "SELECT task_key, kind, payload, attempts FROM tasks "
+                "WHERE kind = ? AND ("
+                "  (status = 'pending' AND available_at <= ?) OR "
+                "  (status = 'leased' AND lease_expires <= ?)"
+                ") ORDER BY available_at LIMIT ?",
+                (kind, now, now, limit),
+            ).fetchall()
+            for r in rows:
+                if r["attempts"] >= self.max_attempts:
+                    self.conn.execute(
+                        "UPDATE tasks SET status = 'dead', lease_owner = NULL, lease_expires = NULL, "
+                        "last_error = COALESCE(last_error, 'lease expired'), updated_at = ? "
+                        "WHERE task_key = ?",
+                        (now, r["task_key"]),
+                    )
+                    continue
+                self.conn.execute(
+                    "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE task_key = ?",
+                    (worker_id, now + self.lease_seconds, now, r["task_key"]),
+                )
+                leased.append(Task(
+                    task_key=r["task_key"],
+                    kind=r["kind"],
+                    payload=json.loads(r["payload"]),
+                    attempts=r["attempts"] + 1,
+                    lease_owner=worker_id,
+                ))
+        return leased
+
+    def complete(self, task: Task, result) -> bool:
+        """
+        Store the result and mark the task done. Only the current lease
+        holder can complete it, so a worker whose lease expired (and was
+        re-leased elsewhere) cannot overwrite the newer result.
+        Completing an already-done task is a no-op. Returns True if stored.
+        """
+        now = time.time()
+        changed = self._update(
+            "UPDATE tasks SET status = 'done', result = ?, completed_at = ?, updated_at = ?, "
+            "lease_owner = NULL, lease_expires = NULL, last_error = NULL "
+            "WHERE task_key = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result), now, now, task.task_key, task.lease_owner),
+        )
+        return changed == 1
+
+    def fail(self, task: Task, error: str) -> str:
+        """
+        Record a failed attempt. Retries with exponential backoff until
+        max_attempts, then dead-letters. Returns the new status.
+        """
+        now = time.time()
+        if task.attempts >= self.max_attempts:
+            status, available_at = "dead", now
+        else:
+            delay = min(self.backoff_base_s * 2 ** (task.attempts - 1), self.backoff_max_s)
+            status, available_at = "pending", now + delay
+        changed = self._update(
+            "UPDATE tasks SET status = ?, available_at = ?, last_error = ?, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE task_key = ? AND status = 'leased' AND lease_owner = ?",
+            (status, available_at, str(error)[:500], now, task.task_key, task.lease_owner),
+        )
+        return status if changed == 1 else "lost"
+
+    # ---------- inspection ----------
+
+    def counts(self, kind: str = "enrich") -> dict:
+        rows = self._query(
+            "SELECT status, count(*) AS n FROM tasks WHERE kind = ? GROUP BY status", (kind,)
+        )
+        return {r["status"]: r["n"] for r in rows}
+
+    def has_open(self, kind: str = "enrich") -> bool:
+        """True while any task is still pending or leased."""
+        rows = self._query(
+            "SELECT 1 FROM tasks WHERE kind = ? AND status IN ('pending', 'leased') LIMIT 1", (kind,)
+        )
+        return bool(rows)
+
+    def results(self, kind: str = "enrich", since: float | None = None) -> list[tuple[str, dict, float]]:
+        """(task_key, result, completed_at) for done tasks, optionally completed after `since`."""
+        rows = self._query(
+            "SELECT task_key, result, completed_at FROM tasks "
+            "WHERE kind = ? AND status = 'done' AND completed_at >= ?",
+            (kind, since or 0.0),
+        )
+        return [(r["task_key"], json.loads(r["result"]), r["completed_at"]) for r in rows]
+
+    def completed(self, kind: str = "enrich") -> dict[str, float]:
+        """{task_key: completed_at} for done tasks, without loading their results."""
+        rows = self._query(
+            "SELECT task_key, completed_at FROM tasks WHERE kind = ? AND status = 'done'", (kind,)
+        )
+        return {r["task_key"]: r["completed_at"] for r in rows}
+
+    def dead_letters(self, kind: str = "enrich") -> list[dict]:
+        rows = self._query(
+            "SELECT task_key, payload, attempts, last_error, updated_at FROM tasks "
+            "WHERE kind = ? AND status = 'dead' ORDER BY updated_at DESC", (kind,)
+        )
+        return [dict(r) for r in rows]
+
+    def requeue_dead(self, kind: str = "enrich", older_than_s: float | None = None) -> int:
+        """
+        Give dead-lettered tasks a fresh set of attempts (only those
+        dead-lettered more than `older_than_s` seconds ago, if given).
+        Returns how many were re-queued.
+        """
+        now = time.time()
+        cutoff = now - older_than_s if older_than_s is not None else now
+        return self._update(
+            "UPDATE tasks SET status = 'pending', attempts = 0, available_at = ?, updated_at = ? "
+            "WHERE kind = ? AND status = 'dead' AND updated_at <= ?",
+            (now, now, kind, cutoff),
+        )
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK; takes the write lock up front."""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
+        return False
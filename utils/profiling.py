@@ -0,0 +1,197 @@
+# utils/profiling.py
+"""
+Opt-in per-rerun profiling for app_streamlit.py.
+
+Enable with APP_PROFILE=1 (env) or ?profile=1 in the app URL. Each rerun
+then records named timing spans (parquet loading, enrichment lookups, HTML
+building, chart rendering, ...) to data/app_profile.parquet, and a single
+rerun can optionally be captured with a sampling profiler (pyinstrument,
+else a small stdlib stack sampler) into data/profiles/. Both sample the
+script thread's stack instead of tracing every call, so the captured
+rerun runs at close to normal speed.
+
+This is separate from data/perf_log.parquet, which records outbound API calls.
+"""
+import os
+import sys
+import time
+import uuid
+import pathlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Optional: sampling profiler (falls back to _StackSampler when missing)
+try:
+    from pyinstrument import Profiler  # type: ignore
+except ImportError:
+    Profiler = None
+
+DATA_DIR = pathlib.Path("data")
+PROFILE_FILE = DATA_DIR / "app_profile.parquet"
+REPORT_DIR = DATA_DIR / "profiles"
+MAX_ROWS = 20_000  # keep the store small; oldest rows are dropped
+SAMPLE_INTERVAL_S = 0.001
+
+# sessions finish reruns on their own threads; one read-append-replace at a time
+_store_lock = threading.Lock()
+
+
+def profiling_enabled(query_params=None) -> bool:
+    if os.getenv("APP_PROFILE", "").lower() in ("1", "true", "yes"):
+        return True
+    if query_params is not None:
+        try:
+            return str(query_params.get("profile", "")).lower() in ("1", "true", "yes")
+        except Exception:
+            return False
+    return False
+
+
+class RerunProfiler:
+    """
+    Collects stage timings for one script run. Spans with the same name
+    add up (e.g. one 'enrichment' span per poster card). When disabled,
+    span() is a no-op so the instrumented code costs nothing.
+    """
+
+    def __init__(self, enabled: bool = False, session_id: str | None = None):
+        self.enabled = enabled
+        self.session_id = session_id
+        self.rerun_id = uuid.uuid4().hex[:12]
+        self.stages: dict[str, float] = {}
+        self.t0 = time.perf_counter()
+        self._sampler = None
+        self._sampler_kind = None
+        self.report_path = None
+        self.finished = False
+
+    @contextmanager
+    def span(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - t) * 1000.0
+
+    # ---------- one-rerun sampling capture ----------
+
+    def start_sampling(self):
+        if not self.enabled or self._sampler is not None:
+            return
+        if Profiler is not None:
+            self._sampler = Profiler(interval=SAMPLE_INTERVAL_S)
+            self._sampler_kind = "pyinstrument"
+        else:
+            self._sampler = _StackSampler(interval=SAMPLE_INTERVAL_S)
+            self._sampler_kind = "stack_sampler"
+        self._sampler.start()
+
+    def _stop_sampling(self):
+        if self._sampler is None:
+            return
+        REPORT_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        self._sampler.stop()
+        if self._sampler_kind == "pyinstrument":
+            path = REPORT_DIR / f"rerun_{stamp}_{self.rerun_id}.html"
+            path.write_text(self._sampler.output_html(), encoding="utf-8")
+        else:
+            path = REPORT_DIR / f"rerun_{stamp}_{self.rerun_id}.txt"
+            path.write_text(self._sampler.report(), encoding="utf-8")
+        self._sampler = None
+        self.report_path = path
+
+    # ---------- persist ----------
+
+    def finish(self):
+        """
+        Stop any capture and append this rerun's spans (+ a 'total' row) to
+        the store. The store is rewritten to a temp file and swapped in, so
+        the app_profile view never reads a partial file. Only the first call
+        records anything.
+        """
+        if not self.enabled or self.finished:
+            return
+        self.finished = True
+        self._stop_sampling()
+        total_ms = (time.perf_counter() - self.t0) * 1000.0
+        ts = datetime.now(timezone.utc).isoformat()
+        rows = [
+            {"ts": ts, "rerun_id": self.rerun_id, "session_id": self.session_id,
+             "stage": stage, "ms": round(ms, 2)}
+            for stage, ms in self.stages.items()
+        ]
+        rows.append({"ts": ts, "rerun_id": self.rerun_id, "session_id": self.session_id,
+                     "stage": "total", "ms": round(total_ms, 2)})
+        df = pd.DataFrame(rows)
+        with _store_lock:
+            if PROFILE_FILE.exists():
+                old = pd.read_parquet(PROFILE_FILE)
+                df = pd.concat([old, df], ignore_index=True).tail(MAX_ROWS)
+            # pid in the name: several app processes can share data/
+            tmp = PROFILE_FILE.with_suffix(f".parquet.{os.getpid()}.tmp")
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, PROFILE_FILE)
+
+
+class _StackSampler:
+    """
+    Stdlib sampling profiler: a background thread snapshots the calling
+    thread's stack every `interval` seconds (sys._current_frames), and the
+    report lists functions by share of samples (inclusive / own).
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(stack)] += 1   # innermost frame first
+
+    def report(self, top: int = 60) -> str:
+        total = sum(self.samples.values())
+        inclusive, own = Counter(), Counter()
+        for stack, n in self.samples.items():
+            own[stack[0]] += n
+            for fn in set(stack):
+                inclusive[fn] += n
+        lines = [f"{total} samples, every {self.interval * 1000:.1f} ms", "",
+                 f"{'inclusive':>9}  {'own':>6}  function"]
+        for fn, n in inclusive.most_common(top):
+            lines.append(f"{100.0 * n / total:8.1f}%  {100.0 * own[fn] / total:5.1f}%  {fn}")
+        return "\n".join(lines) + "\n"
+
+
+def latest_report() -> pathlib.Path | None:
+    """Most recent sampling-profiler report, if any."""
+    if not REPORT_DIR.exists():
+        return None
+    reports = sorted(REPORT_DIR.glob("rerun_*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return reports[0] if reports else None
@@ -0,0 +1,290 @@
+# utils/queries.py
+"""
+Embedded SQL layer over the parquet stores in data/.
+
+DuckDB runs in-process (no server). Each store is registered as a view over
+read_parquet(), so queries only read the columns and row groups they need
+instead of materialising whole files in pandas first.
+
+Views (registered only when the backing file exists):
+  trending      -> data/tmdb_trending.parquet
+  perf_log      -> data/perf_log.parquet
+  enrichment    -> data/enrichment_cache.parquet
+  batch_diff    -> data/tmdb_batch_diff.parquet
+  app_profile   -> data/app_profile.parquet
+"""
+import pathlib
+
+import duckdb
+import pandas as pd
+
+DATA_DIR = pathlib.Path("data")
+
+VIEWS = {
+    "trending": "tmdb_trending.parquet",
+    "perf_log": "perf_log.parquet",
+    "enrichment": "enrichment_cache.parquet",
+    "batch_diff": "tmdb_batch_diff.parquet",
+    "app_profile": "app_profile.parquet",
+}
+
+
+def connect(data_dir: pathlib.Path = DATA_DIR) -> duckdb.DuckDBPyConnection:
+    """
+    Open an in-memory DuckDB connection with a view per parquet store.
+    Views read the file lazily, so a long-lived connection always sees the
+    latest data written by the ETL.
+    """
+    con = duckdb.connect(database=":memory:")
+    # remembered in the database, so every cursor refreshes from the same dir
+    con.execute("CREATE TABLE store_dir AS SELECT $path AS path", {"path": data_dir.as_posix()})
+    refresh_views(con)
+    return con
+
+
+def refresh_views(con: duckdb.DuckDBPyConnection):
+    """
+    Create views for stores that exist now but have no view yet (e.g. after
+    the first fetch). Existing views already read the latest file, so they
+    are left alone: no catalog writes when cursors share one database.
+    """
+    data_dir = pathlib.Path(con.execute("SELECT path FROM store_dir").fetchone()[0])
+    existing = {r[0] for r in con.execute("SELECT view_name FROM duckdb_views()").fetchall()}
+    for view, filename in VIEWS.items():
+        path = data_dir / filename
+        if view in existing or not path.exists():
+            continue
+        try:
+            con.execute(
+                f"CREATE OR REPLACE VIEW {view} AS "
+                f"SELECT * FROM read_parquet('{path.as_posix()}')"
+            )
+        except duckdb.Error:
+            # another cursor created it at the same moment
+            if not has_view(con, view):
+                raise
+
+
+def has_view(con: duckdb.DuckDBPyConnection, view: str) -> bool:
+    rows = con.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [view]
+    ).fetchall()
+    return bool(rows)
+
+
+def _query(con, view: str, sql: str, params=None) -> pd.DataFrame:
+    """Run a parameterised query, returning an empty frame if the view is missing."""
+    if not has_view(con, view):
+        # the store may have been written since the views were created;
+        # existing views already read the latest file, so this is the only refresh
+        refresh_views(con)
+        if not has_view(con, view):
+            return pd.DataFrame()
+    return con.execute(sql, params or []).df()
+
+
+# ---------- trending history ----------
+
+# The pull shown for a window: the most complete one (largest batch; newest
+# ts on ties), so a partial pull doesn't replace a full one
+_BEST_PULL = """
+    SELECT ts
+    FROM trending
+    WHERE "window" = $window
+    GROUP BY ts
+    ORDER BY count(*) DESC, ts DESC
+    LIMIT 1
+"""
+
+
+def store_version(view: str, data_dir: pathlib.Path = DATA_DIR):
+    """(inode, mtime_ns) of a view's parquet file; changes on every write. None if missing."""
+    try:
+        st = (data_dir / VIEWS[view]).stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def latest_batch_ts(con, window: str = "day"):
+    """ts of the pull latest_batch() returns for a window (None if there is none)."""
+    df = _query(con, "trending", _BEST_PULL, {"window": window})
+    return df["ts"].iloc[0] if len(df) else None
+
+
+def latest_batch(con, window: str = "day", media_type: str | None = None, limit: int | None = None) -> pd.DataFrame:
+    """
+    Rows of the most complete pull (largest batch; newest ts on ties) for a
+    window, optionally filtered to 'movie'/'tv', ordered by popularity.
+    """
+    sql = f"""
+        WITH best AS ({_BEST_PULL})
+        SELECT t.*
+        FROM trending t
+        JOIN best USING (ts)
+        WHERE t."window" = $window
+          AND ($media_type IS NULL OR t.media_type = $media_type)
+        ORDER BY t.popularity DESC NULLS LAST
+        LIMIT $limit
+    """
+    params = {"window": window, "media_type": media_type, "limit": limit if limit is not None else 2**31 - 1}
+    return _query(con, "trending", sql, params)
+
+
+def batch_summary(con, window: str | None = None) -> pd.DataFrame:
+    """One row per pull: ts, window, number of titles."""
+    sql = """
+        SELECT ts, "window", count(*) AS titles
+        FROM trending
+        WHERE $window IS NULL OR "window" = $window
+        GROUP BY ts, "window"
+        ORDER BY ts DESC
+    """
+    return _query(con, "trending", sql, {"window": window})
+
+
+def batch_at(con, ts, window: str = "day") -> pd.DataFrame:
+    """All rows of one pull (identified by its ts), ordered by popularity."""
+    sql = """
+        SELECT *
+        FROM trending
+        WHERE "window" = $window AND ts = CAST($ts AS TIMESTAMPTZ)
+        ORDER BY popularity DESC NULLS LAST
+    """
+    return _query(con, "trending", sql, {"window": window, "ts": str(ts)})
+
+
+def trending_since(con, since=None) -> pd.DataFrame:
+    """
+    Title rows of every pull newer than `since` (all pulls when None), with
+    each title's rank by popularity within its pull. Feeds the search index.
+    """
+    sql = """
+        SELECT ts, "window", id, media_type, title, popularity,
+               row_number() OVER (PARTITION BY ts, "window" ORDER BY popularity DESC NULLS LAST) AS rank
+        FROM trending
+        WHERE $since IS NULL OR ts > CAST($since AS TIMESTAMPTZ)
+        ORDER BY ts
+    """
+    return _query(con, "trending", sql, {"since": None if since is None else str(since)})
+
+
+def top_titles(con, window: str = "day", limit: int = 20) -> pd.DataFrame:
+    """Titles that trended most often across all pulls, with their best popularity."""
+    sql = """
+        SELECT id, media_type, any_value(title) AS title,
+               count(DISTINCT ts) AS pulls,
+               max(popularity) AS peak_popularity,
+               min(ts) AS first_seen,
+               max(ts) AS last_seen
+        FROM trending
+        WHERE "window" = $window
+        GROUP BY id, media_type
+        ORDER BY pulls DESC, peak_popularity DESC
+        LIMIT $limit
+    """
+    return _query(con, "trending", sql, {"window": window, "limit": limit})
+
+
+def batch_churn(con, window: str = "day", limit: int = 48) -> pd.DataFrame:
+    """Added / removed / unchanged title counts per pull (from the ETL's batch diff)."""
+    sql = """
+        SELECT ts, previous_ts,
+               count(*) FILTER (WHERE change = 'added') AS added,
+               count(*) FILTER (WHERE change = 'removed') AS removed,
+               count(*) FILTER (WHERE change = 'unchanged') AS unchanged
+        FROM batch_diff
+        WHERE "window" = $window
+        GROUP BY ts, previous_ts
+        ORDER BY ts DESC
+        LIMIT $limit
+    """
+    return _query(con, "batch_diff", sql, {"window": window, "limit": limit})
+
+
+# ---------- perf log ----------
+
+# perf_log.ts is written as an ISO-8601 string by etl_fetch.append_perf
+_PERF_TS = "TRY_CAST(ts AS TIMESTAMPTZ)"
+
+
+def perf_recent(con, limit: int = 500) -> pd.DataFrame:
+    """Most recent perf rows, newest first, with ts parsed to a timestamp."""
+    sql = f"""
+        SELECT * REPLACE ({_PERF_TS} AS ts)
+        FROM perf_log
+        ORDER BY {_PERF_TS} DESC NULLS LAST
+        LIMIT $limit
+    """
+    return _query(con, "perf_log", sql, {"limit": limit})
+
+
+def provider_daily_usage(con, provider: str, days: int = 7) -> pd.DataFrame:
+    """Requests per UTC day for one provider (most recent `days` days)."""
+    sql = f"""
+        SELECT CAST(timezone('UTC', {_PERF_TS}) AS DATE) AS ts_date,
+               count(*) AS requests
+        FROM perf_log
+        WHERE provider = $provider
+        GROUP BY ts_date
+        ORDER BY ts_date DESC
+        LIMIT $days
+    """
+    return _query(con, "perf_log", sql, {"provider": provider, "days": days})
+
+
+def endpoint_latency(con, provider: str | None = None) -> pd.DataFrame:
+    """Call count, error count and latency percentiles per provider/endpoint."""
+    sql = """
+        SELECT provider, endpoint,
+               count(*) AS calls,
+               count(*) FILTER (WHERE status <> 200) AS errors,
+               quantile_cont(latency_ms, 0.5) AS p50_ms,
+               quantile_cont(latency_ms, 0.95) AS p95_ms,
+               sum(bytes) AS total_bytes
+        FROM perf_log
+        WHERE $provider IS NULL OR provider = $provider
+        GROUP BY provider, endpoint
+        ORDER BY calls DESC
+    """
+    return _query(con, "perf_log", sql, {"provider": provider})
+
+
+# ---------- app profiling (utils/profiling.py) ----------
+
+def slowest_stages(con, reruns: int = 50) -> pd.DataFrame:
+    """Per-stage timing over the most recent `reruns` profiled reruns, slowest p95 first."""
+    sql = """
+        WITH recent AS (
+            SELECT rerun_id
+            FROM app_profile
+            GROUP BY rerun_id
+            ORDER BY max(ts) DESC
+            LIMIT $reruns
+        )
+        SELECT stage,
+               count(*) AS reruns,
+               round(avg(ms), 1) AS mean_ms,
+               round(quantile_cont(ms, 0.5), 1) AS p50_ms,
+               round(quantile_cont(ms, 0.95), 1) AS p95_ms,
+               round(max(ms), 1) AS max_ms
+        FROM app_profile
+        JOIN recent USING (rerun_id)
+        GROUP BY stage
+        ORDER BY p95_ms DESC
+    """
+    return _query(con, "app_profile", sql, {"reruns": reruns})
+
+
+# ---------- enrichment cache ----------
+
+def enrichment_for(con, ids: list[int], media_type: str | None = None) -> pd.DataFrame:
+    """Latest cached enrichment row per (id, media_type) for the given ids."""
+    sql = """
+        SELECT *
+        FROM enrichment
+        WHERE list_contains($ids, id)
+          AND ($media_type IS NULL OR media_type = $media_type)
+        QUALIFY row_number() OVER (PARTITION BY id, media_type ORDER BY enriched_at DESC) = 1
+    """
+    return _query(con, "enrichment", sql, {"ids": [int(i) for i in ids], "media_type": media_type})
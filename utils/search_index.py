@@ -0,0 +1,223 @@
+# utils/search_index.py
+"""
+Title search over the whole trending history (data/title_index.sqlite).
+
+Answers "has this title trended, when, and at what rank?" without loading
+tmdb_trending.parquet. Titles are normalized (accents stripped, casefolded,
+punctuation removed; letters of any script are kept) and split into tokens; every query token must match
+the start of some title token, so "spider ver" finds
+"Spider-Man: Across the Spider-Verse". Lookups are prefix range scans on
+the (token, id, media_type) primary key, so they stay fast as history grows.
+
+The ETL keeps the index current with sync_index(), which only reads pulls
+newer than the last one indexed.
+"""
+import re
+import sqlite3
+import pathlib
+import unicodedata
+
+import pandas as pd
+
+DATA_DIR = pathlib.Path("data")
+INDEX_PATH = DATA_DIR / "title_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS titles (
+    id          INTEGER NOT NULL,
+    media_type  TEXT NOT NULL,
+    title       TEXT,
+    norm_title  TEXT,
+    PRIMARY KEY (id, media_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS titles_norm ON titles (norm_title);
+
+CREATE TABLE IF NOT EXISTS tokens (
+    token       TEXT NOT NULL,
+    id          INTEGER NOT NULL,
+    media_type  TEXT NOT NULL,
+    PRIMARY KEY (token, id, media_type)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS appearances (
+    id          INTEGER NOT NULL,
+    media_type  TEXT NOT NULL,
+    "window"    TEXT NOT NULL,
+    ts          TEXT NOT NULL,
+    rank        INTEGER,
+    popularity  REAL,
+    PRIMARY KEY (id, media_type, "window", ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Unicode-aware: \W is anything but letters/digits of any script
+_SEPARATORS = re.compile(r"[\W_]+")
+# Bump when normalize() changes; sync_index then re-indexes every pull
+TOKENIZER_VERSION = "2"
+
+
+def normalize(text: str | None) -> str:
+    """'Amélie (2001)!' -> 'amelie 2001', 'Straße' -> 'strasse', 'Лёд 3' -> 'лед 3'"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+def tokenize(text: str | None) -> list[str]:
+    return normalize(text).split()
+
+
+def open_index(path: pathlib.Path = INDEX_PATH, create: bool = False) -> sqlite3.Connection:
+    """
+    Connect to the index. Only the writer (sync_index) passes create=True
+    to set up WAL and the schema; searches just connect, since both persist
+    in the file.
+    """
+    if create:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if create:
+        # WAL: the app and API can search while the ETL is adding a pull
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+    return conn
+
+
+# ---------- building ----------
+
+def index_rows(conn: sqlite3.Connection, rows: pd.DataFrame) -> int:
+    """
+    Add trending rows (ts, window, id, media_type, title, popularity, rank)
+    to the index. Re-indexing the same pull is a no-op.
+    """
+    if rows.empty:
+        return 0
+    titles, tokens, appearances = [], [], []
+    for r in rows.itertuples(index=False):
+        key = (int(r.id), r.media_type)
+        titles.append((*key, r.title, normalize(r.title)))
+        tokens.extend((tok, *key) for tok in set(tokenize(r.title)))
+        appearances.append((*key, r.window, ts_text(r.ts), int(r.rank),
+                            None if pd.isna(r.popularity) else float(r.popularity)))
+    with conn:
+        # a title can be renamed upstream; keep the latest spelling searchable too
+        conn.executemany(
+            "INSERT INTO titles (id, media_type, title, norm_title) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id, media_type) DO UPDATE SET title = excluded.title, norm_title = excluded.norm_title",
+            titles,
+        )
+        conn.executemany("INSERT OR IGNORE INTO tokens VALUES (?, ?, ?)", tokens)
+        conn.executemany("INSERT OR IGNORE INTO appearances VALUES (?, ?, ?, ?, ?, ?)", appearances)
+        last = max(a[3] for a in appearances)
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('last_ts', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = max(value, excluded.value)",
+            (last,),
+        )
+    return len(appearances)
+
+
+def sync_index(path: pathlib.Path = INDEX_PATH, data_dir: pathlib.Path = DATA_DIR) -> int:
+    """Index every pull in tmdb_trending.parquet newer than the last one indexed."""
+    from utils.queries import connect, trending_since
+
+    conn = open_index(path, create=True)
+    try:
+        _check_tokenizer(conn)
+        row = conn.execute("SELECT value FROM meta WHERE key = 'last_ts'").fetchone()
+        since = row["value"] if row else None
+        with connect(data_dir) as con:
+            rows = trending_since(con, since)
+        return index_rows(conn, rows)
+    finally:
+        conn.close()
+
+
+def _check_tokenizer(conn: sqlite3.Connection):
+    """Empty an index built by an older normalize(), so it is rebuilt from scratch."""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()
+    if row is not None and row["value"] == TOKENIZER_VERSION:
+        return
+    with conn:
+        for table in ("titles", "tokens", "appearances", "meta"):
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('tokenizer', ?)", (TOKENIZER_VERSION,))
+
+
+def ts_text(ts) -> str:
+    """ts as UTC ISO-8601 text with µs and a "Z" (one fixed format, so text order is time order)."""
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC")
+    return ts.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+# ---------- querying ----------
+
+def search(query: str, limit: int = 20, path: pathlib.Path = INDEX_PATH) -> pd.DataFrame:
+    """
+    Titles whose tokens start with every query token, with how often they
+    trended, first/last appearance and best rank. Exact and whole-title
+    prefix matches come first, then the most frequently trending.
+    """
+    toks = tokenize(query)
+    cols = ["id", "media_type", "title", "appearances", "first_seen", "last_seen", "best_rank"]
+    if not toks or not path.exists():
+        return pd.DataFrame(columns=cols)
+
+    # one prefix range scan per token, intersected
+    match = " INTERSECT ".join(
+        "SELECT id, media_type FROM tokens WHERE token >= ? AND token < ?" for _ in toks
+    )
+    params = [p for tok in toks for p in (tok, tok + "\U0010ffff")]
+    norm = " ".join(toks)
+    sql = f"""
+        WITH hits AS ({match})
+        SELECT t.id, t.media_type, t.title,
+               count(a.ts) AS appearances,
+               min(a.ts) AS first_seen,
+               max(a.ts) AS last_seen,
+               min(a.rank) AS best_rank,
+               CASE WHEN t.norm_title = ? THEN 0
+                    WHEN t.norm_title LIKE ? ESCAPE '\\' THEN 1
+                    ELSE 2 END AS match_rank
+        FROM hits h
+        JOIN titles t USING (id, media_type)
+        LEFT JOIN appearances a USING (id, media_type)
+        GROUP BY t.id, t.media_type
+        ORDER BY match_rank, appearances DESC, best_rank
+        LIMIT ?
+    """
+    like = norm.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    conn = open_index(path)
+    try:
+        rows = conn.execute(sql, [*params, norm, like, limit]).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame([dict(r) for r in rows], columns=cols + ["match_rank"]).drop(columns="match_rank")
+
+
+def appearances_for(item_id: int, media_type: str, window: str | None = None,
+                    path: pathlib.Path = INDEX_PATH) -> pd.DataFrame:
+    """Every pull a title appeared in: ts, window, rank, popularity (newest first)."""
+    cols = ["ts", "window", "rank", "popularity"]
+    if not path.exists():
+        return pd.DataFrame(columns=cols)
+    conn = open_index(path)
+    try:
+        rows = conn.execute(
+            'SELECT ts, "window", rank, popularity FROM appearances '
+            'WHERE id = ? AND media_type = ? AND (? IS NULL OR "window" = ?) ORDER BY ts DESC',
+            (int(item_id), media_type, window, window),
+        ).fetchall()
+    finally:
+        conn.close()
+    return pd.DataFrame([dict(r) for r in rows], columns=cols)
@@ -0,0 +1,118 @@
+# utils/snapshot.py
+"""
+Hot snapshot of the latest enriched batch per window, for the dashboard.
+
+The ETL writes data/snapshot_<window>.arrow as an *uncompressed* Arrow IPC
+(Feather v2) file and swaps it in with os.replace, so readers see either
+the old file or the new one, never a partial write. The app opens it with
+a memory map: no decompression, no parquet decoding, and every Streamlit
+process maps the same page-cache pages instead of holding its own copy.
+A process that still has the old file mapped keeps reading the old inode
+until it reopens.
+"""
+import os
+import pathlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+DATA_DIR = pathlib.Path("data")
+
+
+def snapshot_path(window: str, data_dir: pathlib.Path = DATA_DIR) -> pathlib.Path:
+    return data_dir / f"snapshot_{window}.arrow"
+
+
+def publish_snapshot(batch: pd.DataFrame, enrichment: pd.DataFrame | None = None,
+                     data_dir: pathlib.Path = DATA_DIR) -> pathlib.Path | None:
+    """
+    Join cached enrichment (imdb_rating, imdb_votes, providers) onto one
+    pull and publish it for that pull's window. Returns the path written.
+    """
+    if batch.empty:
+        return None
+    window = batch["window"].iloc[0]
+    df = batch.sort_values("popularity", ascending=False).reset_index(drop=True)
+    if enrichment is not None and len(enrichment):
+        cols = ["id", "media_type", "imdb_rating", "imdb_votes", "providers"]
+        df = df.merge(enrichment[cols], on=["id", "media_type"], how="left")
+    else:
+        df = df.assign(imdb_rating=None, imdb_votes=None, providers=None)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    out = snapshot_path(window, data_dir)
+    tmp = out.with_suffix(".arrow.tmp")
+    feather.write_feather(table, tmp, compression="uncompressed")
+    os.replace(tmp, out)
+    return out
+
+
+def publish_latest(window: str, data_dir: pathlib.Path = DATA_DIR) -> pathlib.Path | None:
+    """
+    Publish the pull the app would otherwise load from the history
+    (queries.latest_batch) with the current enrichment cache. Called after
+    every write to tmdb_trending.parquet, so the snapshot never lags it.
+    """
+    from utils.queries import connect, latest_batch
+
+    con = connect(data_dir)
+    try:
+        batch = latest_batch(con, window)
+    finally:
+        con.close()
+    cache = data_dir / "enrichment_cache.parquet"
+    enrichment = pd.read_parquet(cache) if cache.exists() else None
+    return publish_snapshot(batch, enrichment, data_dir)
+
+
+def snapshot_ts(table: pa.Table | None):
+    """ts of the pull in a snapshot (None for an empty/missing one), at DuckDB's µs precision."""
+    if table is None or table.num_rows == 0:
+        return None
+    return pd.Timestamp(table.column("ts")[0].as_py()).floor("us")
+
+
+def open_snapshot(window: str, data_dir: pathlib.Path = DATA_DIR) -> pa.Table | None:
+    """
+    Memory-map the snapshot for a window. Columns are views over the mapped
+    file (zero-copy); nothing is read until a column is touched.
+    """
+    path = snapshot_path(window, data_dir)
+    if not path.exists():
+        return None
+    source = pa.memory_map(str(path), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def select_snapshot(table: pa.Table, media_type: str | None = None) -> pa.Table:
+    """
+    Rows of one media type ('movie'/'tv'; all when None), filtered in Arrow.
+    The snapshot is already ordered by popularity, so callers can
+    table.slice() a page and convert only those rows to pandas.
+    """
+    if media_type is None:
+        return table
+    return table.filter(pc.equal(table.column("media_type"), media_type))
+
+
+def snapshot_version(window: str, data_dir: pathlib.Path = DATA_DIR):
+    """(inode, mtime_ns) of the current snapshot; changes on every publish."""
+    try:
+        st = snapshot_path(window, data_dir).stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def enrichment_from_snapshot(df: pd.DataFrame) -> dict:
+    """{(id, media_type): row} for titles the snapshot carries enrichment for."""
+    out = {}
+    if "providers" not in df.columns:
+        return out
+    for r in df[["id", "media_type", "imdb_rating", "imdb_votes", "providers"]].to_dict("records"):
+        if r["providers"] is None or (isinstance(r["providers"], float) and pd.isna(r["providers"])):
+            continue
+        out[(int(r["id"]), r["media_type"])] = r
+    return out